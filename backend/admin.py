@@ -3,7 +3,7 @@ from sqladmin.authentication import AuthenticationBackend
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from database import engine
+from database import admin_engine
 from models import Users
 
 
@@ -16,7 +16,7 @@ class AdminAuth(AuthenticationBackend):
         if not username or not password:
             return False
 
-        with Session(bind=engine) as session:
+        with Session(bind=admin_engine) as session:
             statement = select(Users).where(
                 Users.username == username,
                 Users.is_active.is_(True),
@@ -41,7 +41,7 @@ class AdminAuth(AuthenticationBackend):
         if not user_id:
             return False
 
-        with Session(bind=engine) as session:
+        with Session(bind=admin_engine) as session:
             statement = select(Users).where(
                 Users.id == user_id, Users.is_active.is_(True)
             )
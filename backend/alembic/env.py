@@ -27,6 +27,19 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = SQLModel.metadata
 
+# Columns maintained by database triggers rather than mapped on the models,
+# so autogenerate must not try to drop them.
+UNMAPPED_COLUMNS = {("episode", "search_vector")}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "column" and (object.table.name, name) in UNMAPPED_COLUMNS:
+        return False
+    if type_ == "index" and name == "ix_episode_search_vector":
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -49,6 +62,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -72,7 +86,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,181 @@
+"""Add episode search vector
+
+Revision ID: 8a1f3c2d9b47
+Revises: 54c80f6bdfd2
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8a1f3c2d9b47"
+down_revision = "54c80f6bdfd2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+
+    # Unaccented words, stemmed in Catalan when the server ships the
+    # snowball stemmer (PostgreSQL 16+), matched as-is otherwise.
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_ts_config WHERE cfgname = 'catalan_unaccent'
+            ) THEN
+                CREATE TEXT SEARCH CONFIGURATION catalan_unaccent
+                    (COPY = simple);
+                IF EXISTS (
+                    SELECT 1 FROM pg_ts_dict WHERE dictname = 'catalan_stem'
+                ) THEN
+                    ALTER TEXT SEARCH CONFIGURATION catalan_unaccent
+                        ALTER MAPPING FOR asciiword, asciihword,
+                            hword_asciipart, word, hword, hword_part
+                        WITH unaccent, catalan_stem;
+                ELSE
+                    ALTER TEXT SEARCH CONFIGURATION catalan_unaccent
+                        ALTER MAPPING FOR asciiword, asciihword,
+                            hword_asciipart, word, hword, hword_part
+                        WITH unaccent, simple;
+                END IF;
+            END IF;
+        END $$;
+        """
+    )
+
+    op.add_column(
+        "episode",
+        sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True),
+    )
+
+    # Title > description > linked category names
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION episode_search_vector(
+            ep_id integer, ep_title text, ep_description text
+        ) RETURNS tsvector LANGUAGE sql STABLE AS $$
+            SELECT
+                setweight(to_tsvector(
+                    'catalan_unaccent', coalesce(ep_title, '')), 'A')
+                || setweight(to_tsvector(
+                    'catalan_unaccent', coalesce(ep_description, '')), 'B')
+                || setweight(to_tsvector('catalan_unaccent', coalesce((
+                    SELECT string_agg(c.name, ' ')
+                    FROM category c
+                    JOIN episodecategory ec ON ec.category_id = c.id
+                    WHERE ec.episode_id = ep_id
+                ), '')), 'C')
+        $$;
+        """
+    )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION episode_search_vector_trigger()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.search_vector := episode_search_vector(
+                NEW.id, NEW.title, NEW.description
+            );
+            RETURN NEW;
+        END $$;
+
+        CREATE TRIGGER episode_search_vector_update
+            BEFORE INSERT OR UPDATE OF title, description ON episode
+            FOR EACH ROW EXECUTE FUNCTION episode_search_vector_trigger();
+        """
+    )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION episodecategory_search_vector_trigger()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE episode
+                SET search_vector = episode_search_vector(
+                    id, title, description
+                )
+                WHERE id = NEW.episode_id;
+            END IF;
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                UPDATE episode
+                SET search_vector = episode_search_vector(
+                    id, title, description
+                )
+                WHERE id = OLD.episode_id;
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        CREATE TRIGGER episodecategory_search_vector_update
+            AFTER INSERT OR UPDATE OR DELETE ON episodecategory
+            FOR EACH ROW
+            EXECUTE FUNCTION episodecategory_search_vector_trigger();
+        """
+    )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION category_search_vector_trigger()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE episode
+            SET search_vector = episode_search_vector(id, title, description)
+            WHERE id IN (
+                SELECT episode_id FROM episodecategory
+                WHERE category_id = NEW.id
+            );
+            RETURN NULL;
+        END $$;
+
+        CREATE TRIGGER category_search_vector_update
+            AFTER UPDATE OF name ON category
+            FOR EACH ROW
+            WHEN (OLD.name IS DISTINCT FROM NEW.name)
+            EXECUTE FUNCTION category_search_vector_trigger();
+        """
+    )
+
+    op.execute(
+        "UPDATE episode "
+        "SET search_vector = episode_search_vector(id, title, description)"
+    )
+    op.create_index(
+        "ix_episode_search_vector",
+        "episode",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_episode_search_vector", table_name="episode")
+    op.execute(
+        "DROP TRIGGER IF EXISTS category_search_vector_update ON category"
+    )
+    op.execute(
+        "DROP TRIGGER IF EXISTS episodecategory_search_vector_update "
+        "ON episodecategory"
+    )
+    op.execute(
+        "DROP TRIGGER IF EXISTS episode_search_vector_update ON episode"
+    )
+    op.execute("DROP FUNCTION IF EXISTS category_search_vector_trigger()")
+    op.execute(
+        "DROP FUNCTION IF EXISTS episodecategory_search_vector_trigger()"
+    )
+    op.execute("DROP FUNCTION IF EXISTS episode_search_vector_trigger()")
+    op.execute(
+        "DROP FUNCTION IF EXISTS episode_search_vector(integer, text, text)"
+    )
+    op.drop_column("episode", "search_vector")
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS catalan_unaccent")
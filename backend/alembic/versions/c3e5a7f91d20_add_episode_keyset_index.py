@@ -0,0 +1,36 @@
+"""Add episode keyset index
+
+Revision ID: c3e5a7f91d20
+Revises: 8a1f3c2d9b47
+Create Date: 2026-10-18 11:03:47.218553
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c3e5a7f91d20"
+down_revision = "8a1f3c2d9b47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The composite index also serves plain published_at lookups
+    op.create_index(
+        "ix_episode_published_at_id",
+        "episode",
+        ["published_at", "id"],
+        unique=False,
+    )
+    op.drop_index(op.f("ix_episode_published_at"), table_name="episode")
+
+
+def downgrade() -> None:
+    op.create_index(
+        op.f("ix_episode_published_at"),
+        "episode",
+        ["published_at"],
+        unique=False,
+    )
+    op.drop_index("ix_episode_published_at_id", table_name="episode")
@@ -1,47 +1,356 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, Query
-from fastapi_pagination import Page
+import os
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi_pagination import Page, set_page
 from fastapi_pagination.customization import CustomizedPage, UseParamsFields
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlmodel import Session
+from pydantic import BaseModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from database import get_session
+from api.http_cache import (
+    conditional_get,
+    format_http_date,
+    not_modified_since,
+    raise_not_modified,
+    response_cache_key,
+)
+from database import get_read_session
 from dependencies import get_categories_service, get_episodes_service
-from models import Category, CategoryType, EpisodeWithCategories
-from services import CategoriesService, EpisodesService
+from export import EXPORT_FORMATS
+from models import (
+    Category,
+    CategoryBase,
+    CategoryType,
+    EpisodeFacets,
+    EpisodeListItem,
+    EpisodeWithCategories,
+)
+from pagination import (
+    CursorPage,
+    paginate_to_json,
+    paginate_with_total_async,
+)
+from response_cache import response_cache
+from services import (
+    LIST_FIELDS,
+    AsyncCategoriesService,
+    AsyncEpisodesService,
+)
+
+# Listings can be encoded straight from SQL rows, skipping pydantic. The
+# responses, and the OpenAPI schema, are the same either way.
+FAST_JSON = os.environ.get("API_FAST_JSON", "false").lower() == "true"
+
+# Every route here is a cacheable read
+router = APIRouter(dependencies=[Depends(conditional_get)])
+
 
-router = APIRouter()
+async def cached_response(
+    request: Request,
+    dataset_version: int,
+    response_model: type[BaseModel],
+    build: Callable[[], Awaitable[Any]],
+    exclude_unset: bool = False,
+) -> dict:
+    """
+    Serialized `response_model` for this request, built only when neither
+    cache tier has it for the current dataset version.
+    """
+
+    async def serialize() -> dict:
+        return response_model.model_validate(
+            await build(), from_attributes=True
+        ).model_dump(mode="json", exclude_unset=exclude_unset)
+
+    return await response_cache.get_or_set_async(
+        response_cache_key(request, dataset_version), serialize
+    )
+
+
+async def cached_json_response(
+    request: Request,
+    response: Response,
+    dataset_version: int,
+    build: Callable[[], Awaitable[bytes]],
+) -> Response:
+    """
+    Already encoded JSON for this request, from the cache or `build`.
+    """
+    content = await response_cache.get_or_set_async(
+        "json:" + response_cache_key(request, dataset_version), build
+    )
+    # Headers set on `response` by dependencies are only applied when the
+    # endpoint does not return a Response itself
+    return Response(
+        content, media_type="application/json", headers=response.headers
+    )
 
 
 @router.get(
-    "/episodes", tags=["episodis"], response_model=Page[EpisodeWithCategories]
+    "/episodes",
+    tags=["episodis"],
+    response_model=Page[EpisodeWithCategories],
 )
-def get_episodes(
-    service: EpisodesService = Depends(get_episodes_service),
+async def get_episodes(
+    request: Request,
+    response: Response,
+    service: AsyncEpisodesService = Depends(get_episodes_service),
     # We still need the session for the pagination function
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
+    search: str = "",
+    order: str = Query(
+        "desc",
+        description="Sort order: 'desc', 'asc' or 'relevance' (with search)",
+    ),
+    categories: str = Query(
+        "", description="Comma-separated list of category IDs"
+    ),
+    match: str = Query(
+        "any",
+        pattern="^(any|all)$",
+        description="Match any or all of the given categories",
+    ),
+    exclude: str = Query(
+        "", description="Comma-separated list of category IDs to exclude"
+    ),
+    count: str = Query(
+        "exact",
+        pattern="^(exact|estimate)$",
+        description="'estimate' uses planner statistics when unfiltered",
+    ),
+    fields: str | None = Query(
+        None,
+        description=(
+            "Comma-separated episode fields to return besides the id: "
+            "title, slug, description, published_at, categories. "
+            "All of them by default; when given, items only contain the "
+            "id and the requested fields"
+        ),
+    ),
+):
+
+    # The fast path always reads rows, of every field by default
+    if fields is None and FAST_JSON:
+        fields = ",".join(LIST_FIELDS)
+
+    async def build():
+        query = await service.get_episodes_query(
+            search=search,
+            order=order,
+            categories=categories,
+            match=match,
+            exclude=exclude,
+            fields=fields,
+        )
+        total = await service.count_episodes(
+            search=search,
+            categories=categories,
+            strategy=count,
+            match=match,
+            exclude=exclude,
+        )
+        if fields is None:
+            return await paginate_with_total_async(session, query, total)
+
+        def project(rows):
+            return service.project_episodes(rows, fields)
+
+        if FAST_JSON:
+            return await paginate_to_json(session, query, total, project)
+        # Not the documented page: sparse items lack its required fields
+        with set_page(Page[EpisodeListItem]):
+            return await paginate_with_total_async(
+                session, query, total, transformer=project
+            )
+
+    try:
+        if FAST_JSON:
+            return await cached_json_response(
+                request, response, service.dataset_version, build
+            )
+        if fields is None:
+            return await cached_response(
+                request,
+                service.dataset_version,
+                Page[EpisodeWithCategories],
+                build,
+            )
+        # Returned as is, so it is not validated as the documented page
+        content = await cached_response(
+            request,
+            service.dataset_version,
+            Page[EpisodeListItem],
+            build,
+            exclude_unset=True,
+        )
+        return JSONResponse(content, headers=response.headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get(
+    "/episodes/cursor",
+    tags=["episodis"],
+    response_model=CursorPage[EpisodeWithCategories],
+)
+async def get_episodes_by_cursor(
+    request: Request,
+    service: AsyncEpisodesService = Depends(get_episodes_service),
     search: str = "",
-    order: str = "desc",
+    order: str = Query("desc", pattern="^(asc|desc)$"),
     categories: str = Query(
         "", description="Comma-separated list of category IDs"
     ),
+    match: str = Query(
+        "any",
+        pattern="^(any|all)$",
+        description="Match any or all of the given categories",
+    ),
+    exclude: str = Query(
+        "", description="Comma-separated list of category IDs to exclude"
+    ),
+    cursor: str | None = Query(
+        None, description="next_cursor from the previous page"
+    ),
+    size: int = Query(50, ge=1, le=100),
+    include_total: bool = Query(
+        False, description="Also count all matching episodes"
+    ),
 ):
-    query = service.get_episodes_query(
-        search=search, order=order, categories=categories
+    try:
+        return await cached_response(
+            request,
+            service.dataset_version,
+            CursorPage[EpisodeWithCategories],
+            lambda: service.get_episodes_after_cursor(
+                search=search,
+                order=order,
+                categories=categories,
+                cursor=cursor,
+                size=size,
+                include_total=include_total,
+                match=match,
+                exclude=exclude,
+            ),
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get(
+    "/episodes/facets", tags=["episodis"], response_model=EpisodeFacets
+)
+async def get_episode_facets(
+    request: Request,
+    service: AsyncEpisodesService = Depends(get_episodes_service),
+    search: str = "",
+    categories: str = Query(
+        "", description="Comma-separated list of category IDs"
+    ),
+    match: str = Query(
+        "any",
+        pattern="^(any|all)$",
+        description="Match any or all of the given categories",
+    ),
+    exclude: str = Query(
+        "", description="Comma-separated list of category IDs to exclude"
+    ),
+):
+    return await cached_response(
+        request,
+        service.dataset_version,
+        EpisodeFacets,
+        lambda: service.get_facets(
+            search=search, categories=categories, match=match, exclude=exclude
+        ),
     )
-    return paginate(session, query)
 
 
 @router.get(
     "/episodes/{id}", tags=["episodis"], response_model=EpisodeWithCategories
 )
-def get_episode(
+async def get_episode(
+    request: Request,
+    response: Response,
     id: int = Path(..., description="Episode ID"),
-    service: EpisodesService = Depends(get_episodes_service),
+    service: AsyncEpisodesService = Depends(get_episodes_service),
 ):
-    episode = service.get_episode_by_id(id)
-    if not episode:
+
+    async def build():
+        episode = await service.get_episode_by_id(id)
+        if not episode:
+            return {"episode": None, "updated_at": None}
+        return {
+            "episode": EpisodeWithCategories.model_validate(
+                episode, from_attributes=True
+            ).model_dump(mode="json"),
+            "updated_at": episode.updated_at
+            and format_http_date(episode.updated_at),
+        }
+
+    cached = await response_cache.get_or_set_async(
+        response_cache_key(request, service.dataset_version), build
+    )
+    if cached["episode"] is None:
         raise HTTPException(status_code=404, detail="Episode not found")
-    return episode
+
+    # The episode itself may be older than the latest dataset change
+    if cached["updated_at"]:
+        response.headers["Last-Modified"] = cached["updated_at"]
+        if not_modified_since(
+            request, parsedate_to_datetime(cached["updated_at"])
+        ):
+            raise_not_modified(response)
+
+    return cached["episode"]
+
+
+@router.get(
+    "/export/episodes",
+    tags=["episodis"],
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in EXPORT_FORMATS},
+            "description": "Every episode with its categories",
+        }
+    },
+)
+async def export_episodes(
+    response: Response,
+    service: AsyncEpisodesService = Depends(get_episodes_service),
+    format: str = Query(
+        "ndjson",
+        pattern="^(ndjson|csv)$",
+        description="'ndjson' (one episode per line) or 'csv'",
+    ),
+    gzip: bool = Query(False, description="Compress the stream with gzip"),
+):
+    """
+    The whole catalog in one response, streamed from a server-side cursor
+    instead of paging through /episodes.
+    """
+    headers = {
+        **response.headers,
+        "Content-Disposition": f'attachment; filename="episodes.{format}"',
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        service.export_episodes(format=format, compress=gzip),
+        media_type=EXPORT_FORMATS[format],
+        headers=headers,
+    )
 
 
 CustomPage = CustomizedPage[
@@ -53,11 +362,47 @@ CustomPage = CustomizedPage[
 
 
 @router.get(
-    "/categories", tags=["categories"], response_model=CustomPage[Category]
+    "/categories",
+    tags=["categories"],
+    response_model=CustomPage[Category],
 )
-def get_categories(
-    service: CategoriesService = Depends(get_categories_service),
-    session: Session = Depends(get_session),
+async def get_categories(
+    request: Request,
+    response: Response,
+    service: AsyncCategoriesService = Depends(get_categories_service),
+    session: AsyncSession = Depends(get_read_session),
     type: CategoryType = Query("", description="Category type"),
+    order: str = Query(
+        "name",
+        pattern="^(name|popularity)$",
+        description="Sort by name or by number of episodes",
+    ),
+    min_episodes: int = Query(
+        1, ge=1, description="Only categories with at least this many episodes"
+    ),
 ):
-    return paginate(session, service.get_categories_query(type=type))
+
+    async def build():
+        total = await service.count_categories(
+            type=type, min_episodes=min_episodes
+        )
+        if FAST_JSON:
+            query = service.get_category_rows_query(
+                type=type, order=order, min_episodes=min_episodes
+            )
+            return await paginate_to_json(session, query, total)
+
+        query = service.get_categories_query(
+            type=type, order=order, min_episodes=min_episodes
+        )
+        return await paginate_with_total_async(session, query, total)
+
+    if FAST_JSON:
+        return await cached_json_response(
+            request, response, service.dataset_version, build
+        )
+    # Validating into the table model again would only warn about it
+    content = await cached_response(
+        request, service.dataset_version, CustomPage[CategoryBase], build
+    )
+    return JSONResponse(content, headers=response.headers)
@@ -0,0 +1,98 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Depends, HTTPException, Request, Response
+
+from dependencies import get_current_dataset_state
+from versioning import DatasetState
+
+# Browsers revalidate after a minute; Cloudflare keeps responses longer and
+# revalidates them with the ETag, which is cheap once the data is unchanged.
+CACHE_CONTROL = os.environ.get(
+    "API_CACHE_CONTROL",
+    "public, max-age=60, s-maxage=300, stale-while-revalidate=60",
+)
+
+
+def normalized_target(request: Request) -> str:
+    """Path and query of a request, with the parameters sorted."""
+    query = "&".join(
+        sorted(f"{k}={v}" for k, v in request.query_params.items())
+    )
+    return f"{request.url.path}?{query}"
+
+
+def dataset_etag(request: Request, version: int) -> str:
+    """Weak ETag for a read request: the dataset version plus the query."""
+    digest = hashlib.blake2b(
+        normalized_target(request).encode(), digest_size=8
+    ).hexdigest()
+    return f'W/"{version}-{digest}"'
+
+
+def response_cache_key(request: Request, version: int) -> str:
+    return f"{version}:{normalized_target(request)}"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as for every GET
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def not_modified_since(request: Request, last_modified: datetime) -> bool:
+    """
+    True if the client's If-Modified-Since covers `last_modified`. Ignored
+    when If-None-Match is present, as RFC 9110 requires.
+    """
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since or "if-none-match" in request.headers:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def format_http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def raise_not_modified(response: Response) -> None:
+    raise HTTPException(status_code=304, headers=dict(response.headers))
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    state: DatasetState = Depends(get_current_dataset_state),
+) -> None:
+    """
+    Dependency for read endpoints: sets the cache validators derived from
+    the dataset version and answers 304 before any query is run when the
+    client's copy is current.
+    """
+    etag = dataset_etag(request, state.version)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if state.updated_at:
+        response.headers["Last-Modified"] = format_http_date(state.updated_at)
+
+    if etag_matches(request, etag):
+        raise_not_modified(response)
+    if state.updated_at and not_modified_since(request, state.updated_at):
+        raise_not_modified(response)
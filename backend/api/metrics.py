@@ -0,0 +1,87 @@
+import time
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from database import request_db_usage
+from metrics import Histogram, registry
+
+request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time to answer HTTP requests",
+        ("method", "route", "status", "search"),
+    )
+)
+request_db_queries = registry.register(
+    Histogram(
+        "http_request_db_queries",
+        "SQL statements run per HTTP request",
+        ("route",),
+        buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55),
+    )
+)
+request_db_seconds = registry.register(
+    Histogram(
+        "http_request_db_seconds",
+        "Time spent in SQL statements per HTTP request",
+        ("route",),
+    )
+)
+
+
+def has_search(scope: Scope) -> str:
+    for parameter in scope.get("query_string", b"").split(b"&"):
+        name, _, value = parameter.partition(b"=")
+        if name == b"search" and value.strip(b"+ "):
+            return "true"
+    return "false"
+
+
+class MetricsMiddleware:
+    """
+    Records every HTTP request's latency by route template, status and
+    whether it searched, and the SQL statements it ran and their time.
+    Requests answered before routing (rate limited, snapshots) are matched
+    against the app's routes so they share their route's label.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        usage = [0, 0.0]
+        token = request_db_usage.set(usage)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            request_db_usage.reset(token)
+            route = self.route_template(scope)
+            request_duration.observe(
+                elapsed, scope["method"], route, status, has_search(scope)
+            )
+            request_db_queries.observe(usage[0], route)
+            request_db_seconds.observe(usage[1], route)
+
+    def route_template(self, scope: Scope) -> str:
+        route = scope.get("route")
+        if route is None:
+            for candidate in scope["app"].router.routes:
+                if candidate.matches(scope)[0] == Match.FULL:
+                    route = candidate
+                    break
+        return getattr(route, "path", None) or "unmatched"
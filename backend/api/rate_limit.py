@@ -0,0 +1,83 @@
+import math
+import os
+import re
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from rate_limit import RateLimit, RateLimiter, rate_limiter
+
+# Per client IP. Searches are the costliest reads, episode details the
+# cheapest; the export streams the whole catalog.
+DEFAULT_LIMIT = RateLimit.parse(
+    "default", os.environ.get("RATE_LIMIT_DEFAULT", "300/minute")
+)
+SEARCH_LIMIT = RateLimit.parse(
+    "search", os.environ.get("RATE_LIMIT_SEARCH", "60/minute")
+)
+DETAIL_LIMIT = RateLimit.parse(
+    "detail", os.environ.get("RATE_LIMIT_DETAIL", "600/minute")
+)
+EXPORT_LIMIT = RateLimit.parse(
+    "export", os.environ.get("RATE_LIMIT_EXPORT", "10/hour")
+)
+
+EPISODE_DETAIL_PATH = re.compile(r"^/api/episodes/\d+$")
+# Health checks come from the platform, not from clients
+EXEMPT_PREFIXES = ("/health", "/metrics")
+
+
+def get_cloudflare_ip(request: Request):
+    """Cloudflare's standard header for the real client IP"""
+    return request.headers.get("cf-connecting-ip") or request.client.host
+
+
+def route_limit(request: Request) -> RateLimit:
+    path = request.url.path
+    if path.startswith("/api/export/"):
+        return EXPORT_LIMIT
+    if EPISODE_DETAIL_PATH.match(path):
+        return DETAIL_LIMIT
+    if (
+        path.startswith("/api/episodes")
+        and request.query_params.get("search", "").strip()
+    ):
+        return SEARCH_LIMIT
+    return DEFAULT_LIMIT
+
+
+class RateLimitMiddleware:
+    """
+    Applies the route's limit to every request, per client IP, answering
+    429 with Retry-After once its bucket is empty.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or not self.limiter.enabled
+            or scope["path"].startswith(EXEMPT_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        limit = route_limit(request)
+        retry_after = await self.limiter.hit(
+            f"{limit.name}:{get_cloudflare_ip(request)}", limit
+        )
+        if retry_after is None:
+            await self.app(scope, receive, send)
+            return
+
+        response = JSONResponse(
+            {"error": f"Rate limit exceeded: {limit}"},
+            status_code=429,
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,111 @@
+from email.utils import parsedate_to_datetime
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from api.http_cache import (
+    CACHE_CONTROL,
+    dataset_etag,
+    etag_matches,
+    format_http_date,
+    not_modified_since,
+)
+from snapshots import SnapshotStore, snapshot_store, snapshot_target
+from versioning import peek_dataset_state
+
+# Preferred first
+ENCODINGS = ("br", "gzip")
+
+
+def accepted_encodings(request: Request) -> set[str]:
+    accept_encoding = request.headers.get("accept-encoding", "")
+    accepted = set()
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00"):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class SnapshotMiddleware:
+    """
+    Serves API reads from the snapshots rendered after ingestion, as they
+    are stored, when the request matches one for the current dataset
+    version and the client accepts one of their encodings. Anything else
+    goes to the endpoints as usual.
+
+    The version is the one this process last read, so once it is older
+    than DATASET_VERSION_TTL the next request goes through the endpoints,
+    which read it again.
+    """
+
+    def __init__(self, app: ASGIApp, store: SnapshotStore = snapshot_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        response = None
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "GET"
+            and scope["path"].startswith("/api/")
+        ):
+            response = await self.snapshot_response(Request(scope))
+
+        if response is None:
+            await self.app(scope, receive, send)
+        else:
+            await response(scope, receive, send)
+
+    async def snapshot_response(self, request: Request) -> Response | None:
+        state = peek_dataset_state()
+        if state is None:
+            return None
+        accepted = accepted_encodings(request)
+        if not accepted.intersection(ENCODINGS):
+            return None
+
+        snapshot = await self.store.load(
+            state.version,
+            snapshot_target(
+                request.url.path, request.query_params.multi_items()
+            ),
+        )
+        encoding = next(
+            (
+                encoding
+                for encoding in ENCODINGS
+                if encoding in accepted and f"body:{encoding}" in snapshot
+            ),
+            None,
+        )
+        if encoding is None:
+            return None
+
+        headers = {
+            "ETag": dataset_etag(request, state.version),
+            "Cache-Control": CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        last_modified = snapshot.get("header:last-modified")
+        if last_modified:
+            headers["Last-Modified"] = last_modified.decode()
+        elif state.updated_at:
+            headers["Last-Modified"] = format_http_date(state.updated_at)
+
+        if etag_matches(request, headers["ETag"]) or (
+            "Last-Modified" in headers
+            and not_modified_since(
+                request, parsedate_to_datetime(headers["Last-Modified"])
+            )
+        ):
+            return Response(status_code=304, headers=headers)
+
+        return Response(
+            snapshot[f"body:{encoding}"],
+            media_type=snapshot.get(
+                "header:content-type", b"application/json"
+            ).decode(),
+            headers={**headers, "Content-Encoding": encoding},
+        )
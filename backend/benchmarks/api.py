@@ -0,0 +1,334 @@
+"""
+Latency and throughput of the main API scenarios, served in process by
+the ASGI app against a seeded database.
+
+    python -m benchmarks.api --requests 200 --output results.json
+    python -m benchmarks.api --baseline results.json --threshold 0.15
+
+By default a SQLite copy of the synthetic catalog is seeded (and kept in
+the temporary directory for the next run with the same parameters);
+--database-url points at an async URL of an already seeded database
+instead, e.g. one loaded with commands.seed_synthetic.
+
+Response caches are cleared before every request unless --cache warm is
+given, so query regressions are not hidden by cache hits. With
+--baseline, the run fails when a scenario's p50 or p95 latency grew, or
+its requests per second fell, by more than --threshold.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session, SQLModel, create_engine, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.serialization import clear_caches
+from commands.seed_synthetic import SEED, load_synthetic_catalog
+from database import get_read_session
+from main import app
+from models import Category, CategoryStats, CategoryType, Episode
+from rate_limit import rate_limiter
+
+PAGE_SIZE = 20
+SEARCH_TERM = "guerra"
+# Episodes the detail scenario cycles through
+DETAIL_EPISODES = 100
+# Compared against a baseline, lower is better for latencies and higher
+# for throughput
+COMPARED_METRICS = {"p50_ms": 1, "p95_ms": 1, "rps": -1}
+# Runs are only comparable when these match
+RUN_SETTINGS = (
+    "database",
+    "episodes",
+    "categories",
+    "seed",
+    "concurrency",
+    "cache",
+)
+
+
+def seeded_database(episodes: int, categories: int, seed: int) -> Path:
+    """Path of a SQLite database with the synthetic catalog, reused."""
+    path = (
+        Path(tempfile.gettempdir())
+        / f"benchmark-{seed}-{episodes}-{categories}.db"
+    )
+    if path.exists():
+        return path
+
+    print(f"Seeding {path}...", file=sys.stderr)
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        load_synthetic_catalog(
+            session, episodes=episodes, categories=categories, seed=seed
+        )
+    engine.dispose()
+    return path
+
+
+async def build_scenarios(engine: AsyncEngine) -> dict[str, list[str]]:
+    """
+    URLs requested per scenario, in turn; parameters are taken from the
+    database so the same scenarios work on any seeded catalog.
+    """
+    async with AsyncSession(engine) as session:
+        total = await session.scalar(select(func.count(Episode.id)))
+        top_topics = (
+            await session.exec(
+                select(CategoryStats.category_id)
+                .join(Category, Category.id == CategoryStats.category_id)
+                .where(Category.type == CategoryType.TOPIC)
+                .order_by(CategoryStats.episode_count.desc())
+                .limit(2)
+            )
+        ).all()
+        episode_ids = (
+            await session.exec(
+                select(Episode.id)
+                .order_by(Episode.published_at.desc())
+                .limit(DETAIL_EPISODES)
+            )
+        ).all()
+
+    deep_page = max(1, (total // PAGE_SIZE) * 9 // 10)
+    categories = ",".join(str(id) for id in top_topics)
+    return {
+        "listing": [f"/api/episodes?page=1&size={PAGE_SIZE}"],
+        "deep_page": [f"/api/episodes?page={deep_page}&size={PAGE_SIZE}"],
+        "search": [f"/api/episodes?search={SEARCH_TERM}&size={PAGE_SIZE}"],
+        "multi_category": [
+            f"/api/episodes?categories={categories}&match=all"
+            f"&size={PAGE_SIZE}"
+        ],
+        "categories_by_type": [
+            f"/api/categories?type={type.value}&size=100"
+            for type in CategoryType
+        ],
+        "episode_detail": [f"/api/episodes/{id}" for id in episode_ids],
+    }
+
+
+def percentile(latencies: list[float], percent: int) -> float:
+    if len(latencies) == 1:
+        return latencies[0]
+    return statistics.quantiles(latencies, n=100, method="inclusive")[
+        percent - 1
+    ]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    urls: list[str],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    cold: bool,
+) -> dict:
+    for url in itertools.islice(itertools.cycle(urls), warmup):
+        await client.get(url)
+
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(url: str) -> None:
+        nonlocal errors
+        async with semaphore:
+            if cold:
+                clear_caches()
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            request(url)
+            for url in itertools.islice(itertools.cycle(urls), requests)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    return {
+        "url": urls[0],
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "rps": requests / elapsed,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """The regressions of `results` over `baseline`, as messages."""
+    regressions = []
+    for name, scenario in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        for metric, direction in COMPARED_METRICS.items():
+            if not previous.get(metric):
+                continue
+            change = (scenario[metric] - previous[metric]) / previous[metric]
+            if change * direction > threshold:
+                regressions.append(
+                    f"{name}: {metric} {previous[metric]:.2f} -> "
+                    f"{scenario[metric]:.2f} ({change:+.0%})"
+                )
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.database_url:
+        database_url = args.database_url
+    else:
+        path = seeded_database(args.episodes, args.categories, args.seed)
+        database_url = f"sqlite+aiosqlite:///{path}"
+    engine = create_async_engine(database_url, poolclass=NullPool)
+
+    async def get_session_override():
+        async with AsyncSession(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_read_session] = get_session_override
+    rate_limiter.enabled = False
+    scenarios = await build_scenarios(engine)
+    if args.scenario:
+        scenarios = {name: scenarios[name] for name in args.scenario}
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "episodes": None if args.database_url else args.episodes,
+            "categories": None if args.database_url else args.categories,
+            "seed": None if args.database_url else args.seed,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cache": args.cache,
+        },
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            for name, urls in scenarios.items():
+                results["scenarios"][name] = await run_scenario(
+                    client,
+                    urls,
+                    requests=args.requests,
+                    concurrency=args.concurrency,
+                    warmup=args.warmup,
+                    cold=args.cache == "cold",
+                )
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+    return results
+
+
+def print_results(results: dict) -> None:
+    print(
+        f"{'scenario':<20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'req/s':>9} {'errors':>7}"
+    )
+    for name, scenario in results["scenarios"].items():
+        print(
+            f"{name:<20} {scenario['p50_ms']:>9.2f} "
+            f"{scenario['p95_ms']:>9.2f} {scenario['p99_ms']:>9.2f} "
+            f"{scenario['rps']:>9.1f} {scenario['errors']:>7}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--cache", choices=["cold", "warm"], default="cold")
+    parser.add_argument("--episodes", type=int, default=20_000)
+    parser.add_argument("--categories", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument(
+        "--database-url",
+        help="Async URL of a seeded database, instead of a SQLite copy",
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        help="Run only this scenario (repeatable)",
+    )
+    parser.add_argument(
+        "--output", help="File to write the results to, as JSON"
+    )
+    parser.add_argument(
+        "--baseline", help="Results to compare with, as written by --output"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="Relative change counted as a regression (default: 0.15)",
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        for setting in RUN_SETTINGS:
+            if baseline["meta"].get(setting) != results["meta"][setting]:
+                print(
+                    f"Warning: baseline {setting} was "
+                    f"{baseline['meta'].get(setting)}, "
+                    f"now {results['meta'][setting]}"
+                )
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression over {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Stand-in for the 3Cat API serving pages recorded by commands.record_api,
+so ingestion can be benchmarked and made to fail without the network.
+
+    python -m commands.record_api --pages 50
+    python -m benchmarks.replay_api 3cat-api.ndjson.gz --latency 80 \\
+        --jitter 40 --error-rate 0.05 --page-size 50
+    INGEST_BASE_URL=<printed URL> python -m commands.ingest_data
+
+The recorded episodes are paginated again with --page-size (the recorded
+one by default). Every response waits --latency ms, give or take up to
+--jitter; --error-rate of them fail with a 503 and --malformed-rate are
+cut short, which ingestion sees as invalid JSON. Those draws depend only
+on --seed, the page and how many times it was requested, so a run fails
+the same way whatever the concurrency.
+"""
+
+import argparse
+import gzip
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SEED = 1939
+
+
+def load_archive(path: str) -> tuple[dict, list[dict]]:
+    """The header and the episodes of an archive from commands.record_api."""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        header = json.loads(next(file))
+        return header, [json.loads(line) for line in file]
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Serves the recorded episodes as API pages, from a thread while used as
+    a context manager. `stats` counts the responses by outcome.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        archive: str,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        page_size: int | None = None,
+        latency: float = 0,
+        jitter: float = 0,
+        error_rate: float = 0,
+        malformed_rate: float = 0,
+        seed: int = SEED,
+    ):
+        super().__init__((host, port), ReplayHandler)
+        self.header, self.items = load_archive(archive)
+        self.page_size = page_size or self.header["page_size"] or 1
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self.stats = Counter()
+        self._attempts = Counter()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """The INGEST_BASE_URL reading from this server."""
+        host, port = self.server_address[:2]
+        recorded = urlsplit(self.header["base_url"])
+        return f"http://{host}:{port}{recorded.path}?{recorded.query}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self._thread.join()
+        self.server_close()
+
+    def respond(self, page: int) -> tuple[int, bytes, float]:
+        """Status, body and delay in seconds of a request for `page`."""
+        with self._lock:
+            self._attempts[page] += 1
+            attempt = self._attempts[page]
+        draw = random.Random(f"{self.seed}:{page}:{attempt}")
+        delay = max(0, self.latency + draw.uniform(-self.jitter, self.jitter))
+
+        outcome = draw.random()
+        if outcome < self.error_rate:
+            status, body = 503, b"Service Unavailable"
+            self._count("error")
+        else:
+            body = json.dumps(
+                {"resposta": self.page(page)}, ensure_ascii=False
+            ).encode()
+            status = 200
+            if outcome < self.error_rate + self.malformed_rate:
+                half = len(body) // 2
+                body = body[:half]
+                self._count("malformed")
+            else:
+                self._count("ok")
+        return status, body, delay / 1000
+
+    def page(self, page: int) -> dict:
+        """The `resposta` of a page, empty past the last one."""
+        start = (page - 1) * self.page_size
+        end = start + self.page_size
+        items = self.items[start:end] if page >= 1 else []
+        return {
+            "items": {"item": items},
+            "paginacio": {
+                "total_pagines": math.ceil(len(self.items) / self.page_size),
+                "pagina_actual": page,
+                "items_pagina": self.page_size,
+                "total_items": len(self.items),
+            },
+        }
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server: ReplayServer
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        try:
+            page = int(query.get("pagina", ["1"])[0])
+        except ValueError:
+            self.send_error(400, "Invalid pagina")
+            return
+
+        status, body, delay = self.server.respond(page)
+        time.sleep(delay)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("archive", help="Archive from commands.record_api")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--page-size", type=int, help="Episodes per page (default: recorded)"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0, help="Milliseconds per response"
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0,
+        help="Milliseconds the latency varies by, either way",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0,
+        help="Share of responses failing with a 503",
+    )
+    parser.add_argument(
+        "--malformed-rate",
+        type=float,
+        default=0,
+        help="Share of responses cut short",
+    )
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        args.archive,
+        host=args.host,
+        port=args.port,
+        page_size=args.page_size,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+    print(
+        f"Replaying {len(server.items)} episodes, {server.page_size} per "
+        f"page\nINGEST_BASE_URL={server.base_url}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(", ".join(f"{k}: {v}" for k, v in server.stats.items()))
+
+
+if __name__ == "__main__":
+    main()
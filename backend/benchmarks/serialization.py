@@ -0,0 +1,155 @@
+"""
+Compare the default (pydantic) and fast (orjson from SQL rows) response
+paths of the listing endpoints, in process, against a SQLite copy of a
+synthetic catalog.
+
+    python -m benchmarks.serialization --requests 30
+
+Every request is timed on a cold response cache (the full build) and on a
+warm one (a cache hit). Categories are served 1000 per page; episodes are
+capped at 100 per page by the API.
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import api.endpoints
+from category_index import category_index
+from database import get_read_session
+from main import app
+from models import Category, CategoryType, Episode, EpisodeCategory
+from query_cache import count_cache, facet_cache
+from repositories import CategoriesRepository
+from response_cache import response_cache
+from versioning import reset_dataset_version_cache
+
+URLS = [
+    "/api/categories?type=topic&size=1000",
+    "/api/episodes?size=100",
+]
+
+
+def seed(database_path: Path, episodes: int, categories: int) -> None:
+    engine = create_engine(f"sqlite:///{database_path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(
+            Category(
+                id=id,
+                name=f"Categoria {id}",
+                slug=f"categoria-{id}",
+                type=CategoryType.TOPIC,
+            )
+            for id in range(1, categories + 1)
+        )
+        session.add_all(
+            Episode(
+                id=id,
+                title=f"Episodi {id}",
+                slug=f"episodi-{id}",
+                description="Lorem ipsum dolor sit amet. " * 20,
+                published_at=datetime(2000, 1, 1) + timedelta(days=id),
+            )
+            for id in range(1, episodes + 1)
+        )
+        session.add_all(
+            EpisodeCategory(
+                episode_id=episode_id,
+                category_id=(episode_id * 3 + offset) % categories + 1,
+            )
+            for episode_id in range(1, episodes + 1)
+            for offset in range(3)
+        )
+        session.flush()
+        CategoriesRepository(session).refresh_category_stats()
+        session.commit()
+    engine.dispose()
+
+
+def clear_caches() -> None:
+    reset_dataset_version_cache()
+    count_cache.clear()
+    facet_cache.clear()
+    category_index.clear()
+    response_cache.clear()
+
+
+async def time_requests(
+    client: httpx.AsyncClient, url: str, requests: int
+) -> dict:
+    cold, warm = [], []
+    for _ in range(requests):
+        clear_caches()
+        start = time.perf_counter()
+        response = await client.get(url)
+        cold.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await client.get(url)
+        warm.append(time.perf_counter() - start)
+
+    response.raise_for_status()
+    return {
+        "cold_ms": statistics.median(cold) * 1000,
+        "warm_ms": statistics.median(warm) * 1000,
+        "bytes": len(response.content),
+        "items": len(response.json()["items"]),
+    }
+
+
+async def run(requests: int, episodes: int, categories: int) -> None:
+    database_path = Path(tempfile.mkdtemp()) / "benchmark.db"
+    seed(database_path, episodes, categories)
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool
+    )
+
+    async def get_session_override():
+        async with AsyncSession(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_read_session] = get_session_override
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://benchmark"
+    ) as client:
+        print(
+            f"{'path':<6} {'url':<40} {'items':>6} {'bytes':>9} "
+            f"{'cold ms':>9} {'warm ms':>9}"
+        )
+        for url in URLS:
+            for fast in (False, True):
+                api.endpoints.FAST_JSON = fast
+                result = await time_requests(client, url, requests)
+                print(
+                    f"{'fast' if fast else 'model':<6} {url:<40} "
+                    f"{result['items']:>6} {result['bytes']:>9} "
+                    f"{result['cold_ms']:>9.2f} {result['warm_ms']:>9.2f}"
+                )
+
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--episodes", type=int, default=5000)
+    parser.add_argument("--categories", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.episodes, args.categories))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+from logger import logger
+
+# Positions of the set bits of every byte value, for decoding bitsets
+_BYTE_BITS = [
+    [bit for bit in range(8) if byte >> bit & 1] for byte in range(256)
+]
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    version: int | None
+    # Bit position -> episode id, ascending
+    episode_ids: list[int] = field(default_factory=list)
+    # Category id -> bitset of episode positions
+    bitsets: dict[int, int] = field(default_factory=dict)
+
+
+class CategoryIndex:
+    """
+    In-process inverted index from category id to the episodes linked to
+    it, kept as Python int bitsets over dense episode positions so AND, OR
+    and NOT across categories are single big-int operations.
+
+    The index is rebuilt from `episodecategory` whenever the dataset version
+    moves forward; readers always see a complete snapshot.
+    """
+
+    def __init__(self):
+        self._snapshot = _Snapshot(version=None)
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def is_fresh(self, version: int | None) -> bool:
+        """
+        Whether the index was built for `version` or a newer one. Requests
+        reading from a lagging replica see an older version for a while,
+        and must not make the index flip back and forth.
+        """
+        return (
+            self._loaded
+            and version is not None
+            and self._snapshot.version is not None
+            and self._snapshot.version >= version
+        )
+
+    def ensure_fresh(
+        self,
+        version: int | None,
+        load_links: Callable[[], Iterable[tuple[int, int]]],
+    ) -> None:
+        """
+        Rebuild the index if it was built for an older dataset version.
+        `load_links` returns (episode_id, category_id) pairs. A None
+        version always rebuilds.
+        """
+        if self.is_fresh(version):
+            return
+
+        with self._lock:
+            # Another thread may have rebuilt it while we waited
+            if self.is_fresh(version):
+                return
+            self._snapshot = self._build(version, load_links())
+            self._loaded = True
+
+        logger.info(
+            f"Built category index for dataset version {version}: "
+            f"{len(self._snapshot.bitsets)} categories, "
+            f"{len(self._snapshot.episode_ids)} episodes"
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot = _Snapshot(version=None)
+            self._loaded = False
+
+    def match(
+        self, categories: list[int], mode: str = "any", exclude: list[int] = []
+    ) -> tuple[list[int] | None, list[int]]:
+        """
+        Resolve a category filter to episode ids.
+
+        Returns (episode_ids, excluded_ids): episode_ids lists the episodes
+        to keep, or is None when only exclusions were requested, in which
+        case excluded_ids lists the episodes to drop.
+        """
+        snapshot = self._snapshot
+        excluded = self._union(snapshot, exclude)
+
+        if not categories:
+            return None, self._decode(snapshot, excluded)
+
+        if mode == "all":
+            bits = self._intersection(snapshot, categories)
+        else:
+            bits = self._union(snapshot, categories)
+
+        return self._decode(snapshot, bits & ~excluded), []
+
+    def _build(
+        self, version: int | None, links: Iterable[tuple[int, int]]
+    ) -> _Snapshot:
+        links = list(links)
+        episode_ids = sorted({episode_id for episode_id, _ in links})
+        positions = {episode_id: i for i, episode_id in enumerate(episode_ids)}
+
+        bitsets: dict[int, int] = {}
+        for episode_id, category_id in links:
+            bitsets[category_id] = bitsets.get(category_id, 0) | (
+                1 << positions[episode_id]
+            )
+
+        return _Snapshot(
+            version=version, episode_ids=episode_ids, bitsets=bitsets
+        )
+
+    def _union(self, snapshot: _Snapshot, categories: list[int]) -> int:
+        bits = 0
+        for category_id in categories:
+            bits |= snapshot.bitsets.get(category_id, 0)
+        return bits
+
+    def _intersection(self, snapshot: _Snapshot, categories: list[int]) -> int:
+        # Smallest bitsets first so the result shrinks as fast as possible
+        bitsets = sorted(
+            (
+                snapshot.bitsets.get(category_id, 0)
+                for category_id in categories
+            ),
+            key=int.bit_count,
+        )
+        bits = bitsets[0]
+        for bitset in bitsets[1:]:
+            if not bits:
+                break
+            bits &= bitset
+        return bits
+
+    def _decode(self, snapshot: _Snapshot, bits: int) -> list[int]:
+        episode_ids = []
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        for byte_index, byte in enumerate(data):
+            if byte:
+                base = byte_index * 8
+                episode_ids.extend(
+                    snapshot.episode_ids[base + bit]
+                    for bit in _BYTE_BITS[byte]
+                )
+        return episode_ids
+
+
+category_index = CategoryIndex()
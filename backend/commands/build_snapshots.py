@@ -0,0 +1,32 @@
+import asyncio
+
+from sqlmodel import select
+
+from database import get_session
+from logger import logger
+from models import Episode
+from snapshots import REDIS_URL, render_snapshots
+
+
+def build_snapshots():
+    """
+    Render the most requested API responses for the current dataset
+    version and store them precompressed, for the API to serve as they are.
+    """
+    if not REDIS_URL:
+        logger.info("No REDIS_URL, skipping snapshots")
+        return 0
+
+    with next(get_session()) as session:
+        episode_ids = session.exec(
+            select(Episode.id).order_by(Episode.id)
+        ).all()
+
+    logger.info(f"Rendering snapshots, {len(episode_ids)} episodes")
+    rendered = asyncio.run(render_snapshots(episode_ids))
+    logger.info(f"Stored {rendered} snapshots")
+    return rendered
+
+
+if __name__ == "__main__":
+    build_snapshots()
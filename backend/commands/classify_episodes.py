@@ -1,13 +1,14 @@
 import os
 
 from openai import OpenAI
-from sqlmodel import select
+from sqlmodel import or_, select
 
 from database import get_session
 from logger import logger
 from models import Episode
 from repositories import CategoriesRepository, EpisodesRepository
 from services import ClassificationService
+from versioning import bump_dataset_version
 
 
 def classify_episodes(batch_size: int = 50, max_total: int = None):
@@ -41,7 +42,12 @@ def classify_episodes(batch_size: int = 50, max_total: int = None):
             unclassified = session.exec(
                 select(Episode)
                 .where(Episode.description.isnot(None))
-                .where(~Episode.categories.any())
+                .where(
+                    or_(
+                        ~Episode.categories.any(),
+                        Episode.needs_reclassification,
+                    )
+                )
                 .order_by(Episode.published_at.desc())
                 .limit(current_batch_size)
             ).all()
@@ -80,6 +86,9 @@ def classify_episodes(batch_size: int = 50, max_total: int = None):
                     continue
 
             try:
+                if batch_successful:
+                    categories_repository.refresh_category_stats()
+                    bump_dataset_version(session)
                 session.commit()
                 logger.info(
                     f"Committed batch: {batch_successful} successful, {batch_failed} failed"  # noqa: E501
@@ -0,0 +1,76 @@
+import sys
+
+from database import get_session
+from export import EXPORT_BATCH_SIZE
+from logger import logger
+from repositories import EpisodesRepository
+from services import EpisodesService
+
+
+def export_episodes(
+    output: str | None = None,
+    format: str = "ndjson",
+    compress: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE,
+):
+    """Write every episode with its categories to `output` (or stdout)."""
+
+    logger.info(
+        f"Exporting episodes as {format}{' (gzip)' if compress else ''} "
+        f"to {output or 'stdout'}"
+    )
+
+    with next(get_session()) as session:
+        service = EpisodesService(EpisodesRepository(session))
+        chunks = service.export_episodes(
+            format=format, compress=compress, batch_size=batch_size
+        )
+
+        if output is None:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            with open(output, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+
+    logger.info("Export complete")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Export the episode catalog with its categories"
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="File to write to (default: stdout)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["ndjson", "csv"],
+        default="ndjson",
+        help="Output format (default: ndjson)",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Compress the output with gzip",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=EXPORT_BATCH_SIZE,
+        help=f"Rows per cursor fetch (default: {EXPORT_BATCH_SIZE})",
+    )
+
+    args = parser.parse_args()
+    export_episodes(
+        output=args.output,
+        format=args.format,
+        compress=args.gzip,
+        batch_size=args.batch_size,
+    )
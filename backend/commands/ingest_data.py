@@ -1,26 +1,174 @@
 import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterator
 
 import requests
 
 from database import get_session
 from logger import logger
 from models import IngestionPosition
+from versioning import bump_dataset_version
 
-BASE_URL = (
+if TYPE_CHECKING:
+    from repositories import EpisodesRepository
+    from services import EpisodesService
+
+# Overridable to ingest from a stand-in, such as benchmarks.replay_api
+BASE_URL = os.environ.get("INGEST_BASE_URL") or (
     "https://api.3cat.cat/audios?programaradio_id=944&ordre=-data_publicacio"
 )
+# Pages requested at once after the first, which gives the page count
+INGEST_CONCURRENCY = int(os.environ.get("INGEST_CONCURRENCY", "4"))
+INGEST_RETRIES = int(os.environ.get("INGEST_RETRIES", "3"))
+# Seconds before the first retry of a page, doubled on each next one
+INGEST_RETRY_BACKOFF = float(os.environ.get("INGEST_RETRY_BACKOFF", "1"))
+
+
+def fetch_page(page: int) -> dict:
+    """
+    The `resposta` of an API page, retried with exponential backoff on
+    network, HTTP and decoding errors.
+    """
+    url = f"{BASE_URL}&pagina={page}"
+    for attempt in range(INGEST_RETRIES + 1):
+        try:
+            response = requests.get(url, timeout=30)
+            response.raise_for_status()
+            return response.json().get("resposta", {})
+        except (requests.RequestException, json.JSONDecodeError) as e:
+            if attempt == INGEST_RETRIES:
+                logger.error(f"Failed to fetch or parse page {page}: {e}")
+                raise
+            delay = INGEST_RETRY_BACKOFF * 2**attempt
+            logger.warning(
+                f"Failed to fetch page {page} ({e}), retrying in {delay}s"
+            )
+            time.sleep(delay)
+
+
+def fetch_pages(
+    concurrency: int = INGEST_CONCURRENCY,
+    first_page: int = 1,
+    first: dict | None = None,
+) -> Iterator[tuple[int, dict]]:
+    """
+    The API pages from `first_page` on, in order. The first, unless it was
+    already fetched and is given as `first`, gives the page count; the
+    others are fetched up to `concurrency` at a time ahead of the
+    consumer, and those not started yet are cancelled when it stops early.
+    """
+    if first is None:
+        first = fetch_page(first_page)
+    yield first_page, first
+
+    last_page = total_pages(first)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending = deque()
+    next_page = first_page + 1
+    try:
+        while pending or next_page <= last_page:
+            while next_page <= last_page and len(pending) < concurrency:
+                pending.append(
+                    (next_page, executor.submit(fetch_page, next_page))
+                )
+                next_page += 1
+            page, future = pending.popleft()
+            yield page, future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def total_pages(data: dict) -> int:
+    return (data.get("paginacio") or {}).get("total_pagines", 0)
+
+
+def ingest_page(
+    episodes_repository: "EpisodesRepository",
+    episodes_service: "EpisodesService",
+    items: list[dict],
+    watermark: datetime | None,
+) -> tuple[int, datetime | None, bool]:
+    """
+    Store the episodes of a page that are new or changed upstream, found
+    by comparing content hashes with a single lookup of the page's ids.
+    Returns how many were written, the page's newest publication date and
+    whether the page was already in sync: every episode stored unchanged
+    and published no later than `watermark`.
+    """
+    episodes = [
+        episodes_service.create_episode_from_api_data(item) for item in items
+    ]
+    stored_hashes = episodes_repository.get_episode_content_hashes(
+        [episode.id for episode in episodes]
+    )
+    changed_episodes = [
+        episode
+        for episode in episodes
+        if episode.id not in stored_hashes
+        or stored_hashes[episode.id] != episode.content_hash
+    ]
+    written = (
+        episodes_repository.upsert_episodes(changed_episodes)
+        if changed_episodes
+        else 0
+    )
+    # Episodes stored before content hashes get theirs, but are not news
+    unhashed = {id for id, hash in stored_hashes.items() if hash is None}
+    newest = max(
+        (e.published_at for e in episodes if e.published_at is not None),
+        default=None,
+    )
+    in_sync = (
+        all(episode.id in unhashed for episode in changed_episodes)
+        and watermark is not None
+        and (newest is None or newest <= watermark)
+    )
+    return written, newest, in_sync
+
+
+def resume_backfill(
+    episodes_repository: "EpisodesRepository", page: int
+) -> tuple[int, dict | None]:
+    """
+    Where a backfill stopped before `page` goes on, with that page's data
+    if it was fetched. Pages are newest first, so episodes removed
+    upstream move older ones up: the walk steps back until a page holds
+    stored episodes, and none can be skipped. Page 1 is the head's.
+    """
+    data = None
+    while page > 2:
+        page -= 1
+        data = fetch_page(page)
+        items = data.get("items", {}).get("item", [])
+        if episodes_repository.get_episode_content_hashes(
+            [item["id"] for item in items]
+        ):
+            break
+    return page, data
 
 
 def ingest_data():
     """
-    Ingests episode data from a paginated API.
+    Ingests episode data from a paginated API, newest first.
 
-    Handles initial bulk ingestion and subsequent incremental updates.
-    It processes pages until it finds an episode
-    that has already been ingested, then stops.
+    A run first syncs the head of the archive: it walks pages until one
+    holds only known episodes, all published no later than the watermark
+    of the last run, so reruns only fetch what is new. New and edited
+    episodes are found by comparing each page's content hashes with the
+    stored ones, and only those are written.
 
-    It uses the IngestionPosition model to track the last episode id
-    and the total number of episodes ingested.
+    The whole archive is walked once, after the first page of the first
+    run, as a backfill. Progress is committed after every page, so a
+    failed run loses no work and the next one resumes the backfill where
+    it stopped (see `resume_backfill`). The dataset version is bumped
+    once, at the end of a run that wrote episodes.
+
+    Pages after the first are fetched concurrently (INGEST_CONCURRENCY)
+    but processed in order.
     """
     logger.info("Starting episode ingestion task.")
 
@@ -32,72 +180,81 @@ def ingest_data():
         episodes_service = EpisodesService(episodes_repository)
 
         position = session.get(IngestionPosition, 1) or IngestionPosition(id=1)
+        session.add(position)
 
-        known_last_id = position.last_episode_id
-        newest_id_this_run = None
+        watermark = position.newest_published_at
+        newest_published_at = watermark
+        last_episode_id = position.last_episode_id
+        backfill_page = position.backfill_page
         total_episodes_ingested = 0
-        page = 1
-
-        while True:
-            url = f"{BASE_URL}&pagina={page}"
-            try:
-                response = requests.get(url, timeout=30)
-                response.raise_for_status()
 
-                data = response.json().get("resposta", {})
+        try:
+            for page, data in fetch_pages(INGEST_CONCURRENCY):
                 items = data.get("items", {}).get("item", [])
+                is_last_page = not items or page >= total_pages(data)
+                if page == 1 and items:
+                    last_episode_id = position.last_episode_id = items[0]["id"]
 
-                if not items:
-                    logger.info(f"No more items found on page {page}")
-                    break
-
-            except (
-                requests.RequestException,
-                json.JSONDecodeError,
-                KeyError,
-            ) as e:
-                logger.error(f"Failed to fetch or parse page {page}: {e}")
-                break  # Stop the process on any critical error
-
-            episodes_to_add = []
-            stop_processing = False
-
-            for ep_data in items:
-                if newest_id_this_run is None:
-                    newest_id_this_run = ep_data["id"]
-
-                if ep_data["id"] == known_last_id:
-                    stop_processing = True
-                    break
-
-                episodes_to_add.append(
-                    episodes_service.create_episode_from_api_data(ep_data)
+                written, newest, in_sync = ingest_page(
+                    episodes_repository, episodes_service, items, watermark
                 )
+                total_episodes_ingested += written
+                if newest is not None and (
+                    newest_published_at is None or newest > newest_published_at
+                ):
+                    newest_published_at = newest
 
-            if episodes_to_add:
-                for episode in episodes_to_add:
-                    episodes_repository.save_episode(episode)
-                total_episodes_ingested += len(episodes_to_add)
+                if is_last_page:
+                    logger.info("Reached the final page of the API.")
+                    backfill_page = None
+                elif in_sync:
+                    logger.info("Reached known episodes. Head is up-to-date.")
+                elif watermark is None:
+                    # First run: the rest of the archive is a backfill
+                    backfill_page = 2
+                else:
+                    session.commit()
+                    continue
 
-            if stop_processing:
-                logger.info(
-                    "Found last known episode. Ingestion is up-to-date."
-                )
-                break
-
-            total_pages = data.get("paginacio", {}).get("total_pagines", 0)
-            if page >= total_pages:
-                logger.info("Reached the final page of the API.")
+                # The head is in sync; only then does the watermark move,
+                # so a failed run syncs it again
+                position.newest_published_at = newest_published_at
+                position.backfill_page = backfill_page
+                session.commit()
                 break
 
-            page += 1
+            if backfill_page is not None:
+                backfill_page, first = resume_backfill(
+                    episodes_repository, backfill_page
+                )
+                logger.info(f"Backfilling from page {backfill_page}")
+                for page, data in fetch_pages(
+                    INGEST_CONCURRENCY, first_page=backfill_page, first=first
+                ):
+                    items = data.get("items", {}).get("item", [])
+                    written, _, _ = ingest_page(
+                        episodes_repository, episodes_service, items, None
+                    )
+                    total_episodes_ingested += written
+                    if not items or page >= total_pages(data):
+                        logger.info("Backfill complete.")
+                        position.backfill_page = None
+                        session.commit()
+                        break
+                    position.backfill_page = page + 1
+                    session.commit()
+        except (requests.RequestException, json.JSONDecodeError):
+            # Stop the process on any critical error, logged above; the
+            # pages committed so far are kept
+            session.rollback()
 
-        if newest_id_this_run and newest_id_this_run != known_last_id:
-            position.last_episode_id = newest_id_this_run
-            session.add(position)
+        if total_episodes_ingested:
+            # Once per run, as every bump empties the response caches.
+            # Ingestion adds no category links, so category stats stand.
+            bump_dataset_version(session)
             session.commit()
             logger.info(
-                f"Successfully ingested {total_episodes_ingested} episodes. Last ID set to {newest_id_this_run}."  # noqa: E501
+                f"Successfully ingested {total_episodes_ingested} episodes. Last ID set to {last_episode_id}."  # noqa: E501
             )
         else:
             logger.info("No new episodes were ingested.")
@@ -0,0 +1,75 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+from commands import ingest_data
+from logger import logger
+
+DEFAULT_OUTPUT = "3cat-api.ndjson.gz"
+
+
+def record_api(
+    output: str = DEFAULT_OUTPUT,
+    pages: int | None = None,
+    concurrency: int = ingest_data.INGEST_CONCURRENCY,
+):
+    """
+    Capture the API pages ingestion reads, newest first, into a gzipped
+    archive for benchmarks.replay_api: a header line with where and when
+    they were recorded and the page size, then one line per episode.
+    Stops after `pages` pages when given.
+    """
+    logger.info(f"Recording {ingest_data.BASE_URL} to {output}")
+    recorded_pages = recorded_items = 0
+
+    with gzip.open(output, "wt", encoding="utf-8") as file:
+        for page, data in ingest_data.fetch_pages(concurrency):
+            items = data.get("items", {}).get("item", [])
+            if page == 1:
+                header = {
+                    "base_url": ingest_data.BASE_URL,
+                    "recorded_at": datetime.now(timezone.utc).isoformat(),
+                    "page_size": len(items),
+                }
+                file.write(json.dumps(header) + "\n")
+            for item in items:
+                file.write(json.dumps(item, ensure_ascii=False) + "\n")
+            recorded_pages += 1
+            recorded_items += len(items)
+            if pages is not None and recorded_pages >= pages:
+                break
+
+    logger.info(
+        f"Recorded {recorded_items} episodes from {recorded_pages} pages"
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Record 3Cat API pages for benchmarks.replay_api"
+    )
+    parser.add_argument(
+        "--output",
+        default=DEFAULT_OUTPUT,
+        help=f"Archive to write (default: {DEFAULT_OUTPUT})",
+    )
+    parser.add_argument(
+        "--pages",
+        type=int,
+        default=None,
+        help="Pages to record (default: all)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=ingest_data.INGEST_CONCURRENCY,
+        help="Pages fetched at once "
+        f"(default: {ingest_data.INGEST_CONCURRENCY})",
+    )
+
+    args = parser.parse_args()
+    record_api(
+        output=args.output, pages=args.pages, concurrency=args.concurrency
+    )
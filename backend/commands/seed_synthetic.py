@@ -0,0 +1,674 @@
+import csv
+import functools
+import io
+import itertools
+import random
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator
+
+from slugify import slugify
+from sqlalchemy import Connection, Table, delete, func, select, text
+from sqlmodel import Session
+
+from database import get_session
+from logger import logger
+from models import (
+    Category,
+    CategoryStats,
+    CategoryType,
+    Episode,
+    EpisodeCategory,
+)
+from repositories import CategoriesRepository
+from versioning import bump_dataset_version
+
+SEED = 1939
+DEFAULT_EPISODES = 100_000
+DEFAULT_CATEGORIES = 5_000
+# Rows per COPY or executemany call
+BULK_BATCH_SIZE = 10_000
+# Category popularity follows rank ** -ZIPF_EXPONENT: a few categories tag
+# most episodes and most tag a handful, as classification produces
+ZIPF_EXPONENT = 1.1
+FIRST_PUBLISHED_AT = datetime(2005, 1, 1)
+# Disabled while loading on Postgres, see load_synthetic_catalog
+SEARCH_VECTOR_TRIGGERS = (
+    ("episode", "episode_search_vector_update"),
+    ("episodecategory", "episodecategory_search_vector_update"),
+)
+LAST_PUBLISHED_AT = datetime(2025, 12, 31)
+
+# Share of the categories of each type, and how many of that type an
+# episode is tagged with
+CATEGORY_MIX = {
+    CategoryType.TOPIC: (0.45, (1, 3)),
+    CategoryType.LOCATION: (0.1, (0, 2)),
+    CategoryType.CHARACTER: (0.43, (0, 2)),
+    CategoryType.TIME_PERIOD: (0.02, (1, 2)),
+}
+
+TOPIC_NOUNS = [
+    "Guerra",
+    "Revolució",
+    "Batalla",
+    "Setge",
+    "Conquesta",
+    "Exili",
+    "Revolta",
+    "Tractat",
+    "Crisi",
+    "Imperi",
+    "Regne",
+    "Croada",
+    "Pesta",
+    "Independència",
+    "República",
+    "Dictadura",
+    "Monarquia",
+    "Inquisició",
+    "Reforma",
+    "Expedició",
+]
+TOPIC_COMPLEMENTS = [
+    "de Successió",
+    "dels Segadors",
+    "de Barcelona",
+    "de França",
+    "dels Carlins",
+    "de Catalunya",
+    "d'Aragó",
+    "de Roma",
+    "dels Otomans",
+    "dels Remences",
+    "de Castella",
+    "d'Hispània",
+    "del Rosselló",
+    "de Mallorca",
+    "dels Mongols",
+    "de Bizanci",
+    "de Napoleó",
+    "de la Mediterrània",
+    "de Flandes",
+    "d'Orient",
+]
+TOPIC_QUALIFIERS = [
+    "",
+    " a Catalunya",
+    " a Europa",
+    " i l'Església",
+    " i la noblesa",
+    " i el poble",
+]
+PLACES = [
+    "Barcelona",
+    "Girona",
+    "Lleida",
+    "Tarragona",
+    "València",
+    "Palma",
+    "Perpinyà",
+    "Tortosa",
+    "Vic",
+    "Manresa",
+    "Reus",
+    "Cardona",
+    "Besalú",
+    "Montserrat",
+    "Empúries",
+    "Poblet",
+    "Ripoll",
+    "Alguer",
+    "Nàpols",
+    "Sicília",
+    "Constantinoble",
+    "Roma",
+    "Atenes",
+    "París",
+    "Londres",
+    "Viena",
+    "Lisboa",
+    "Madrid",
+    "Cartago",
+    "Alexandria",
+    "Figueres",
+    "Olot",
+    "Solsona",
+    "Balaguer",
+    "Berga",
+    "Puigcerdà",
+    "Sant Cugat",
+    "Terrassa",
+    "Sabadell",
+    "Mataró",
+    "Igualada",
+    "Valls",
+    "Montblanc",
+    "Morella",
+    "Xàtiva",
+    "Elx",
+    "Alacant",
+    "Maó",
+    "Eivissa",
+    "Andorra",
+]
+PLACE_PREFIXES = [
+    "",
+    "Comtat de ",
+    "Port de ",
+    "Castell de ",
+    "Vall de ",
+    "Monestir de ",
+    "Plaça de ",
+    "Muralles de ",
+    "Catedral de ",
+    "Call de ",
+]
+FIRST_NAMES = [
+    "Jaume",
+    "Pere",
+    "Ramon",
+    "Berenguer",
+    "Alfons",
+    "Joan",
+    "Francesc",
+    "Josep",
+    "Maria",
+    "Elisenda",
+    "Violant",
+    "Ermessenda",
+    "Isabel",
+    "Caterina",
+    "Guifré",
+    "Carles",
+    "Felip",
+    "Antoni",
+    "Teresa",
+    "Margarida",
+]
+SURNAMES = [
+    "Casanova",
+    "Prat",
+    "Macià",
+    "Companys",
+    "Llull",
+    "Vilanova",
+    "Borrell",
+    "Cabrera",
+    "Montcada",
+    "Requesens",
+    "Despuig",
+    "Oliba",
+    "Ferrer",
+    "Puig",
+    "Soler",
+    "Roca",
+    "Serra",
+    "Vidal",
+    "Pujol",
+    "Sala",
+]
+ROMAN_CENTURIES = [
+    "I",
+    "II",
+    "III",
+    "IV",
+    "V",
+    "VI",
+    "VII",
+    "VIII",
+    "IX",
+    "X",
+    "XI",
+    "XII",
+    "XIII",
+    "XIV",
+    "XV",
+    "XVI",
+    "XVII",
+    "XVIII",
+    "XIX",
+    "XX",
+    "XXI",
+]
+ERAS = [
+    "Prehistòria",
+    "Antiguitat",
+    "Edat Mitjana",
+    "Baixa Edat Mitjana",
+    "Renaixement",
+    "Antic Règim",
+    "Il·lustració",
+    "Restauració",
+    "Segona República",
+    "Franquisme",
+    "Transició",
+]
+CENTURY_PARTS = [
+    "Segle ",
+    "Inicis del segle ",
+    "Finals del segle ",
+    "Primera meitat del segle ",
+    "Segona meitat del segle ",
+]
+
+TITLE_TEMPLATES = [
+    "{topic}",
+    "{topic} a {place}",
+    "{character} i {topic}",
+    "{place}, {period}",
+    "{topic}: {character}",
+    "{character} a {place}",
+]
+DESCRIPTION_SENTENCES = [
+    "Parlem de {topic} amb {character} com a fil conductor.",
+    "Viatgem a {place} per entendre com s'hi va viure {topic}.",
+    "Un episodi sobre {period} i les seves conseqüències a {place}.",
+    "L'historiador convidat repassa les causes i els efectes de {topic}.",
+    "{character} va marcar una època que encara avui desperta debat.",
+    "Les fonts de l'època ens ajuden a reconstruir què va passar a {place}.",
+    "Expliquem per què {period} va canviar la manera de viure dels catalans.",
+]
+
+
+# "de Empúries" is written "d'Empúries"
+ELISION = re.compile(r"\bde (?=[AEIOUÀÈÉÍÒÓÚ])")
+
+
+def _names(rng: random.Random, parts: list[list[str]], count: int) -> list:
+    """
+    `count` distinct names joined from one of each of `parts`, in a seeded
+    order; once every combination is used they repeat with a number.
+    """
+    combinations = [
+        ELISION.sub("d'", "".join(p)) for p in itertools.product(*parts)
+    ]
+    rng.shuffle(combinations)
+    return [
+        combinations[i % len(combinations)]
+        + (f" {i // len(combinations) + 1}" if i >= len(combinations) else "")
+        for i in range(count)
+    ]
+
+
+# Titles repeat across episodes, their slugs need not be recomputed
+_slugify = functools.lru_cache(maxsize=65536)(slugify)
+
+
+def _batched(rows: Iterable, size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, size)):
+        yield batch
+
+
+class SyntheticCatalog:
+    """
+    A deterministic catalog of `episodes` episodes tagged with `categories`
+    categories, generated from `seed`: Catalan titles and descriptions
+    built from the episode's own categories, dates spread over twenty
+    years with ids growing with them, as the 3Cat API assigns them.
+    """
+
+    def __init__(
+        self,
+        episodes: int = DEFAULT_EPISODES,
+        categories: int = DEFAULT_CATEGORIES,
+        seed: int = SEED,
+        first_episode_id: int = 1,
+        first_category_id: int = 1,
+    ):
+        self.episodes = episodes
+        self.seed = seed
+        self.first_episode_id = first_episode_id
+        rng = random.Random(seed)
+
+        names = {
+            CategoryType.TOPIC: [
+                [f"{n} " for n in TOPIC_NOUNS],
+                TOPIC_COMPLEMENTS,
+                TOPIC_QUALIFIERS,
+            ],
+            CategoryType.LOCATION: [PLACE_PREFIXES, PLACES],
+            CategoryType.CHARACTER: [
+                [f"{n} " for n in FIRST_NAMES],
+                SURNAMES,
+                ["", *(f" i {s}" for s in SURNAMES)],
+            ],
+            CategoryType.TIME_PERIOD: [
+                [
+                    *(p + c for p in CENTURY_PARTS for c in ROMAN_CENTURIES),
+                    *ERAS,
+                ]
+            ],
+        }
+        # (id, name, slug, type) per category, and per type the ids by
+        # popularity rank
+        self.categories: list[tuple] = []
+        self.ranked: dict[CategoryType, tuple[list[int], list[float]]] = {}
+        category_id = first_category_id
+        for type, (share, _) in CATEGORY_MIX.items():
+            ids = []
+            for name in _names(
+                rng, names[type], max(1, round(categories * share))
+            ):
+                self.categories.append(
+                    (category_id, name, slugify(name), type)
+                )
+                ids.append(category_id)
+                category_id += 1
+            weights = itertools.accumulate(
+                (rank + 1) ** -ZIPF_EXPONENT for rank in range(len(ids))
+            )
+            self.ranked[type] = (ids, list(weights))
+        self._names_by_id = {row[0]: row[1] for row in self.categories}
+
+    def rows(self) -> Iterator[tuple[tuple, list[tuple]]]:
+        """
+        Per episode, its (id, title, slug, description, published_at,
+        updated_at) row and its (episode_id, category_id) links.
+        """
+        rng = random.Random(self.seed + 1)
+        span = LAST_PUBLISHED_AT - FIRST_PUBLISHED_AT
+        for index in range(self.episodes):
+            id = self.first_episode_id + index
+            tags = {}
+            for type, (_, (low, high)) in CATEGORY_MIX.items():
+                ids, weights = self.ranked[type]
+                # Repeated draws collapse, so popular categories win twice
+                drawn = rng.choices(
+                    ids, cum_weights=weights, k=rng.randint(low, high)
+                )
+                tags[type] = list(dict.fromkeys(drawn))
+
+            words = {
+                "topic": self._name(tags, CategoryType.TOPIC, rng)
+                or rng.choice(TOPIC_NOUNS),
+                "place": self._name(tags, CategoryType.LOCATION, rng)
+                or rng.choice(PLACES),
+                "character": self._name(tags, CategoryType.CHARACTER, rng)
+                or f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}",
+                "period": self._name(tags, CategoryType.TIME_PERIOD, rng)
+                or rng.choice(ERAS),
+            }
+            title = rng.choice(TITLE_TEMPLATES).format(**words)
+            description = " ".join(
+                sentence.format(**words)
+                for sentence in rng.sample(
+                    DESCRIPTION_SENTENCES, rng.randint(2, 4)
+                )
+            )
+            published_at = FIRST_PUBLISHED_AT + span * (index / self.episodes)
+            published_at = published_at.replace(
+                hour=rng.randint(6, 23), minute=0, second=0, microsecond=0
+            )
+            episode = (
+                id,
+                title,
+                f"{_slugify(title)}-{id}",
+                description,
+                published_at,
+                published_at + timedelta(days=1),
+            )
+            links = [
+                (id, category_id)
+                for category_ids in tags.values()
+                for category_id in category_ids
+            ]
+            yield episode, links
+
+    def _name(
+        self, tags: dict, type: CategoryType, rng: random.Random
+    ) -> str | None:
+        if not tags[type]:
+            return None
+        return self._names_by_id[rng.choice(tags[type])]
+
+
+def bulk_insert(
+    connection: Connection, table: Table, columns: list[str], rows: list
+) -> None:
+    """
+    Insert `rows` (tuples in `columns` order) in one statement: COPY on
+    Postgres, executemany elsewhere.
+    """
+    if connection.dialect.name != "postgresql":
+        connection.execute(
+            table.insert(), [dict(zip(columns, row)) for row in rows]
+        )
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # Enums are stored by name; None is an unquoted empty field, NULL
+        writer.writerow(
+            value.name if isinstance(value, CategoryType) else value
+            for value in row
+        )
+    buffer.seek(0)
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def load_synthetic_catalog(
+    session: Session,
+    episodes: int = DEFAULT_EPISODES,
+    categories: int = DEFAULT_CATEGORIES,
+    seed: int = SEED,
+    replace: bool = False,
+    batch_size: int = BULK_BATCH_SIZE,
+) -> tuple[int, int]:
+    """
+    Load a synthetic catalog through `session`, bypassing the ORM, and
+    commit it. Rows are added after the existing ones unless `replace`
+    empties the catalog first. Returns the categories and the category
+    links loaded.
+
+    On Postgres the search vector triggers are disabled for the load, in
+    the same transaction so a failed load leaves them enabled, and the
+    vectors of the new episodes are built once at the end.
+    """
+    connection = session.connection()
+    is_postgres = connection.dialect.name == "postgresql"
+
+    if replace:
+        if is_postgres:
+            connection.execute(
+                text(
+                    "TRUNCATE episodecategory, categorystats, "
+                    "episode, category"
+                )
+            )
+        else:
+            for model in (
+                EpisodeCategory,
+                CategoryStats,
+                Episode,
+                Category,
+            ):
+                connection.execute(delete(model))
+
+    catalog = SyntheticCatalog(
+        episodes=episodes,
+        categories=categories,
+        seed=seed,
+        first_episode_id=(connection.scalar(select(func.max(Episode.id))) or 0)
+        + 1,
+        first_category_id=(
+            connection.scalar(select(func.max(Category.id))) or 0
+        )
+        + 1,
+    )
+    if is_postgres:
+        # Per-row search vector triggers would update every episode once
+        # per link; the vectors are built once after the load instead
+        for table, trigger in SEARCH_VECTOR_TRIGGERS:
+            connection.execute(
+                text(f"ALTER TABLE {table} DISABLE TRIGGER {trigger}")
+            )
+
+    # Appended categories must not take the slug of an existing one
+    existing_slugs = set(connection.scalars(select(Category.slug)))
+    category_rows = [
+        row for row in catalog.categories if row[2] not in existing_slugs
+    ]
+    kept = {row[0] for row in category_rows}
+    for batch in _batched(category_rows, batch_size):
+        bulk_insert(
+            connection,
+            Category.__table__,
+            ["id", "name", "slug", "type"],
+            batch,
+        )
+
+    total_links = 0
+    for batch in _batched(catalog.rows(), batch_size):
+        bulk_insert(
+            connection,
+            Episode.__table__,
+            [
+                "id",
+                "title",
+                "slug",
+                "description",
+                "published_at",
+                "updated_at",
+            ],
+            [episode for episode, _ in batch],
+        )
+        links = [
+            link
+            for _, episode_links in batch
+            for link in episode_links
+            if link[1] in kept
+        ]
+        if links:
+            bulk_insert(
+                connection,
+                EpisodeCategory.__table__,
+                ["episode_id", "category_id"],
+                links,
+            )
+        total_links += len(links)
+
+    if is_postgres:
+        for table, trigger in SEARCH_VECTOR_TRIGGERS:
+            connection.execute(
+                text(f"ALTER TABLE {table} ENABLE TRIGGER {trigger}")
+            )
+        connection.execute(
+            text(
+                "UPDATE episode "
+                "SET search_vector = episode_search_vector(id, title, "
+                "description) WHERE id >= :first_id"
+            ),
+            {"first_id": catalog.first_episode_id},
+        )
+        # Explicit ids leave the sequences behind
+        for table in ("episode", "category"):
+            connection.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', "
+                    f"'id'), (SELECT max(id) FROM {table}))"
+                )
+            )
+
+    CategoriesRepository(session).refresh_category_stats()
+    bump_dataset_version(session)
+    session.commit()
+
+    if is_postgres:
+        # Fresh statistics, so query plans reflect the new size
+        connection = session.connection()
+        connection.execute(text("ANALYZE episode, category, episodecategory"))
+        session.commit()
+
+    return len(category_rows), total_links
+
+
+def seed_synthetic(
+    episodes: int = DEFAULT_EPISODES,
+    categories: int = DEFAULT_CATEGORIES,
+    seed: int = SEED,
+    replace: bool = False,
+    batch_size: int = BULK_BATCH_SIZE,
+) -> int:
+    """
+    Load a synthetic catalog for performance work and return the number
+    of category links.
+    """
+    logger.info(
+        f"Seeding {episodes} synthetic episodes with {categories} "
+        f"categories (seed {seed})"
+    )
+    start = time.perf_counter()
+
+    with next(get_session()) as session:
+        loaded_categories, links = load_synthetic_catalog(
+            session,
+            episodes=episodes,
+            categories=categories,
+            seed=seed,
+            replace=replace,
+            batch_size=batch_size,
+        )
+
+    logger.info(
+        f"Seeded {episodes} episodes, {loaded_categories} categories and "
+        f"{links} links in {time.perf_counter() - start:.1f}s"
+    )
+    return links
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Load a synthetic catalog for performance work"
+    )
+    parser.add_argument(
+        "--episodes",
+        type=int,
+        default=DEFAULT_EPISODES,
+        help=f"Episodes to generate (default: {DEFAULT_EPISODES})",
+    )
+    parser.add_argument(
+        "--categories",
+        type=int,
+        default=DEFAULT_CATEGORIES,
+        help=f"Categories to generate (default: {DEFAULT_CATEGORIES})",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=SEED,
+        help=f"Random seed (default: {SEED})",
+    )
+    parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="Delete every episode and category first",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BULK_BATCH_SIZE,
+        help=f"Rows per bulk insert (default: {BULK_BATCH_SIZE})",
+    )
+
+    args = parser.parse_args()
+    seed_synthetic(
+        episodes=args.episodes,
+        categories=args.categories,
+        seed=args.seed,
+        replace=args.replace,
+        batch_size=args.batch_size,
+    )
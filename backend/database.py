@@ -1,22 +1,260 @@
 import os
+import time
+from contextvars import ContextVar
+from typing import Any
 
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from metrics import Counter, Gauge, Histogram, registry
+from replicas import ReplicaRouter, RoutingSession
 
 PGUSER = os.environ.get("PGUSER")
 PGPASSWORD = os.environ.get("PGPASSWORD")
 PGHOST = os.environ.get("PGHOST")
 PGPORT = os.environ.get("PGPORT", "5432")
 PGDATABASE = os.environ.get("PGDATABASE")
+# Read replicas for the public API, as comma-separated host[:port]; they
+# share the primary's credentials and database name
+PGREPLICA_HOSTS = [
+    host.strip()
+    for host in os.environ.get("PGREPLICA_HOSTS", "").split(",")
+    if host.strip()
+]
+REPLICA_MAX_LAG = float(os.environ.get("REPLICA_MAX_LAG", "30"))
+REPLICA_CHECK_INTERVAL = float(os.environ.get("REPLICA_CHECK_INTERVAL", "5"))
 
 DATABASE_URL = f"postgresql+psycopg2://{PGUSER}:{PGPASSWORD}@{PGHOST}:{PGPORT}/{PGDATABASE}"  # noqa: E501
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{PGUSER}:{PGPASSWORD}@{PGHOST}:{PGPORT}/{PGDATABASE}"  # noqa: E501
 
 is_debug = os.environ.get("BUILD_ENVIRONMENT") == "local"
 
-engine = create_engine(DATABASE_URL, echo=is_debug, hide_parameters=True)
+# Each role gets its own pool, so a burst of slow public searches cannot
+# take the connections the admin panel or the worker need. Every value can
+# be overridden with DB_<ROLE>_<SETTING>, e.g. DB_API_POOL_SIZE=20.
+# Statement timeouts are in milliseconds, 0 disables them.
+POOL_DEFAULTS = {
+    "api": {
+        "pool_size": 10,
+        "max_overflow": 10,
+        "pool_timeout": 5,
+        "statement_timeout": 5000,
+    },
+    "worker": {
+        "pool_size": 2,
+        "max_overflow": 2,
+        "pool_timeout": 30,
+        "statement_timeout": 0,
+    },
+    "admin": {
+        "pool_size": 2,
+        "max_overflow": 3,
+        "pool_timeout": 10,
+        "statement_timeout": 30000,
+    },
+}
+# Recycle connections before proxies or Postgres drop idle ones
+POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+
+pool_checkout_wait = registry.register(
+    Histogram(
+        "db_pool_checkout_wait_seconds",
+        "Time spent waiting for a pooled connection",
+        ("role",),
+    )
+)
+db_queries = registry.register(
+    Counter("db_queries_total", "SQL statements executed", ("role",))
+)
+db_query_seconds = registry.register(
+    Histogram(
+        "db_query_duration_seconds", "Duration of SQL statements", ("role",)
+    )
+)
+
+# Statements and seconds spent in them by the current request, when the
+# metrics middleware is tracking one
+request_db_usage: ContextVar[list | None] = ContextVar(
+    "request_db_usage", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(
+    connection, cursor, statement, parameters, context, executemany
+):
+    context._metrics_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(
+    connection, cursor, statement, parameters, context, executemany
+):
+    elapsed = time.perf_counter() - context._metrics_started_at
+    role = connection.engine.pool.logging_name or "default"
+    db_queries.inc(1, role)
+    db_query_seconds.observe(elapsed, role)
+
+    usage = request_db_usage.get()
+    if usage is not None:
+        usage[0] += 1
+        usage[1] += elapsed
+
+
+def pool_settings(role: str) -> dict[str, int]:
+    """Pool settings of a role, with DB_<ROLE>_<SETTING> overrides."""
+    return {
+        name: int(os.environ.get(f"DB_{role}_{name}".upper(), default))
+        for name, default in POOL_DEFAULTS[role].items()
+    }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool recording checkout waits under its logging name (role)."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_checkout_wait.observe(
+                time.perf_counter() - start, self.logging_name or "default"
+            )
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options(role: str, is_async: bool) -> dict[str, Any]:
+    settings = pool_settings(role)
+    statement_timeout = settings.pop("statement_timeout")
+
+    connect_args = {}
+    if statement_timeout:
+        if is_async:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(statement_timeout)
+            }
+        else:
+            connect_args["options"] = (
+                f"-c statement_timeout={statement_timeout}"
+            )
+
+    return {
+        **settings,
+        "poolclass": (
+            InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool
+        ),
+        "pool_logging_name": role,
+        "pool_pre_ping": POOL_PRE_PING,
+        "pool_recycle": POOL_RECYCLE,
+        "connect_args": connect_args,
+        "echo": is_debug,
+        "hide_parameters": True,
+    }
+
+
+# Celery commands
+engine = create_engine(DATABASE_URL, **_engine_options("worker", False))
 
 SessionLocal = sessionmaker(autocommit=False, bind=engine, class_=Session)
 
+# The admin panel
+admin_engine = create_engine(DATABASE_URL, **_engine_options("admin", False))
+
+# The public API, so waiting on Postgres does not hold a worker thread
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **_engine_options("api", True)
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+# Replicas for the public reads, pooled like the API
+replica_engines = [
+    create_async_engine(
+        f"postgresql+asyncpg://{PGUSER}:{PGPASSWORD}@{host}"
+        f"{'' if ':' in host else ':' + PGPORT}/{PGDATABASE}",
+        **{
+            **_engine_options("api", True),
+            "pool_logging_name": f"replica{number}",
+        },
+    )
+    for number, host in enumerate(PGREPLICA_HOSTS)
+]
+
+replica_router = ReplicaRouter(
+    primary=async_engine,
+    replicas=replica_engines,
+    max_lag=REPLICA_MAX_LAG,
+    check_interval=REPLICA_CHECK_INTERVAL,
+)
+
+ReadSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
+)
+
+engines_by_role: dict[str, Engine] = {
+    "api": async_engine.sync_engine,
+    "worker": engine,
+    "admin": admin_engine,
+    **{
+        f"replica{number}": replica_engine.sync_engine
+        for number, replica_engine in enumerate(replica_engines)
+    },
+}
+
+
+def pool_stats() -> dict[str, dict]:
+    """Current usage of every pool, plus checkout waits so far."""
+    waits = pool_checkout_wait.snapshot()
+    stats = {}
+    for role, role_engine in engines_by_role.items():
+        pool = role_engine.pool
+        wait = waits.get((role,), {"buckets": {}, "sum": 0.0, "count": 0})
+        stats[role] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "checked_in": pool.checkedin(),
+            "wait_seconds": {
+                "count": wait["count"],
+                "sum": round(wait["sum"], 6),
+                "buckets": {
+                    str(bound): count
+                    for bound, count in wait["buckets"].items()
+                },
+            },
+        }
+    return stats
+
+
+def _pool_gauge(stat: str) -> Gauge:
+    return registry.register(
+        Gauge(
+            f"db_pool_{stat}",
+            f"Connections {stat.replace('_', ' ')} per pool",
+            ("role",),
+            lambda: {
+                (role,): stats[stat] for role, stats in pool_stats().items()
+            },
+        )
+    )
+
+
+for _stat in ("size", "checked_out", "overflow", "checked_in"):
+    _pool_gauge(_stat)
+
 
 def get_session():
     db = SessionLocal()
@@ -24,3 +262,20 @@ def get_session():
         yield db
     finally:
         db.close()
+
+
+async def get_async_session():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_session():
+    """
+    Session for the public read endpoints: queries go to a read replica
+    when one is in rotation, writes still reach the primary.
+    """
+    read_engine = await replica_router.read_engine()
+    async with ReadSessionLocal(
+        info={"read_engine": read_engine.sync_engine}
+    ) as db:
+        yield db
@@ -1,39 +1,63 @@
 from fastapi import Depends
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from database import get_session
+from category_index import category_index
+from database import get_read_session
 from repositories import (
-    CategoriesRepository,
-    EpisodesRepository,
-    ICategoriesRepository,
-    IEpisodesRepository,
+    AsyncCategoriesRepository,
+    AsyncEpisodesRepository,
+    IAsyncCategoriesRepository,
+    IAsyncEpisodesRepository,
 )
-from services import CategoriesService, EpisodesService
+from services import AsyncCategoriesService, AsyncEpisodesService
+from versioning import DatasetState, get_dataset_state_async
+
+
+async def get_current_dataset_state(
+    session: AsyncSession = Depends(get_read_session),
+) -> DatasetState:
+    """Dependency provider for the current dataset version and date."""
+    return await get_dataset_state_async(session)
+
+
+def get_current_dataset_version(
+    state: DatasetState = Depends(get_current_dataset_state),
+) -> int:
+    """Dependency provider for the current dataset version."""
+    return state.version
 
 
 def get_episodes_repository(
-    session: Session = Depends(get_session),
-) -> IEpisodesRepository:
-    """Dependency provider for the EpisodesRepository."""
-    return EpisodesRepository(session=session)
+    session: AsyncSession = Depends(get_read_session),
+) -> IAsyncEpisodesRepository:
+    """Dependency provider for the AsyncEpisodesRepository."""
+    return AsyncEpisodesRepository(session=session)
 
 
 def get_episodes_service(
-    repo: IEpisodesRepository = Depends(get_episodes_repository),
-) -> EpisodesService:
-    """Dependency provider for the EpisodesService."""
-    return EpisodesService(episodes_repository=repo)
+    repo: IAsyncEpisodesRepository = Depends(get_episodes_repository),
+    dataset_version: int = Depends(get_current_dataset_version),
+) -> AsyncEpisodesService:
+    """Dependency provider for the AsyncEpisodesService."""
+    return AsyncEpisodesService(
+        episodes_repository=repo,
+        dataset_version=dataset_version,
+        category_index=category_index,
+    )
 
 
 def get_categories_repository(
-    session: Session = Depends(get_session),
-) -> ICategoriesRepository:
-    """Dependency provider for the CategoriesRepository."""
-    return CategoriesRepository(session=session)
+    session: AsyncSession = Depends(get_read_session),
+) -> IAsyncCategoriesRepository:
+    """Dependency provider for the AsyncCategoriesRepository."""
+    return AsyncCategoriesRepository(session=session)
 
 
 def get_categories_service(
-    repo: ICategoriesRepository = Depends(get_categories_repository),
-) -> CategoriesService:
-    """Dependency provider for the CategoriesService."""
-    return CategoriesService(categories_repository=repo)
+    repo: IAsyncCategoriesRepository = Depends(get_categories_repository),
+    dataset_version: int = Depends(get_current_dataset_version),
+) -> AsyncCategoriesService:
+    """Dependency provider for the AsyncCategoriesService."""
+    return AsyncCategoriesService(
+        categories_repository=repo, dataset_version=dataset_version
+    )
@@ -0,0 +1,101 @@
+import csv
+import io
+import zlib
+from typing import Sequence
+
+import orjson
+
+from models import CategoryType
+
+# Media type of each export format
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Rows fetched per round trip of the server-side cursor, and encoded per
+# chunk of the stream
+EXPORT_BATCH_SIZE = 1000
+
+EPISODE_COLUMNS = ("id", "title", "slug", "description", "published_at")
+
+# CSV has no nesting: one column per category type, names joined by this
+CSV_CATEGORY_SEPARATOR = " | "
+
+
+class EpisodeExportWriter:
+    """
+    Encodes batches of export rows (the episode columns, then their
+    categories as a JSON array built in SQL) as NDJSON lines or CSV records,
+    gzip-compressed on the fly if asked. Only the current batch is held in
+    memory, whatever the size of the catalog.
+    """
+
+    def __init__(self, format: str = "ndjson", compress: bool = False):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{format}'")
+        self.format = format
+        # wbits=31 writes a gzip header and trailer around the deflate data
+        self._compressor = (
+            zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        )
+
+    def start(self) -> bytes:
+        if self.format == "csv":
+            return self._output(
+                self._csv_records(
+                    [
+                        (
+                            *EPISODE_COLUMNS,
+                            *(type.value for type in CategoryType),
+                        )
+                    ]
+                )
+            )
+        return self._output(b"")
+
+    def write(self, rows: Sequence[tuple]) -> bytes:
+        if self.format == "csv":
+            return self._output(
+                self._csv_records(self._csv_row(row) for row in rows)
+            )
+        return self._output(b"".join(self._ndjson_line(row) for row in rows))
+
+    def finish(self) -> bytes:
+        if self._compressor is None:
+            return b""
+        return self._compressor.flush()
+
+    def _ndjson_line(self, row: tuple) -> bytes:
+        *columns, categories = row
+        # The categories are JSON already, spliced in without a round trip
+        episode = orjson.dumps(dict(zip(EPISODE_COLUMNS, columns)))
+        return (
+            episode[:-1]
+            + b',"categories":'
+            + (categories or "[]").encode()
+            + b"}\n"
+        )
+
+    def _csv_row(self, row: tuple) -> tuple:
+        *columns, categories = row
+        names = {type.value: [] for type in CategoryType}
+        for category in orjson.loads(categories or "[]"):
+            if category["type"] in names:
+                names[category["type"]].append(category["name"])
+        published_at = columns[-1]
+        return (
+            *columns[:-1],
+            published_at.isoformat() if published_at else "",
+            *(CSV_CATEGORY_SEPARATOR.join(names[type]) for type in names),
+        )
+
+    def _csv_records(self, records) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(records)
+        return buffer.getvalue().encode()
+
+    def _output(self, data: bytes) -> bytes:
+        if self._compressor is None:
+            return data
+        return self._compressor.compress(data)
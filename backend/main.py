@@ -1,42 +1,65 @@
 import os
+import secrets
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi_pagination import add_pagination
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
 from sqladmin import Admin
 
 from admin import AdminAuth
 from api.endpoints import router as api_router
-from database import engine
+from api.metrics import MetricsMiddleware
+from api.rate_limit import RateLimitMiddleware
+from api.snapshots import SnapshotMiddleware
+from category_index import category_index
+from database import SessionLocal, admin_engine, async_engine
+from logger import logger
+from metrics import registry
 from models import CategoryAdmin, EpisodeAdmin
+from repositories import EpisodesRepository
+from versioning import get_dataset_version
 
 ADMIN_PATH = os.environ.get("ADMIN_PATH", "/admin")
 ADMIN_SECRET_KEY = os.environ.get("ADMIN_SECRET_KEY")
 ORIGINS = os.environ.get("ALLOWED_ORIGINS", "*").split(",")
+# Bearer token for /metrics, which is disabled without one
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+# Serve the snapshots rendered after each ingestion when a request matches
+SNAPSHOTS = os.environ.get("API_SNAPSHOTS", "false").lower() == "true"
 
 
-def get_cloudflare_ip(request: Request):
-    """Cloudflare's standard header for the real client IP"""
-    return request.headers.get("cf-connecting-ip") or request.client.host
+def warm_category_index():
+    """Build the category index before the first filtered request."""
+    try:
+        with SessionLocal() as session:
+            category_index.ensure_fresh(
+                get_dataset_version(session),
+                EpisodesRepository(session).get_episode_category_links,
+            )
+    except Exception as e:
+        logger.warning(f"Could not build the category index at startup: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_category_index()
+    yield
+    await async_engine.dispose()
 
 
-limiter = Limiter(key_func=get_cloudflare_ip, default_limits=["300/minute"])
 app = FastAPI(
     docs_url="/api/docs",
     redoc_url=None,
+    lifespan=lifespan,
 )
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 authentication_backend = AdminAuth(secret_key=ADMIN_SECRET_KEY)
 admin = Admin(
     app=app,
-    engine=engine,
+    engine=admin_engine,
     authentication_backend=authentication_backend,
     base_url=ADMIN_PATH,
     templates_dir=str(Path(__file__).parent / "templates"),
@@ -45,7 +68,10 @@ admin = Admin(
 admin.add_view(EpisodeAdmin)
 admin.add_view(CategoryAdmin)
 
-app.add_middleware(SlowAPIMiddleware)
+if SNAPSHOTS:
+    # Inside the rate limiter, which still applies to snapshot hits
+    app.add_middleware(SnapshotMiddleware)
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ORIGINS,
@@ -53,6 +79,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so latencies include every other middleware
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(api_router, prefix="/api")
 add_pagination(app)
@@ -62,3 +90,19 @@ add_pagination(app)
 async def health_check():
     """Health check endpoint for Railway and Cloudflare."""
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(authorization: str | None = Header(None)):
+    """Every metric in the Prometheus text format, for the scraper."""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404)
+    if not authorization or not secrets.compare_digest(
+        authorization, f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(
+            status_code=401, headers={"WWW-Authenticate": "Bearer"}
+        )
+    return PlainTextResponse(
+        registry.exposition(), media_type="text/plain; version=0.0.4"
+    )
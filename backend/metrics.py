@@ -0,0 +1,288 @@
+import bisect
+import json
+import os
+import threading
+from typing import Callable
+
+import redis
+
+from logger import logger
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+# Seconds; suits both pool checkout waits and request latencies
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _cumulative(
+    buckets: tuple[float, ...], counts: list[int], total: float, count: int
+) -> dict:
+    cumulative, running = {}, 0
+    for bound, bucket_count in zip((*buckets, float("inf")), counts):
+        running += bucket_count
+        cumulative[bound] = running
+    return {"buckets": cumulative, "sum": total, "count": count}
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, as Prometheus expects it, labelled by a
+    tuple of label values.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (plus +Inf), sum, count
+                series = self._series[labels] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                    0,
+                ]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> dict[tuple, dict]:
+        """
+        Per label values: cumulative counts per upper bound, sum and count.
+        """
+        with self._lock:
+            series = {
+                labels: (list(counts), total, count)
+                for labels, (counts, total, count) in self._series.items()
+            }
+        return {
+            labels: _cumulative(self.buckets, *values)
+            for labels, values in series.items()
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class SharedHistogram(Histogram):
+    """
+    Histogram kept in Redis, for observations made in another process (the
+    Celery worker) but exposed by the API. Without Redis, or while it is
+    failing, observations are dropped and the snapshot is empty.
+    """
+
+    def __init__(self, *args, redis_url: str | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.redis_url = redis_url
+        self._redis: redis.Redis | None = None
+
+    def observe(self, value: float, *labels: str) -> None:
+        client = self._client()
+        if client is None:
+            return
+        key = f"metrics:{self.name}:{json.dumps(labels)}"
+        try:
+            pipeline = client.pipeline()
+            pipeline.hincrby(
+                key, str(bisect.bisect_left(self.buckets, value)), 1
+            )
+            pipeline.hincrbyfloat(key, "sum", value)
+            pipeline.hincrby(key, "count", 1)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Metrics: could not record {self.name}: {e}")
+
+    def snapshot(self) -> dict[tuple, dict]:
+        client = self._client()
+        if client is None:
+            return {}
+        prefix = f"metrics:{self.name}:"
+        snapshot = {}
+        try:
+            for key in client.scan_iter(match=f"{prefix}*"):
+                fields = client.hgetall(key)
+                labels = tuple(json.loads(key.decode().removeprefix(prefix)))
+                counts = [
+                    int(fields.get(str(index).encode(), 0))
+                    for index in range(len(self.buckets) + 1)
+                ]
+                snapshot[labels] = _cumulative(
+                    self.buckets,
+                    counts,
+                    float(fields.get(b"sum", 0)),
+                    int(fields.get(b"count", 0)),
+                )
+        except redis.RedisError as e:
+            logger.warning(f"Metrics: could not read {self.name}: {e}")
+        return snapshot
+
+    def clear(self) -> None:
+        client = self._client()
+        if client is not None:
+            for key in client.scan_iter(match=f"metrics:{self.name}:*"):
+                client.delete(key)
+
+    def _client(self) -> redis.Redis | None:
+        if not self.redis_url:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(
+                self.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5
+            )
+        return self._redis
+
+
+class Counter:
+    """Monotonic counter labelled by a tuple of label values."""
+
+    type = "counter"
+
+    def __init__(
+        self, name: str, description: str, label_names: tuple[str, ...] = ()
+    ):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self) -> dict[tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge:
+    """Values read when exposed, from `collect` (label values -> value)."""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: tuple[str, ...],
+        collect: Callable[[], dict[tuple, float]],
+    ):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.collect = collect
+
+    def snapshot(self) -> dict[tuple, float]:
+        return self.collect()
+
+
+class CollectedCounter(Gauge):
+    """Counter kept elsewhere, read when exposed from `collect`."""
+
+    type = "counter"
+
+
+class Registry:
+    """The metrics exposed together, in registration order."""
+
+    def __init__(self):
+        self.metrics: list[Histogram | Counter | Gauge] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def exposition(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            snapshot = metric.snapshot()
+            for labels, value in sorted(snapshot.items()):
+                pairs = list(zip(metric.label_names, labels))
+                if metric.type != "histogram":
+                    lines.append(
+                        f"{metric.name}{_labels(pairs)} {_number(value)}"
+                    )
+                    continue
+                for bound, count in value["buckets"].items():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(
+                        f"{metric.name}_bucket"
+                        f"{_labels([*pairs, ('le', le)])} {count}"
+                    )
+                lines.append(
+                    f"{metric.name}_sum{_labels(pairs)} "
+                    f"{_number(value['sum'])}"
+                )
+                lines.append(
+                    f"{metric.name}_count{_labels(pairs)} {value['count']}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    escaped = (
+        (
+            name,
+            str(value)
+            .replace("\\", r"\\")
+            .replace('"', r"\"")
+            .replace("\n", r"\n"),
+        )
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+# Observed by the Celery worker, exposed by the API
+celery_task_duration = registry.register(
+    SharedHistogram(
+        "celery_task_duration_seconds",
+        "Duration of Celery tasks",
+        ("task", "state"),
+        buckets=(1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 1800.0, 3600.0),
+        redis_url=REDIS_URL,
+    )
+)
@@ -1,4 +1,5 @@
 import hashlib
+import json
 from datetime import datetime, timezone
 from enum import Enum
 from typing import Any, Callable
@@ -6,8 +7,16 @@ from typing import Any, Callable
 from fastapi import Request
 from slugify import slugify
 from sqladmin import ModelView
-from sqlalchemy import Select
-from sqlmodel import TEXT, Column, DateTime, Field, Relationship, SQLModel
+from sqlalchemy import Index, Select, false, update
+from sqlmodel import (
+    TEXT,
+    Column,
+    DateTime,
+    Field,
+    Relationship,
+    SQLModel,
+    select,
+)
 
 
 class EpisodeCategory(SQLModel, table=True):
@@ -51,6 +60,23 @@ class Category(SQLModel, table=True):
         return slugify(name)
 
 
+class CategoryStats(SQLModel, table=True):
+    """
+    Per-category episode statistics, recomputed after every catalog change
+    so listing categories does not aggregate episodecategory per request.
+    """
+
+    category_id: int | None = Field(
+        default=None,
+        foreign_key="category.id",
+        primary_key=True,
+        ondelete="CASCADE",
+    )
+    episode_count: int = Field(default=0, index=True)
+    first_published_at: datetime | None = None
+    last_published_at: datetime | None = None
+
+
 class EpisodeBase(SQLModel):
     id: int
     title: str
@@ -63,12 +89,51 @@ class EpisodeWithCategories(EpisodeBase):
     categories: list[CategoryBase] = []
 
 
+class EpisodeListItem(SQLModel):
+    """
+    Episode in a listing. With `fields=` only the requested fields are
+    present, otherwise all of them are.
+    """
+
+    id: int
+    title: str | None = None
+    slug: str | None = None
+    description: str | None = None
+    published_at: datetime | None = None
+    categories: list[CategoryBase] | None = None
+
+
+class CategoryFacet(CategoryBase):
+    count: int
+
+
+class EpisodeFacets(SQLModel):
+    total: int
+    facets: dict[CategoryType, list[CategoryFacet]]
+
+
 class Episode(SQLModel, table=True):
+    # Keyset pagination walks (published_at, id) in both directions
+    __table_args__ = (
+        Index("ix_episode_published_at_id", "published_at", "id"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     title: str = Field(index=True)
     slug: str | None = None
     description: str | None = Field(default=None, sa_column=Column(TEXT))
-    published_at: datetime | None = Field(default=None, index=True)
+    published_at: datetime | None = None
+    updated_at: datetime | None = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column_kwargs={"onupdate": lambda: datetime.now(timezone.utc)},
+    )
+    # Digest of the ingested fields, so re-ingesting unchanged episodes
+    # writes nothing
+    content_hash: str | None = Field(default=None, max_length=64)
+    # Set when an upstream edit changed the text the categories came from
+    needs_reclassification: bool = Field(
+        default=False, sa_column_kwargs={"server_default": false()}
+    )
 
     categories: list[Category] = Relationship(
         back_populates="episodes",
@@ -82,16 +147,54 @@ class Episode(SQLModel, table=True):
     def __str__(self) -> str:
         return self.title
 
+    @staticmethod
+    def compute_content_hash(
+        title: str | None,
+        slug: str | None,
+        description: str | None,
+        published_at: datetime | None,
+    ) -> str:
+        content = [
+            title,
+            slug,
+            description,
+            published_at.isoformat() if published_at else None,
+        ]
+        return hashlib.sha256(
+            json.dumps(content, ensure_ascii=False).encode()
+        ).hexdigest()
+
 
 class IngestionPosition(SQLModel, table=True):
+    """
+    Progress of the 3Cat ingestion: the newest episode and publication
+    date seen when the head of the archive was last in sync, and the next
+    page of an unfinished backfill of the whole archive.
+    """
+
     id: int | None = Field(default=1, primary_key=True)
     last_episode_id: int | None = None
+    newest_published_at: datetime | None = None
+    backfill_page: int | None = None
     updated_at: datetime | None = Field(
         default_factory=lambda: datetime.now(timezone.utc),
         sa_column=Column(DateTime, onupdate=datetime.now(timezone.utc)),
     )
 
 
+class DatasetVersion(SQLModel, table=True):
+    """
+    Single row bumped whenever the public catalog changes, so caches keyed
+    by it are invalidated across processes.
+    """
+
+    id: int | None = Field(default=1, primary_key=True)
+    version: int = Field(default=0)
+    updated_at: datetime | None = Field(
+        default_factory=lambda: datetime.now(timezone.utc)
+    )
+
+
 class Users(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     username: str = Field(unique=True, index=True)
@@ -115,8 +218,74 @@ class Users(SQLModel, table=True):
         return self.username
 
 
+class DatasetVersionAdminMixin:
+    """
+    Refresh category statistics and bump the dataset version after every
+    admin write, touching the episodes it changed so their Last-Modified
+    moves: the edited episode, or every episode linked to the edited
+    category before or after the change.
+    """
+
+    async def on_model_change(
+        self, data: dict, model: Any, is_created: bool, request: Request
+    ) -> None:
+        if isinstance(model, Category) and not is_created:
+            request.state.linked_episode_ids = self._linked_episode_ids(
+                model.id
+            )
+
+    async def after_model_change(
+        self, data: dict, model: Any, is_created: bool, request: Request
+    ) -> None:
+        if isinstance(model, Episode):
+            touched_episode_ids = {model.id}
+        else:
+            touched_episode_ids = {
+                *getattr(request.state, "linked_episode_ids", ()),
+                *self._linked_episode_ids(model.id),
+            }
+        self._bump_dataset_version(touched_episode_ids)
+
+    async def on_model_delete(self, model: Any, request: Request) -> None:
+        # The links go with the category
+        if isinstance(model, Category):
+            request.state.linked_episode_ids = self._linked_episode_ids(
+                model.id
+            )
+
+    async def after_model_delete(self, model: Any, request: Request) -> None:
+        self._bump_dataset_version(
+            set(getattr(request.state, "linked_episode_ids", ()))
+        )
+
+    def _linked_episode_ids(self, category_id: int) -> list[int]:
+        with self.session_maker() as session:
+            return session.exec(
+                select(EpisodeCategory.episode_id).where(
+                    EpisodeCategory.category_id == category_id
+                )
+            ).all()
+
+    def _bump_dataset_version(
+        self, touched_episode_ids: set[int] = frozenset()
+    ) -> None:
+        from repositories import CategoriesRepository
+        from versioning import bump_dataset_version
+
+        with self.session_maker() as session:
+            if touched_episode_ids:
+                session.exec(
+                    update(Episode)
+                    .where(Episode.id.in_(touched_episode_ids))
+                    .values(updated_at=datetime.now(timezone.utc))
+                )
+            CategoriesRepository(session).refresh_category_stats()
+            bump_dataset_version(session)
+            session.commit()
+
+
 # Admin view
-class EpisodeAdmin(ModelView, model=Episode):
+class EpisodeAdmin(DatasetVersionAdminMixin, ModelView, model=Episode):
     name_plural = "Episodis"
     can_create = False
     can_edit = True
@@ -216,7 +385,7 @@ class CategoryWithoutEpisodesFilter:
         return query
 
 
-class CategoryAdmin(ModelView, model=Category):
+class CategoryAdmin(DatasetVersionAdminMixin, ModelView, model=Category):
     name_plural = "Categories"
     can_create = True
     can_edit = True
@@ -267,8 +436,6 @@ class CategoryAdmin(ModelView, model=Category):
         name = (data.get("name") or getattr(model, "name", "")).strip()
         if name:
             slug = Category.slugify_name(name)
-            from sqlmodel import select
-
             with self.session_maker() as session:
                 existing = (
                     session.execute(
@@ -287,3 +454,5 @@ class CategoryAdmin(ModelView, model=Category):
                     )
 
             data["slug"] = slug
+
+        await super().on_model_change(data, model, is_created, request)
@@ -0,0 +1,113 @@
+import base64
+import json
+import math
+from datetime import datetime
+from typing import Awaitable, Callable, Generic, TypeVar
+
+import orjson
+from fastapi_pagination import create_page, resolve_params
+from fastapi_pagination.bases import AbstractPage
+from pydantic import BaseModel
+from sqlalchemy import Select
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+    total: int | None = None
+
+
+def encode_cursor(published_at: datetime | None, id: int) -> str:
+    """Encode the keyset position of an episode as an opaque cursor."""
+    position = [published_at.isoformat() if published_at else None, id]
+    payload = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime | None, int]:
+    """
+    Decode a cursor produced by `encode_cursor`.
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = base64.urlsafe_b64decode(cursor + padding)
+        published_at, id = json.loads(payload)
+        return (
+            datetime.fromisoformat(published_at) if published_at else None,
+            int(id),
+        )
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor '{cursor}'") from e
+
+
+def paginate_with_total(
+    session: Session, query: Select, total: int
+) -> AbstractPage:
+    """
+    Same page as fastapi_pagination's `paginate`, but with a total the
+    caller already knows (usually cached) instead of a count query.
+    """
+    params = resolve_params()
+    raw_params = params.to_raw_params().as_limit_offset()
+    items = session.exec(
+        query.limit(raw_params.limit).offset(raw_params.offset)
+    ).all()
+    return create_page(items, total=total, params=params)
+
+
+async def paginate_with_total_async(
+    session: AsyncSession,
+    query: Select,
+    total: int,
+    transformer: Callable[[list], Awaitable[list]] | None = None,
+) -> AbstractPage:
+    """
+    Async version of `paginate_with_total`. `transformer` maps the rows
+    of the page to its items.
+    """
+    params = resolve_params()
+    raw_params = params.to_raw_params().as_limit_offset()
+    result = await session.exec(
+        query.limit(raw_params.limit).offset(raw_params.offset)
+    )
+    items = result.all()
+    if transformer is not None:
+        items = await transformer(items)
+    return create_page(items, total=total, params=params)
+
+
+async def paginate_to_json(
+    session: AsyncSession,
+    query: Select,
+    total: int,
+    transformer: Callable[[list], Awaitable[list[dict]]] | None = None,
+) -> bytes:
+    """
+    The JSON of the page `paginate_with_total_async` would build, encoded
+    straight from the rows without going through pydantic models.
+    `transformer` maps the rows to item dicts.
+    """
+    params = resolve_params()
+    raw_params = params.to_raw_params().as_limit_offset()
+    result = await session.exec(
+        query.limit(raw_params.limit).offset(raw_params.offset)
+    )
+    rows = result.all()
+    if transformer is not None:
+        items = await transformer(rows)
+    else:
+        items = [row._asdict() for row in rows]
+    return orjson.dumps(
+        {
+            "items": items,
+            "total": total,
+            "page": params.page,
+            "size": params.size,
+            "pages": math.ceil(total / params.size) if params.size else None,
+        }
+    )
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+MISSING = object()
+
+
+class QueryCache:
+    """
+    Bounded LRU of query results such as listing totals and facet counts.
+
+    Keys start with the dataset version, so a bump makes every stale entry
+    unreachable and they age out of the LRU on their own. With a `ttl`,
+    entries also expire after that many seconds.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float | None, Any]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """Cached value for `key`, or MISSING."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        result = self.get(key)
+        if result is MISSING:
+            result = compute()
+            self.set(key, result)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = QueryCache()
+facet_cache = QueryCache(max_entries=512)
+
+
+def normalize_search(search: str | None) -> str:
+    """Collapse case and whitespace so equivalent searches share a key."""
+    return " ".join((search or "").lower().split())
@@ -0,0 +1,232 @@
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+import redis
+import redis.asyncio
+
+from logger import logger
+from metrics import CollectedCounter, registry
+from query_cache import MISSING, QueryCache
+
+REDIS_URL = os.environ.get("REDIS_URL")
+# Share of a bucket a process takes from Redis at once and spends locally,
+# so most requests skip the round trip. Leases unused for LEASE_TTL seconds
+# are dropped, which can only make the limit slightly stricter.
+RATE_LIMIT_LEASE_FRACTION = float(
+    os.environ.get("RATE_LIMIT_LEASE_FRACTION", "0.05")
+)
+RATE_LIMIT_LEASE_TTL = float(os.environ.get("RATE_LIMIT_LEASE_TTL", "1"))
+RATE_LIMIT_MAX_ENTRIES = int(os.environ.get("RATE_LIMIT_MAX_ENTRIES", "10000"))
+
+KEY_PREFIX = "ratelimit:"
+# After a Redis error, buckets are kept in process for this many seconds
+REDIS_RETRY_AFTER = 30.0
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Refills the bucket for the time elapsed since its last use, then grants
+# up to the requested tokens. Redis' clock is used, so every API process
+# agrees on it. Returns the tokens granted and, when none were, the
+# seconds until one is available.
+TOKEN_BUCKET_SCRIPT = """
+redis.replicate_commands()
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+redis.call("HSET", KEYS[1], "tokens", tokens, "ts", now)
+redis.call(
+    "PEXPIRE", KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000
+)
+local retry_after = 0
+if granted == 0 then
+    retry_after = (1 - tokens) / rate
+end
+return {granted, tostring(retry_after)}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """`amount` requests per `period` seconds, in bursts of up to `amount`."""
+
+    name: str
+    amount: int
+    period: int
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "RateLimit":
+        """Parse a limit written as slowapi did, e.g. '300/minute'."""
+        amount, _, period = spec.partition("/")
+        return cls(name, int(amount), PERIODS[period.strip()])
+
+    @property
+    def rate(self) -> float:
+        """Tokens refilled per second."""
+        return self.amount / self.period
+
+    def __str__(self) -> str:
+        period = next(
+            name for name, seconds in PERIODS.items() if seconds == self.period
+        )
+        return f"{self.amount} per 1 {period}"
+
+
+class _LocalBucket:
+    def __init__(self, capacity: int):
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def take(self, limit: RateLimit, requested: int) -> tuple[int, float]:
+        # Same arithmetic as TOKEN_BUCKET_SCRIPT
+        now = time.monotonic()
+        self.tokens = min(
+            limit.amount,
+            self.tokens + max(0.0, now - self.updated_at) * limit.rate,
+        )
+        self.updated_at = now
+        granted = min(requested, int(self.tokens))
+        self.tokens -= granted
+        retry_after = (1 - self.tokens) / limit.rate if not granted else 0.0
+        return granted, retry_after
+
+
+class RateLimiter:
+    """
+    Token buckets shared by every API process through Redis, one atomic
+    script call per refill.
+
+    Each process leases a few tokens per bucket at a time and spends them
+    without asking Redis again, and remembers denied keys until their
+    retry time, so a request usually costs a dictionary lookup. Without a
+    Redis URL, or while Redis is failing, buckets are kept in process.
+    """
+
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        lease_fraction: float = RATE_LIMIT_LEASE_FRACTION,
+        lease_ttl: float = RATE_LIMIT_LEASE_TTL,
+        max_entries: int = RATE_LIMIT_MAX_ENTRIES,
+    ):
+        self.redis_url = redis_url
+        self.lease_fraction = lease_fraction
+        self.enabled = True
+        self.counters: Counter[str] = Counter()
+        self._leases = QueryCache(max_entries=max_entries, ttl=lease_ttl)
+        self._blocked_until = QueryCache(max_entries=max_entries)
+        self._local_buckets = QueryCache(max_entries=max_entries)
+        self._redis: redis.asyncio.Redis | None = None
+        self._script = None
+        self._redis_down_until = 0.0
+
+    async def hit(self, key: str, limit: RateLimit) -> float | None:
+        """
+        Count a request against `key`'s bucket. Returns None if it is
+        allowed, otherwise the seconds until it would be.
+        """
+        now = time.monotonic()
+        blocked_until = self._blocked_until.get(key)
+        if blocked_until is not MISSING and blocked_until > now:
+            self.counters["denied"] += 1
+            return blocked_until - now
+
+        lease = self._leases.get(key)
+        if lease is not MISSING and lease[0] > 0:
+            lease[0] -= 1
+            self.counters["leased"] += 1
+            return None
+
+        size = max(1, int(limit.amount * self.lease_fraction))
+        granted, retry_after = await self._take(key, limit, size)
+        if not granted:
+            self._blocked_until.set(key, now + retry_after)
+            self.counters["denied"] += 1
+            return retry_after
+
+        self._leases.set(key, [granted - 1])
+        return None
+
+    def stats(self) -> dict:
+        stats = {
+            name: self.counters[name]
+            for name in (
+                "leased",
+                "redis_calls",
+                "local",
+                "denied",
+                "redis_errors",
+            )
+        }
+        stats["redis"] = self._client() is not None
+        return stats
+
+    def clear(self) -> None:
+        """Forget every bucket and lease of this process."""
+        self._leases.clear()
+        self._blocked_until.clear()
+        self._local_buckets.clear()
+        self.counters.clear()
+
+    async def _take(
+        self, key: str, limit: RateLimit, requested: int
+    ) -> tuple[int, float]:
+        client = self._client()
+        if client is not None:
+            try:
+                granted, retry_after = await self._script(
+                    keys=[f"{KEY_PREFIX}{key}"],
+                    args=[limit.rate, limit.amount, requested],
+                    client=client,
+                )
+                self.counters["redis_calls"] += 1
+                return int(granted), float(retry_after)
+            except redis.RedisError as e:
+                logger.warning(f"Rate limiter: Redis unavailable: {e}")
+                self.counters["redis_errors"] += 1
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+        bucket = self._local_buckets.get(key)
+        if bucket is MISSING:
+            bucket = _LocalBucket(limit.amount)
+            self._local_buckets.set(key, bucket)
+        self.counters["local"] += 1
+        return bucket.take(limit, requested)
+
+    def _client(self) -> redis.asyncio.Redis | None:
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            self._redis = redis.asyncio.Redis.from_url(
+                self.redis_url,
+                socket_timeout=0.25,
+                socket_connect_timeout=0.25,
+            )
+            # EVALSHA, loading the script on first use
+            self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+        return self._redis
+
+
+rate_limiter = RateLimiter(redis_url=REDIS_URL)
+
+registry.register(
+    CollectedCounter(
+        "rate_limiter_events_total",
+        "Rate limiter decisions by where they were made, and Redis errors",
+        ("event",),
+        lambda: {
+            (event,): count
+            for event, count in rate_limiter.stats().items()
+            if event != "redis"
+        },
+    )
+)
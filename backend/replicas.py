@@ -0,0 +1,120 @@
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from sqlalchemy import Delete, Insert, Update, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session
+
+from logger import logger
+
+# Zero when the replica has replayed everything it received, otherwise the
+# age of the last replayed transaction. A primary always reports zero.
+REPLICATION_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+            OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+        THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """
+)
+
+
+async def measure_replication_lag(engine: AsyncEngine) -> float:
+    async with engine.connect() as connection:
+        result = await connection.execute(REPLICATION_LAG_SQL)
+        return float(result.scalar_one())
+
+
+@dataclass
+class _Replica:
+    engine: AsyncEngine
+    healthy: bool = True
+    lag: float | None = None
+    next_check_at: float = 0.0
+
+
+class ReplicaRouter:
+    """
+    Picks the engine for a read-only session: the replicas in turn, skipping
+    those lagging more than `max_lag` seconds or failing their lag check,
+    and the primary when no replica qualifies.
+
+    Lag is measured at most once every `check_interval` seconds per
+    replica, by whichever request finds the last measure stale.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: list[AsyncEngine],
+        max_lag: float = 30.0,
+        check_interval: float = 5.0,
+        measure_lag: Callable[
+            [AsyncEngine], Awaitable[float]
+        ] = measure_replication_lag,
+    ):
+        self.primary = primary
+        self.replicas = [_Replica(engine) for engine in replicas]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.measure_lag = measure_lag
+        self._turns = itertools.cycle(range(len(self.replicas)))
+
+    async def read_engine(self) -> AsyncEngine:
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._turns)]
+            if await self._is_usable(replica):
+                return replica.engine
+        return self.primary
+
+    def status(self) -> list[dict]:
+        return [
+            {"healthy": replica.healthy, "lag_seconds": replica.lag}
+            for replica in self.replicas
+        ]
+
+    async def _is_usable(self, replica: _Replica) -> bool:
+        now = time.monotonic()
+        if now >= replica.next_check_at:
+            # Claimed before awaiting, so concurrent requests don't recheck
+            replica.next_check_at = now + self.check_interval
+            try:
+                replica.lag = await self.measure_lag(replica.engine)
+                healthy = replica.lag <= self.max_lag
+            except Exception as e:
+                logger.warning(f"Replica lag check failed: {e}")
+                replica.lag = None
+                healthy = False
+
+            if healthy != replica.healthy:
+                state = "back in rotation" if healthy else "out of rotation"
+                logger.warning(
+                    f"Replica {replica.engine.url.host} {state} "
+                    f"(lag: {replica.lag})"
+                )
+            replica.healthy = healthy
+
+        return replica.healthy
+
+
+class RoutingSession(Session):
+    """
+    Session reading from the engine chosen for it (`info["read_engine"]`)
+    but sending every write, and anything flushed, to its primary bind.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        read_engine = self.info.get("read_engine")
+        if (
+            read_engine is None
+            or self._flushing
+            or isinstance(clause, (Insert, Update, Delete))
+        ):
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        return read_engine
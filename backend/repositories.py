@@ -1,10 +1,66 @@
+import re
 from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Iterator
 
-from sqlalchemy import Select
+import sqlalchemy as sa
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    Select,
+    any_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    literal_column,
+    or_,
+    text,
+    tuple_,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import (
+    ARRAY,
+    TSVECTOR,
+    aggregate_order_by,
+)
 from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from models import Category, CategoryType, Episode, EpisodeCategory
+from models import (
+    Category,
+    CategoryStats,
+    CategoryType,
+    Episode,
+    EpisodeCategory,
+)
+
+# Text search configuration created by the full-text search migration:
+# unaccented words, stemmed with the Catalan snowball stemmer when the
+# server ships it.
+SEARCH_CONFIG = "catalan_unaccent"
+
+# Episodes per INSERT ... ON CONFLICT statement, well under the bound
+# parameter limits of both Postgres and SQLite
+UPSERT_BATCH_SIZE = 500
+# Ingested columns, covered by the episode's content hash
+EPISODE_CONTENT_COLUMNS = ("title", "slug", "description", "published_at")
+# The ones categories are derived from
+CLASSIFIED_COLUMNS = ("title", "description")
+
+# Maintained by database triggers, so it is not mapped on the Episode model
+# and never loaded along with it.
+episode_search_vector = literal_column("episode.search_vector", type_=TSVECTOR)
+
+
+def build_prefix_tsquery(search: str) -> str:
+    """
+    Turn free text into a `to_tsquery` expression matching every word as a
+    prefix, so results update while the user is still typing.
+    """
+    terms = re.findall(r"\w+", search)
+    return " & ".join(f"{term}:*" for term in terms)
 
 
 class ICategoriesRepository(ABC):
@@ -13,7 +69,19 @@ class ICategoriesRepository(ABC):
         pass
 
     @abstractmethod
-    def get_categories_query(self, type: CategoryType) -> Select:
+    def get_categories_query(
+        self, type: CategoryType, order: str = "name", min_episodes: int = 1
+    ) -> Select:
+        pass
+
+    @abstractmethod
+    def count_categories(
+        self, type: CategoryType, min_episodes: int = 1
+    ) -> int:
+        pass
+
+    @abstractmethod
+    def refresh_category_stats(self) -> None:
         pass
 
     @abstractmethod
@@ -27,18 +95,95 @@ class ICategoriesRepository(ABC):
         pass
 
 
-class CategoriesRepository(ICategoriesRepository):
+class CategoriesQueries:
+    """Statements shared by the sync and async categories repositories."""
+
+    def get_categories_query(
+        self, type: CategoryType, order: str = "name", min_episodes: int = 1
+    ) -> Select:
+        return self._list_categories(
+            select(Category), type, order, min_episodes
+        )
+
+    def get_category_rows_query(
+        self, type: CategoryType, order: str = "name", min_episodes: int = 1
+    ) -> Select:
+        """Same listing as rows of the category columns, without entities."""
+        return self._list_categories(
+            sa.select(
+                Category.id, Category.slug, Category.name, Category.type
+            ),
+            type,
+            order,
+            min_episodes,
+        )
+
+    def _list_categories(
+        self,
+        query: Select,
+        type: CategoryType,
+        order: str = "name",
+        min_episodes: int = 1,
+    ) -> Select:
+        query = query.join(
+            CategoryStats, CategoryStats.category_id == Category.id
+        ).where(
+            Category.type == type,
+            CategoryStats.episode_count >= max(min_episodes, 1),
+        )
+
+        if order == "popularity":
+            return query.order_by(
+                CategoryStats.episode_count.desc(), Category.name
+            )
+        return query.order_by(Category.name)
+
+    def _count_categories_query(
+        self, type: CategoryType, min_episodes: int = 1
+    ) -> Select:
+        query = self.get_categories_query(
+            type=type, min_episodes=min_episodes
+        ).order_by(None)
+        return select(func.count()).select_from(query.subquery())
+
+
+class CategoriesRepository(CategoriesQueries, ICategoriesRepository):
     def __init__(self, session: Session):
         self.db_session = session
 
     def get_all_categories(self) -> list[Category]:
         return self.db_session.exec(select(Category)).all()
 
-    def get_categories_query(self, type: CategoryType) -> Select:
-        return (
-            select(Category)
-            .where(Category.type == type, Category.episodes.any())
-            .order_by(Category.name)
+    def count_categories(
+        self, type: CategoryType, min_episodes: int = 1
+    ) -> int:
+        return self.db_session.exec(
+            self._count_categories_query(type, min_episodes)
+        ).one()
+
+    def refresh_category_stats(self) -> None:
+        """
+        Recompute CategoryStats from episodecategory in the current
+        transaction, so readers switch to the new figures on commit.
+        """
+        self.db_session.exec(delete(CategoryStats))
+        self.db_session.exec(
+            insert(CategoryStats).from_select(
+                [
+                    "category_id",
+                    "episode_count",
+                    "first_published_at",
+                    "last_published_at",
+                ],
+                select(
+                    EpisodeCategory.category_id,
+                    func.count(EpisodeCategory.episode_id),
+                    func.min(Episode.published_at),
+                    func.max(Episode.published_at),
+                )
+                .join(Episode, Episode.id == EpisodeCategory.episode_id)
+                .group_by(EpisodeCategory.category_id),
+            )
         )
 
     def get_or_create_category(
@@ -69,6 +214,41 @@ class CategoriesRepository(ICategoriesRepository):
             return None
 
 
+class IAsyncCategoriesRepository(ABC):
+    """Read side of the categories repository, for the async API."""
+
+    @abstractmethod
+    def get_categories_query(
+        self, type: CategoryType, order: str = "name", min_episodes: int = 1
+    ) -> Select:
+        pass
+
+    @abstractmethod
+    def get_category_rows_query(
+        self, type: CategoryType, order: str = "name", min_episodes: int = 1
+    ) -> Select:
+        pass
+
+    @abstractmethod
+    async def count_categories(
+        self, type: CategoryType, min_episodes: int = 1
+    ) -> int:
+        pass
+
+
+class AsyncCategoriesRepository(CategoriesQueries, IAsyncCategoriesRepository):
+    def __init__(self, session: AsyncSession):
+        self.db_session = session
+
+    async def count_categories(
+        self, type: CategoryType, min_episodes: int = 1
+    ) -> int:
+        result = await self.db_session.exec(
+            self._count_categories_query(type, min_episodes)
+        )
+        return result.one()
+
+
 class IEpisodesRepository(ABC):
     @abstractmethod
     def get_episode_by_id(self, id: int) -> Episode | None:
@@ -78,52 +258,557 @@ class IEpisodesRepository(ABC):
     def get_episodes_query(self, search: str | None, order: str) -> Select:
         pass
 
+    @abstractmethod
+    def get_episodes_after(
+        self,
+        search: str | None,
+        order: str,
+        after: tuple[datetime | None, int] | None,
+        limit: int,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> list[Episode]:
+        pass
+
+    @abstractmethod
+    def count_episodes(
+        self,
+        search: str | None,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> int:
+        pass
+
+    @abstractmethod
+    def get_episode_category_links(self) -> list[tuple[int, int]]:
+        pass
+
+    @abstractmethod
+    def get_categories_for_episodes(
+        self, episode_ids: list[int]
+    ) -> list[tuple]:
+        pass
+
+    @abstractmethod
+    def get_category_facets(
+        self,
+        search: str | None,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> list[tuple]:
+        pass
+
+    @abstractmethod
+    def estimate_episodes_count(self) -> int | None:
+        pass
+
+    @abstractmethod
+    def stream_export_rows(self, batch_size: int) -> Iterator[list[tuple]]:
+        pass
+
     @abstractmethod
     def save_episode(self, episode: Episode) -> Episode:
         pass
 
+    @abstractmethod
+    def get_episode_content_hashes(
+        self, ids: list[int]
+    ) -> dict[int, str | None]:
+        pass
+
+    @abstractmethod
+    def upsert_episodes(self, episodes: list[Episode]) -> int:
+        pass
+
     @abstractmethod
     def link_episode_to_category(
         self, episode_id: int, category_id: int
     ) -> None:
         pass
 
+    @abstractmethod
+    def unlink_episode_categories(self, episode_id: int) -> None:
+        pass
 
-class EpisodesRepository(IEpisodesRepository):
-    def __init__(self, session: Session):
-        self.db_session = session
+
+class EpisodesQueries:
+    """
+    Statements shared by the sync and async episodes repositories, which
+    only differ in how they execute them.
+    """
+
+    db_session: Session | AsyncSession
 
     def get_episodes_query(
-        self, search: str | None, order: str, categories: list[int] = []
+        self,
+        search: str | None,
+        order: str,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+        columns: list[str] | None = None,
     ) -> Select:
-        query = select(Episode).options(selectinload(Episode.categories))
-
-        if search and search.strip():
-            search_term = f"%{search.strip()}%"
-            query = query.where(Episode.title.ilike(search_term))
+        """
+        Episodes listing as ORM entities with their categories, or, given
+        `columns`, as rows of the id and those Episode columns only.
+        """
+        if columns is None:
+            query = select(Episode).options(selectinload(Episode.categories))
+        else:
+            # Rows even for a single column, unlike sqlmodel's select
+            query = sa.select(
+                Episode.id, *(getattr(Episode, column) for column in columns)
+            )
+        query, ts_query = self._filter_episodes(
+            query, search, categories, episode_ids, exclude_episode_ids
+        )
 
-        if order == "desc":
+        if order == "relevance" and ts_query is not None:
+            query = query.order_by(
+                func.ts_rank(episode_search_vector, ts_query).desc(),
+                Episode.published_at.desc(),
+            )
+        elif order in ("desc", "relevance"):
             query = query.order_by(Episode.published_at.desc())
         else:
             query = query.order_by(Episode.published_at.asc())
 
-        if len(categories) > 0:
-            query = query.join(EpisodeCategory).where(
-                EpisodeCategory.category_id.in_(categories)
+        return query
+
+    def _episodes_after_query(
+        self,
+        search: str | None,
+        order: str,
+        after: tuple[datetime | None, int] | None,
+        limit: int,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> Select:
+        """
+        Keyset pagination over (published_at, id), served by the composite
+        index. Episodes without a publication date sort as the newest ones,
+        as Postgres does with NULLs, so both directions scan the index.
+        """
+        query = select(Episode).options(selectinload(Episode.categories))
+        query, _ = self._filter_episodes(
+            query, search, categories, episode_ids, exclude_episode_ids
+        )
+        position = tuple_(Episode.published_at, Episode.id)
+
+        if order == "asc":
+            if after is not None:
+                published_at, id = after
+                if published_at is None:
+                    query = query.where(
+                        Episode.published_at.is_(None), Episode.id > id
+                    )
+                else:
+                    query = query.where(
+                        or_(
+                            position > tuple_(published_at, id),
+                            Episode.published_at.is_(None),
+                        )
+                    )
+            query = query.order_by(
+                Episode.published_at.asc().nulls_last(), Episode.id.asc()
+            )
+        else:
+            if after is not None:
+                published_at, id = after
+                if published_at is None:
+                    query = query.where(
+                        or_(Episode.published_at.isnot(None), Episode.id < id)
+                    )
+                else:
+                    query = query.where(position < tuple_(published_at, id))
+            query = query.order_by(
+                Episode.published_at.desc().nulls_first(), Episode.id.desc()
+            )
+
+        return query.limit(limit)
+
+    def _count_episodes_query(
+        self,
+        search: str | None,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> Select:
+        query, _ = self._filter_episodes(
+            select(Episode.id),
+            search,
+            categories,
+            episode_ids,
+            exclude_episode_ids,
+        )
+        return select(func.count()).select_from(query.subquery())
+
+    def _episode_category_links_query(self) -> Select:
+        return select(EpisodeCategory.episode_id, EpisodeCategory.category_id)
+
+    def _categories_for_episodes_query(self, episode_ids: list[int]) -> Select:
+        return (
+            select(
+                EpisodeCategory.episode_id,
+                Category.id,
+                Category.slug,
+                Category.name,
+                Category.type,
+            )
+            .join(Category, Category.id == EpisodeCategory.category_id)
+            .where(self._id_in(episode_ids, EpisodeCategory.episode_id))
+            .order_by(Category.type, Category.name)
+        )
+
+    def _export_query(self) -> Select:
+        """
+        Every episode by id, as rows of its columns and its categories
+        aggregated in SQL into a JSON array (text, NULL when it has none),
+        so exporting needs no query per episode.
+        """
+        # Types are stored by enum name; the API returns the values
+        category_type = func.lower(sa.cast(Category.type, sa.String))
+        # Keys as SQL literals: Postgres cannot type them as parameters
+        fields = []
+        for key, value in (
+            ("id", Category.id),
+            ("slug", Category.slug),
+            ("name", Category.name),
+            ("type", category_type),
+        ):
+            fields += [literal_column(f"'{key}'"), value]
+
+        if self._is_postgres():
+            categories = func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(*fields),
+                    Category.type,
+                    Category.name,
+                )
             )
+        else:
+            categories = func.json_group_array(func.json_object(*fields))
+
+        categories_json = (
+            sa.select(sa.cast(categories, sa.Text))
+            .select_from(EpisodeCategory)
+            .join(Category, Category.id == EpisodeCategory.category_id)
+            .where(EpisodeCategory.episode_id == Episode.id)
+            .scalar_subquery()
+        )
+        return sa.select(
+            Episode.id,
+            Episode.title,
+            Episode.slug,
+            Episode.description,
+            Episode.published_at,
+            categories_json,
+        ).order_by(Episode.id)
+
+    def _category_facets_query(
+        self,
+        search: str | None,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> Select:
+        """
+        Number of matching episodes per category, in a single grouped
+        query. Rows are (id, slug, name, type, count), most popular first.
+        """
+        episode_count = func.count(EpisodeCategory.episode_id)
+        query = (
+            select(
+                Category.id,
+                Category.slug,
+                Category.name,
+                Category.type,
+                episode_count,
+            )
+            .join(EpisodeCategory, EpisodeCategory.category_id == Category.id)
+            .group_by(Category.id, Category.slug, Category.name, Category.type)
+            .order_by(episode_count.desc(), Category.name)
+        )
+
+        filtered = (
+            search
+            or categories
+            or episode_ids is not None
+            or exclude_episode_ids
+        )
+        if filtered:
+            matching, _ = self._filter_episodes(
+                select(Episode.id),
+                search,
+                categories,
+                episode_ids,
+                exclude_episode_ids,
+            )
+            query = query.where(EpisodeCategory.episode_id.in_(matching))
 
         return query
 
-    def get_episode_by_id(self, id: int) -> Episode:
-        return self.db_session.exec(
+    def _filter_episodes(
+        self,
+        query: Select,
+        search: str | None,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> tuple[Select, Any]:
+        """
+        Apply the filters shared by every episode listing: search, category
+        ids (any of them, resolved in SQL) and explicit episode ids to keep
+        or drop (resolved by the category index). Returns the filtered query
+        and the full-text query, if any, so callers can rank by it.
+        """
+        ts_query = None
+
+        if search and search.strip():
+            if self._is_postgres():
+                prefix_query = build_prefix_tsquery(search)
+                if prefix_query:
+                    ts_query = func.to_tsquery(SEARCH_CONFIG, prefix_query)
+                    query = query.where(
+                        episode_search_vector.op("@@")(ts_query)
+                    )
+            else:
+                search_term = f"%{search.strip()}%"
+                query = query.where(
+                    or_(
+                        Episode.title.ilike(search_term),
+                        Episode.description.ilike(search_term),
+                    )
+                )
+
+        if len(categories) > 0:
+            query = query.where(
+                Episode.id.in_(
+                    select(EpisodeCategory.episode_id).where(
+                        EpisodeCategory.category_id.in_(categories)
+                    )
+                )
+            )
+
+        if episode_ids is not None:
+            query = query.where(self._id_in(episode_ids))
+
+        if exclude_episode_ids:
+            query = query.where(~self._id_in(exclude_episode_ids))
+
+        return query, ts_query
+
+    def _id_in(
+        self, ids: list[int], column: Any = Episode.id
+    ) -> ColumnElement[bool]:
+        # A single array parameter keeps long id lists cheap to bind and
+        # the statement text cacheable on Postgres
+        if self._is_postgres():
+            return column == any_(
+                bindparam(
+                    "episode_ids", ids, type_=ARRAY(Integer), unique=True
+                )
+            )
+        return column.in_(ids)
+
+    def _estimate_query(self) -> Select:
+        return (
+            select(text("reltuples::bigint"))
+            .select_from(text("pg_class"))
+            .where(text("oid = 'episode'::regclass"))
+        )
+
+    def _episode_by_id_query(self, id: int) -> Select:
+        return (
             select(Episode)
             .where(Episode.id == id)
             .options(selectinload(Episode.categories))
-        ).first()
+        )
+
+    def _is_postgres(self) -> bool:
+        return self.db_session.get_bind().dialect.name == "postgresql"
+
+
+class EpisodesRepository(EpisodesQueries, IEpisodesRepository):
+    def __init__(self, session: Session):
+        self.db_session = session
+
+    def get_episodes_after(
+        self,
+        search: str | None,
+        order: str,
+        after: tuple[datetime | None, int] | None,
+        limit: int,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> list[Episode]:
+        return self.db_session.exec(
+            self._episodes_after_query(
+                search,
+                order,
+                after,
+                limit,
+                categories,
+                episode_ids,
+                exclude_episode_ids,
+            )
+        ).all()
+
+    def count_episodes(
+        self,
+        search: str | None,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> int:
+        return self.db_session.exec(
+            self._count_episodes_query(
+                search, categories, episode_ids, exclude_episode_ids
+            )
+        ).one()
+
+    def get_episode_category_links(self) -> list[tuple[int, int]]:
+        return self.db_session.exec(self._episode_category_links_query()).all()
+
+    def get_categories_for_episodes(
+        self, episode_ids: list[int]
+    ) -> list[tuple]:
+        return self.db_session.exec(
+            self._categories_for_episodes_query(episode_ids)
+        ).all()
+
+    def get_category_facets(
+        self,
+        search: str | None,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> list[tuple]:
+        return self.db_session.exec(
+            self._category_facets_query(
+                search, categories, episode_ids, exclude_episode_ids
+            )
+        ).all()
+
+    def estimate_episodes_count(self) -> int | None:
+        """
+        Planner estimate of the number of episodes, or None when the
+        database cannot provide one (not Postgres, or never analyzed).
+        """
+        if not self._is_postgres():
+            return None
+
+        estimate = self.db_session.exec(self._estimate_query()).first()
+        return estimate if estimate is not None and estimate >= 0 else None
+
+    def stream_export_rows(self, batch_size: int) -> Iterator[list[tuple]]:
+        """
+        Export rows in batches of `batch_size`, read through a server-side
+        cursor so the whole catalog is never in memory.
+        """
+        result = self.db_session.exec(
+            self._export_query().execution_options(yield_per=batch_size)
+        )
+        yield from result.partitions()
+
+    def get_episode_by_id(self, id: int) -> Episode:
+        return self.db_session.exec(self._episode_by_id_query(id)).first()
 
     def save_episode(self, episode: Episode) -> Episode:
         return self.db_session.merge(episode)
 
+    def get_episode_content_hashes(
+        self, ids: list[int]
+    ) -> dict[int, str | None]:
+        """Content hash of each of `ids` already stored."""
+        if not ids:
+            return {}
+        return dict(
+            self.db_session.exec(
+                sa.select(Episode.id, Episode.content_hash).where(
+                    Episode.id.in_(ids)
+                )
+            ).all()
+        )
+
+    def upsert_episodes(self, episodes: list[Episode]) -> int:
+        """
+        Insert new episodes and update those whose content hash changed,
+        with one INSERT ... ON CONFLICT statement per batch instead of a
+        merge per episode. Returns how many were inserted or updated.
+
+        Rows only get a new updated_at when their content differs, not
+        when just their hash is filled in, and are flagged for
+        reclassification when their title or description differs.
+        """
+        dialect = self.db_session.get_bind().dialect.name
+        if dialect not in ("postgresql", "sqlite"):
+            for episode in episodes:
+                self.save_episode(episode)
+            return len(episodes)
+
+        insert = (postgresql if dialect == "postgresql" else sqlite).insert
+        now = datetime.now(timezone.utc)
+        written = 0
+        for start in range(0, len(episodes), UPSERT_BATCH_SIZE):
+            end = start + UPSERT_BATCH_SIZE
+            batch = episodes[start:end]
+            statement = insert(Episode).values(
+                [
+                    {
+                        "id": episode.id,
+                        **{
+                            column: getattr(episode, column)
+                            for column in EPISODE_CONTENT_COLUMNS
+                        },
+                        "content_hash": episode.content_hash,
+                        "updated_at": now,
+                    }
+                    for episode in batch
+                ]
+            )
+            table, excluded = Episode.__table__.c, statement.excluded
+
+            def changed(*columns: str) -> ColumnElement:
+                return or_(
+                    *(
+                        table[column].is_distinct_from(excluded[column])
+                        for column in columns
+                    )
+                )
+
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.id],
+                set_={
+                    **{
+                        column: excluded[column]
+                        for column in (
+                            *EPISODE_CONTENT_COLUMNS,
+                            "content_hash",
+                        )
+                    },
+                    "updated_at": sa.case(
+                        (
+                            changed(*EPISODE_CONTENT_COLUMNS),
+                            excluded.updated_at,
+                        ),
+                        else_=table.updated_at,
+                    ),
+                    "needs_reclassification": or_(
+                        changed(*CLASSIFIED_COLUMNS),
+                        table.needs_reclassification,
+                    ),
+                },
+                where=changed("content_hash"),
+            )
+            written += self.db_session.exec(statement).rowcount
+        return written
+
     def link_episode_to_category(
         self, episode_id: int, category_id: int
     ) -> None:
@@ -139,3 +824,169 @@ class EpisodesRepository(IEpisodesRepository):
                 episode_id=episode_id, category_id=category_id
             )
             self.db_session.add(link)
+
+    def unlink_episode_categories(self, episode_id: int) -> None:
+        self.db_session.exec(
+            delete(EpisodeCategory).where(
+                EpisodeCategory.episode_id == episode_id
+            )
+        )
+
+
+class IAsyncEpisodesRepository(ABC):
+    """Read side of the episodes repository, for the async API."""
+
+    @abstractmethod
+    async def get_episode_by_id(self, id: int) -> Episode | None:
+        pass
+
+    @abstractmethod
+    def get_episodes_query(self, search: str | None, order: str) -> Select:
+        pass
+
+    @abstractmethod
+    async def get_episodes_after(
+        self,
+        search: str | None,
+        order: str,
+        after: tuple[datetime | None, int] | None,
+        limit: int,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> list[Episode]:
+        pass
+
+    @abstractmethod
+    async def count_episodes(
+        self,
+        search: str | None,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> int:
+        pass
+
+    @abstractmethod
+    async def get_episode_category_links(self) -> list[tuple[int, int]]:
+        pass
+
+    @abstractmethod
+    async def get_categories_for_episodes(
+        self, episode_ids: list[int]
+    ) -> list[tuple]:
+        pass
+
+    @abstractmethod
+    async def get_category_facets(
+        self,
+        search: str | None,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> list[tuple]:
+        pass
+
+    @abstractmethod
+    async def estimate_episodes_count(self) -> int | None:
+        pass
+
+    @abstractmethod
+    def stream_export_rows(
+        self, batch_size: int
+    ) -> AsyncIterator[list[tuple]]:
+        pass
+
+
+class AsyncEpisodesRepository(EpisodesQueries, IAsyncEpisodesRepository):
+    def __init__(self, session: AsyncSession):
+        self.db_session = session
+
+    async def get_episodes_after(
+        self,
+        search: str | None,
+        order: str,
+        after: tuple[datetime | None, int] | None,
+        limit: int,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> list[Episode]:
+        result = await self.db_session.exec(
+            self._episodes_after_query(
+                search,
+                order,
+                after,
+                limit,
+                categories,
+                episode_ids,
+                exclude_episode_ids,
+            )
+        )
+        return result.all()
+
+    async def count_episodes(
+        self,
+        search: str | None,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> int:
+        result = await self.db_session.exec(
+            self._count_episodes_query(
+                search, categories, episode_ids, exclude_episode_ids
+            )
+        )
+        return result.one()
+
+    async def get_episode_category_links(self) -> list[tuple[int, int]]:
+        result = await self.db_session.exec(
+            self._episode_category_links_query()
+        )
+        return result.all()
+
+    async def get_categories_for_episodes(
+        self, episode_ids: list[int]
+    ) -> list[tuple]:
+        result = await self.db_session.exec(
+            self._categories_for_episodes_query(episode_ids)
+        )
+        return result.all()
+
+    async def get_category_facets(
+        self,
+        search: str | None,
+        categories: list[int] = [],
+        episode_ids: list[int] | None = None,
+        exclude_episode_ids: list[int] = [],
+    ) -> list[tuple]:
+        result = await self.db_session.exec(
+            self._category_facets_query(
+                search, categories, episode_ids, exclude_episode_ids
+            )
+        )
+        return result.all()
+
+    async def estimate_episodes_count(self) -> int | None:
+        if not self._is_postgres():
+            return None
+
+        estimate = (await self.db_session.exec(self._estimate_query())).first()
+        return estimate if estimate is not None and estimate >= 0 else None
+
+    async def stream_export_rows(
+        self, batch_size: int
+    ) -> AsyncIterator[list[tuple]]:
+        if self._is_postgres():
+            # The API pool's statement timeout is sized for single pages,
+            # not for reading the whole catalog
+            await self.db_session.exec(text("SET LOCAL statement_timeout = 0"))
+        result = await self.db_session.stream(
+            self._export_query().execution_options(yield_per=batch_size)
+        )
+        async for partition in result.partitions():
+            yield partition
+
+    async def get_episode_by_id(self, id: int) -> Episode | None:
+        result = await self.db_session.exec(self._episode_by_id_query(id))
+        return result.first()
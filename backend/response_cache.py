@@ -0,0 +1,332 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable
+
+import redis
+import redis.asyncio
+
+from logger import logger
+from metrics import CollectedCounter, registry
+from query_cache import MISSING, QueryCache
+
+REDIS_URL = os.environ.get("REDIS_URL")
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_LOCAL_TTL = float(
+    os.environ.get("RESPONSE_CACHE_LOCAL_TTL", "30")
+)
+RESPONSE_CACHE_MAX_ENTRIES = int(
+    os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "1024")
+)
+
+KEY_PREFIX = "response:"
+# How long a process may hold the Redis fill lock, and how long the others
+# wait for its result before computing the response themselves
+LOCK_TIMEOUT = 10.0
+LOCK_WAIT = 2.0
+LOCK_POLL_INTERVAL = 0.05
+# After a Redis error the shared tier is skipped for this many seconds
+REDIS_RETRY_AFTER = 30.0
+
+
+def _encode(value: Any) -> bytes:
+    # Encoded responses are stored as they are, anything else as JSON
+    if isinstance(value, bytes):
+        return b"b" + value
+    return b"j" + json.dumps(value).encode()
+
+
+def _decode(stored: bytes) -> Any:
+    if stored[:1] == b"b":
+        return stored[1:]
+    return json.loads(stored[1:])
+
+
+class ResponseCache:
+    """
+    Two-tier cache of serialized API responses: a per-process LRU with a
+    short TTL in front of Redis, shared by every API process.
+
+    Keys carry the dataset version, so ingestion, classification and admin
+    changes invalidate both tiers by bumping it. Concurrent misses for a key
+    are coalesced: within a process through an in-flight event, across
+    processes through a Redis lock, so only one of them queries the
+    database.
+
+    Without a Redis URL, or while Redis is failing, only the local tier is
+    used. `get_or_set` serves sync callers and `get_or_set_async` the
+    event loop; they share both tiers.
+    """
+
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        ttl: float = RESPONSE_CACHE_TTL,
+        local_ttl: float = RESPONSE_CACHE_LOCAL_TTL,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+    ):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.local = QueryCache(max_entries=max_entries, ttl=local_ttl)
+        self.counters: Counter[str] = Counter()
+        self._redis: redis.Redis | None = None
+        self._async_redis: redis.asyncio.Redis | None = None
+        self._redis_down_until = 0.0
+        self._inflight: dict[str, threading.Event] = {}
+        self._async_inflight: dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Cached value for `key`, computing and storing it on a miss.
+        Values must be bytes or JSON serializable.
+        """
+        value = self.local.get(key)
+        if value is not MISSING:
+            self._count("local_hits")
+            return value
+
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            # Another request is already filling this key
+            event.wait(LOCK_WAIT)
+            value = self.local.get(key)
+            if value is not MISSING:
+                self._count("coalesced")
+                return value
+
+        try:
+            value = self._get_shared(key, compute)
+            self.local.set(key, value)
+            return value
+        finally:
+            if leader:
+                with self._lock:
+                    del self._inflight[key]
+                event.set()
+
+    async def get_or_set_async(
+        self, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Same as `get_or_set`, for a coroutine function."""
+        value = self.local.get(key)
+        if value is not MISSING:
+            self._count("local_hits")
+            return value
+
+        # Only touched from the event loop, so no lock is needed
+        inflight = self._async_inflight.get(key)
+        if inflight is not None:
+            try:
+                value = await asyncio.wait_for(
+                    asyncio.shield(inflight), LOCK_WAIT
+                )
+                self._count("coalesced")
+                return value
+            except Exception:
+                # The leader failed or is too slow, compute our own
+                return await self._get_shared_async(key, compute)
+
+        inflight = asyncio.get_running_loop().create_future()
+        self._async_inflight[key] = inflight
+        try:
+            value = await self._get_shared_async(key, compute)
+            self.local.set(key, value)
+            inflight.set_result(value)
+            return value
+        except BaseException as e:
+            inflight.set_exception(e)
+            # Retrieved so that a leader error without waiters is not logged
+            inflight.exception()
+            raise
+        finally:
+            del self._async_inflight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                name: self.counters[name]
+                for name in (
+                    "local_hits",
+                    "redis_hits",
+                    "coalesced",
+                    "misses",
+                    "redis_errors",
+                )
+            }
+        lookups = sum(stats[name] for name in stats if name != "redis_errors")
+        hits = lookups - stats["misses"]
+        stats["hit_ratio"] = round(hits / lookups, 4) if lookups else None
+        stats["redis"] = self._client() is not None
+        return stats
+
+    def clear(self) -> None:
+        """Empty the local tier and reset the counters."""
+        self.local.clear()
+        with self._lock:
+            self.counters.clear()
+
+    def _get_shared(self, key: str, compute: Callable[[], Any]) -> Any:
+        client = self._client()
+        if client is None:
+            self._count("misses")
+            return compute()
+
+        redis_key = KEY_PREFIX + key
+        lock_key = redis_key + ":lock"
+        try:
+            cached = client.get(redis_key)
+            if cached is None and not client.set(
+                lock_key, 1, nx=True, px=int(LOCK_TIMEOUT * 1000)
+            ):
+                # Another process is filling it, wait for its result
+                cached = self._wait_for(client, redis_key)
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            self._count("misses")
+            return compute()
+
+        if cached is not None:
+            self._count("redis_hits")
+            return _decode(cached)
+
+        self._count("misses")
+        try:
+            value = compute()
+            self._redis_call(
+                client.set,
+                redis_key,
+                _encode(value),
+                px=int(self.ttl * 1000),
+            )
+        finally:
+            # Also when compute() fails, or others wait for nothing
+            self._redis_call(client.delete, lock_key)
+        return value
+
+    async def _get_shared_async(
+        self, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        client = self._async_client()
+        if client is None:
+            self._count("misses")
+            return await compute()
+
+        redis_key = KEY_PREFIX + key
+        lock_key = redis_key + ":lock"
+        try:
+            cached = await client.get(redis_key)
+            if cached is None and not await client.set(
+                lock_key, 1, nx=True, px=int(LOCK_TIMEOUT * 1000)
+            ):
+                cached = await self._wait_for_async(client, redis_key)
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            self._count("misses")
+            return await compute()
+
+        if cached is not None:
+            self._count("redis_hits")
+            return _decode(cached)
+
+        self._count("misses")
+        try:
+            value = await compute()
+            await self._redis_call_async(
+                client.set,
+                redis_key,
+                _encode(value),
+                px=int(self.ttl * 1000),
+            )
+        finally:
+            await self._redis_call_async(client.delete, lock_key)
+        return value
+
+    async def _wait_for_async(
+        self, client: redis.asyncio.Redis, redis_key: str
+    ) -> bytes | None:
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            cached = await client.get(redis_key)
+            if cached is not None:
+                return cached
+        return None
+
+    def _wait_for(self, client: redis.Redis, redis_key: str) -> bytes | None:
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            cached = client.get(redis_key)
+            if cached is not None:
+                return cached
+        return None
+
+    def _client(self) -> redis.Redis | None:
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(
+                self.redis_url,
+                socket_timeout=0.25,
+                socket_connect_timeout=0.25,
+            )
+        return self._redis
+
+    def _async_client(self) -> redis.asyncio.Redis | None:
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        if self._async_redis is None:
+            self._async_redis = redis.asyncio.Redis.from_url(
+                self.redis_url,
+                socket_timeout=0.25,
+                socket_connect_timeout=0.25,
+            )
+        return self._async_redis
+
+    def _redis_call(self, method: Callable, *args, **kwargs) -> None:
+        try:
+            method(*args, **kwargs)
+        except redis.RedisError as e:
+            self._redis_failed(e)
+
+    async def _redis_call_async(
+        self, method: Callable[..., Awaitable], *args, **kwargs
+    ) -> None:
+        try:
+            await method(*args, **kwargs)
+        except redis.RedisError as e:
+            self._redis_failed(e)
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.warning(f"Response cache: Redis unavailable: {error}")
+        self._count("redis_errors")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+
+response_cache = ResponseCache(redis_url=REDIS_URL)
+
+registry.register(
+    CollectedCounter(
+        "response_cache_events_total",
+        "Response cache lookups by how they were answered, and Redis errors",
+        ("event",),
+        lambda: {
+            (event,): count
+            for event, count in response_cache.stats().items()
+            if event not in ("hit_ratio", "redis")
+        },
+    )
+)
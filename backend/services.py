@@ -1,33 +1,151 @@
 import json
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Iterator
 
 from openai import OpenAI
 from sqlalchemy import Select
 
+from category_index import CategoryIndex
+from export import EXPORT_BATCH_SIZE, EpisodeExportWriter
 from logger import logger
 from models import CategoryType, Episode
+from pagination import decode_cursor, encode_cursor
 from prompts import classification_prompt
-from repositories import ICategoriesRepository, IEpisodesRepository
+from query_cache import (
+    MISSING,
+    QueryCache,
+    count_cache,
+    facet_cache,
+    normalize_search,
+)
+from repositories import (
+    IAsyncCategoriesRepository,
+    IAsyncEpisodesRepository,
+    ICategoriesRepository,
+    IEpisodesRepository,
+)
 
 
-class EpisodesService:
-    def __init__(self, episodes_repository: IEpisodesRepository):
+def cached_result(
+    cache: QueryCache,
+    dataset_version: int | None,
+    key: Hashable,
+    compute: Callable[[], Any],
+) -> Any:
+    """
+    Result served from `cache` when the dataset version is known, computed
+    directly otherwise (commands, tests).
+    """
+    if dataset_version is None:
+        return compute()
+    return cache.get_or_compute((dataset_version, key), compute)
+
+
+async def async_cached_result(
+    cache: QueryCache,
+    dataset_version: int | None,
+    key: Hashable,
+    compute: Callable[[], Awaitable[Any]],
+) -> Any:
+    """Same as `cached_result`, for a coroutine function."""
+    if dataset_version is None:
+        return await compute()
+    result = cache.get((dataset_version, key))
+    if result is MISSING:
+        result = await compute()
+        cache.set((dataset_version, key), result)
+    return result
+
+
+# Fields of an episodes listing that can be requested with `fields=`, in
+# response order; the id is always included
+LIST_FIELDS = ("title", "slug", "description", "published_at", "categories")
+
+
+class BaseEpisodesService:
+    """
+    Logic shared by the sync and async episodes services: category
+    selections, cursors and facet grouping. Subclasses do the I/O.
+    """
+
+    def __init__(
+        self,
+        episodes_repository: IEpisodesRepository | IAsyncEpisodesRepository,
+        dataset_version: int | None = None,
+        category_index: CategoryIndex | None = None,
+    ):
         self.episodes_repository = episodes_repository
+        self.dataset_version = dataset_version
+        # Without a shared index, a private one is built per service
+        self.category_index = category_index or CategoryIndex()
 
-    def get_episodes_query(
-        self, search: str | None, order: str, categories: str = ""
-    ) -> Select:
+    def _category_selection(
+        self, categories: str, match: str, exclude: str
+    ) -> tuple[list[int], str, list[int], tuple]:
         """
-        Orchestrates fetching the episodes query from the repository.
+        Normalize a category selection (any or all of `categories`, none of
+        `exclude`). Also returns a key of the selection for caching.
         """
-        category_list = self._parse_categories(categories)
+        category_list = sorted(set(self._parse_categories(categories)))
+        exclude_list = sorted(set(self._parse_categories(exclude)))
+        if len(category_list) < 2:
+            match = "any"
+        filters_key = (tuple(category_list), match, tuple(exclude_list))
+        return category_list, match, exclude_list, filters_key
 
-        return self.episodes_repository.get_episodes_query(
-            search=search, order=order, categories=category_list
+    def _resolve_filters(
+        self, category_list: list[int], match: str, exclude_list: list[int]
+    ) -> dict:
+        """
+        Episode id filters taken by the repository for a selection, from a
+        category index that is already fresh.
+        """
+        episode_ids, exclude_episode_ids = self.category_index.match(
+            category_list, match, exclude_list
         )
+        return {
+            "episode_ids": episode_ids,
+            "exclude_episode_ids": exclude_episode_ids,
+        }
 
-    def get_episode_by_id(self, id: int) -> Episode:
-        return self.episodes_repository.get_episode_by_id(id)
+    def _cursor_page(
+        self, episodes: list[Episode], size: int
+    ) -> tuple[list[Episode], str | None]:
+        """Trim the extra row fetched to detect a next page."""
+        if len(episodes) <= size:
+            return episodes, None
+        episodes = episodes[:size]
+        return episodes, encode_cursor(
+            episodes[-1].published_at, episodes[-1].id
+        )
+
+    def _group_facets(self, rows: list[tuple]) -> dict:
+        facets = {type: [] for type in CategoryType}
+        for id, slug, name, type, count in rows:
+            if type is not None:
+                facets[type].append(
+                    {
+                        "id": id,
+                        "slug": slug,
+                        "name": name,
+                        "type": type,
+                        "count": count,
+                    }
+                )
+        return facets
+
+    def _parse_fields(self, fields: str | None) -> list[str] | None:
+        """
+        Requested listing fields, or None for all of them.
+        Raises ValueError on unknown fields.
+        """
+        if fields is None:
+            return None
+        requested = {field.strip() for field in fields.split(",")} - {""}
+        unknown = requested - set(LIST_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return [field for field in LIST_FIELDS if field in requested]
 
     def _parse_categories(self, categories_str: str) -> list[int]:
         """
@@ -52,9 +170,171 @@ class EpisodesService:
 
         return category_list
 
+
+class EpisodesService(BaseEpisodesService):
+    episodes_repository: IEpisodesRepository
+
+    def get_episodes_query(
+        self,
+        search: str | None,
+        order: str,
+        categories: str = "",
+        match: str = "any",
+        exclude: str = "",
+    ) -> Select:
+        """
+        Orchestrates fetching the episodes query from the repository.
+        """
+        filters, _ = self._category_filters(categories, match, exclude)
+
+        return self.episodes_repository.get_episodes_query(
+            search=search, order=order, **filters
+        )
+
+    def get_episodes_after_cursor(
+        self,
+        search: str | None,
+        order: str,
+        categories: str = "",
+        cursor: str | None = None,
+        size: int = 50,
+        include_total: bool = False,
+        match: str = "any",
+        exclude: str = "",
+    ) -> dict:
+        """
+        Fetches one keyset page of episodes following `cursor`.
+        Raises ValueError if the cursor is malformed.
+        """
+        filters, filters_key = self._category_filters(
+            categories, match, exclude
+        )
+        after = decode_cursor(cursor) if cursor else None
+
+        # One extra row tells whether there is a next page
+        episodes = self.episodes_repository.get_episodes_after(
+            search=search,
+            order=order,
+            after=after,
+            limit=size + 1,
+            **filters,
+        )
+        episodes, next_cursor = self._cursor_page(episodes, size)
+
+        total = None
+        if include_total:
+            total = self._count_episodes(search, filters, filters_key)
+
+        return {"items": episodes, "next_cursor": next_cursor, "total": total}
+
+    def get_episode_by_id(self, id: int) -> Episode:
+        return self.episodes_repository.get_episode_by_id(id)
+
+    def get_facets(
+        self,
+        search: str | None,
+        categories: str = "",
+        match: str = "any",
+        exclude: str = "",
+    ) -> dict:
+        """
+        Per-type category counts for the episodes matching the current
+        search and category selection, cached per filter key.
+        """
+        filters, filters_key = self._category_filters(
+            categories, match, exclude
+        )
+
+        facets = cached_result(
+            facet_cache,
+            self.dataset_version,
+            ("facets", normalize_search(search), filters_key),
+            lambda: self._group_facets(
+                self.episodes_repository.get_category_facets(
+                    search=search, **filters
+                )
+            ),
+        )
+        total = self._count_episodes(search, filters, filters_key)
+
+        return {"total": total, "facets": facets}
+
+    def count_episodes(
+        self,
+        search: str | None,
+        categories: str = "",
+        strategy: str = "exact",
+        match: str = "any",
+        exclude: str = "",
+    ) -> int:
+        """
+        Total for an episodes listing. The "estimate" strategy uses the
+        planner's row estimate for unfiltered listings; everything else is
+        an exact count cached per dataset version and normalized filters.
+        """
+        filters, filters_key = self._category_filters(
+            categories, match, exclude
+        )
+
+        if strategy == "estimate" and not normalize_search(search):
+            if not filters:
+                estimate = self.episodes_repository.estimate_episodes_count()
+                if estimate is not None:
+                    return estimate
+
+        return self._count_episodes(search, filters, filters_key)
+
+    def _count_episodes(
+        self, search: str | None, filters: dict, filters_key: tuple
+    ) -> int:
+        return cached_result(
+            count_cache,
+            self.dataset_version,
+            ("episodes", normalize_search(search), filters_key),
+            lambda: self.episodes_repository.count_episodes(
+                search=search, **filters
+            ),
+        )
+
+    def _category_filters(
+        self, categories: str, match: str, exclude: str
+    ) -> tuple[dict, tuple]:
+        """
+        Resolve a category selection through the category index into the
+        episode id filters taken by the repository, plus its cache key.
+        """
+        category_list, match, exclude_list, filters_key = (
+            self._category_selection(categories, match, exclude)
+        )
+        if not category_list and not exclude_list:
+            return {}, filters_key
+
+        self.category_index.ensure_fresh(
+            self.dataset_version,
+            self.episodes_repository.get_episode_category_links,
+        )
+        filters = self._resolve_filters(category_list, match, exclude_list)
+        return filters, filters_key
+
+    def export_episodes(
+        self,
+        format: str = "ndjson",
+        compress: bool = False,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> Iterator[bytes]:
+        """
+        The whole catalog with its categories, encoded as `format` one
+        batch at a time. Raises ValueError on an unknown format.
+        """
+        writer = EpisodeExportWriter(format, compress)
+        yield writer.start()
+        for rows in self.episodes_repository.stream_export_rows(batch_size):
+            yield writer.write(rows)
+        yield writer.finish()
+
     def create_episode_from_api_data(self, data: dict) -> Episode:
         """Maps API data dictionary to an Episode object."""
-        return Episode(
+        episode = Episode(
             id=data["id"],
             title=data.get("titol"),
             slug=data.get("nom_friendly"),
@@ -65,12 +345,199 @@ class EpisodesService:
                 else None
             ),
         )
+        episode.content_hash = Episode.compute_content_hash(
+            episode.title,
+            episode.slug,
+            episode.description,
+            episode.published_at,
+        )
+        return episode
 
     def _parse_date(self, date_str: str) -> datetime:
         """Parse API date format: '09/09/2001 00:01:00'"""
         return datetime.strptime(date_str, "%d/%m/%Y %H:%M:%S")
 
 
+class AsyncEpisodesService(BaseEpisodesService):
+    """Read side of EpisodesService for the async API."""
+
+    episodes_repository: IAsyncEpisodesRepository
+
+    async def get_episodes_query(
+        self,
+        search: str | None,
+        order: str,
+        categories: str = "",
+        match: str = "any",
+        exclude: str = "",
+        fields: str | None = None,
+    ) -> Select:
+        """
+        Episodes listing query. With `fields`, it selects only those
+        columns; see `project_episodes`. Raises ValueError on unknown
+        fields.
+        """
+        columns = self._parse_fields(fields)
+        if columns is not None:
+            columns = [field for field in columns if field != "categories"]
+        filters, _ = await self._category_filters(categories, match, exclude)
+
+        return self.episodes_repository.get_episodes_query(
+            search=search, order=order, columns=columns, **filters
+        )
+
+    async def project_episodes(self, rows: list, fields: str) -> list[dict]:
+        """
+        Listing items from the rows of a `fields` query, with their
+        categories loaded in one query if requested.
+        """
+        items = [dict(row._mapping) for row in rows]
+        if "categories" not in self._parse_fields(fields):
+            return items
+
+        by_episode = {}
+        for item in items:
+            item["categories"] = by_episode[item["id"]] = []
+        if by_episode:
+            links = await self.episodes_repository.get_categories_for_episodes(
+                list(by_episode)
+            )
+            for episode_id, id, slug, name, type in links:
+                by_episode[episode_id].append(
+                    {"id": id, "slug": slug, "name": name, "type": type}
+                )
+        return items
+
+    async def export_episodes(
+        self,
+        format: str = "ndjson",
+        compress: bool = False,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> AsyncIterator[bytes]:
+        """Same as `EpisodesService.export_episodes`, streamed."""
+        writer = EpisodeExportWriter(format, compress)
+        yield writer.start()
+        repository = self.episodes_repository
+        async for rows in repository.stream_export_rows(batch_size):
+            yield writer.write(rows)
+        yield writer.finish()
+
+    async def get_episodes_after_cursor(
+        self,
+        search: str | None,
+        order: str,
+        categories: str = "",
+        cursor: str | None = None,
+        size: int = 50,
+        include_total: bool = False,
+        match: str = "any",
+        exclude: str = "",
+    ) -> dict:
+        """
+        Fetches one keyset page of episodes following `cursor`.
+        Raises ValueError if the cursor is malformed.
+        """
+        filters, filters_key = await self._category_filters(
+            categories, match, exclude
+        )
+        after = decode_cursor(cursor) if cursor else None
+
+        episodes = await self.episodes_repository.get_episodes_after(
+            search=search,
+            order=order,
+            after=after,
+            limit=size + 1,
+            **filters,
+        )
+        episodes, next_cursor = self._cursor_page(episodes, size)
+
+        total = None
+        if include_total:
+            total = await self._count_episodes(search, filters, filters_key)
+
+        return {"items": episodes, "next_cursor": next_cursor, "total": total}
+
+    async def get_episode_by_id(self, id: int) -> Episode | None:
+        return await self.episodes_repository.get_episode_by_id(id)
+
+    async def get_facets(
+        self,
+        search: str | None,
+        categories: str = "",
+        match: str = "any",
+        exclude: str = "",
+    ) -> dict:
+        filters, filters_key = await self._category_filters(
+            categories, match, exclude
+        )
+
+        async def compute_facets() -> dict:
+            rows = await self.episodes_repository.get_category_facets(
+                search=search, **filters
+            )
+            return self._group_facets(rows)
+
+        facets = await async_cached_result(
+            facet_cache,
+            self.dataset_version,
+            ("facets", normalize_search(search), filters_key),
+            compute_facets,
+        )
+        total = await self._count_episodes(search, filters, filters_key)
+
+        return {"total": total, "facets": facets}
+
+    async def count_episodes(
+        self,
+        search: str | None,
+        categories: str = "",
+        strategy: str = "exact",
+        match: str = "any",
+        exclude: str = "",
+    ) -> int:
+        filters, filters_key = await self._category_filters(
+            categories, match, exclude
+        )
+
+        if strategy == "estimate" and not normalize_search(search):
+            if not filters:
+                repository = self.episodes_repository
+                estimate = await repository.estimate_episodes_count()
+                if estimate is not None:
+                    return estimate
+
+        return await self._count_episodes(search, filters, filters_key)
+
+    async def _count_episodes(
+        self, search: str | None, filters: dict, filters_key: tuple
+    ) -> int:
+        return await async_cached_result(
+            count_cache,
+            self.dataset_version,
+            ("episodes", normalize_search(search), filters_key),
+            lambda: self.episodes_repository.count_episodes(
+                search=search, **filters
+            ),
+        )
+
+    async def _category_filters(
+        self, categories: str, match: str, exclude: str
+    ) -> tuple[dict, tuple]:
+        category_list, match, exclude_list, filters_key = (
+            self._category_selection(categories, match, exclude)
+        )
+        if not category_list and not exclude_list:
+            return {}, filters_key
+
+        if not self.category_index.is_fresh(self.dataset_version):
+            links = await self.episodes_repository.get_episode_category_links()
+            self.category_index.ensure_fresh(
+                self.dataset_version, lambda: links
+            )
+        filters = self._resolve_filters(category_list, match, exclude_list)
+        return filters, filters_key
+
+
 class ClassificationService:
     def __init__(
         self,
@@ -136,6 +603,12 @@ class ClassificationService:
             logger.error(f"Failed to save categories: {e}")
             return
 
+        if all_categories and episode.needs_reclassification:
+            # The episode changed upstream: its old categories go. Without
+            # new ones they stay, flagged for the next classification.
+            self.episodes_repository.unlink_episode_categories(episode.id)
+            episode.needs_reclassification = False
+
         for category in all_categories:
             logger.info(
                 f"Linking episode {episode.id} to category {category.id}"
@@ -143,14 +616,75 @@ class ClassificationService:
             self.episodes_repository.link_episode_to_category(
                 episode.id, category.id
             )
+        if all_categories:
+            episode.updated_at = datetime.now(timezone.utc)
         logger.info(
             f"Linked episode {episode.id} to categories {all_categories}"
         )
 
 
 class CategoriesService:
-    def __init__(self, categories_repository: ICategoriesRepository):
+    def __init__(
+        self,
+        categories_repository: ICategoriesRepository,
+        dataset_version: int | None = None,
+    ):
+        self.categories_repository = categories_repository
+        self.dataset_version = dataset_version
+
+    def get_categories_query(
+        self, type: CategoryType, order: str = "name", min_episodes: int = 1
+    ) -> Select:
+        return self.categories_repository.get_categories_query(
+            type=type, order=order, min_episodes=min_episodes
+        )
+
+    def count_categories(
+        self, type: CategoryType, min_episodes: int = 1
+    ) -> int:
+        return cached_result(
+            count_cache,
+            self.dataset_version,
+            ("categories", type, min_episodes),
+            lambda: self.categories_repository.count_categories(
+                type=type, min_episodes=min_episodes
+            ),
+        )
+
+
+class AsyncCategoriesService:
+    """Read side of CategoriesService for the async API."""
+
+    def __init__(
+        self,
+        categories_repository: IAsyncCategoriesRepository,
+        dataset_version: int | None = None,
+    ):
         self.categories_repository = categories_repository
+        self.dataset_version = dataset_version
 
-    def get_categories_query(self, type: CategoryType) -> Select:
-        return self.categories_repository.get_categories_query(type=type)
+    def get_categories_query(
+        self, type: CategoryType, order: str = "name", min_episodes: int = 1
+    ) -> Select:
+        return self.categories_repository.get_categories_query(
+            type=type, order=order, min_episodes=min_episodes
+        )
+
+    def get_category_rows_query(
+        self, type: CategoryType, order: str = "name", min_episodes: int = 1
+    ) -> Select:
+        return self.categories_repository.get_category_rows_query(
+            type=type, order=order, min_episodes=min_episodes
+        )
+
+    async def count_categories(
+        self, type: CategoryType, min_episodes: int = 1
+    ) -> int:
+        return await async_cached_result(
+            count_cache,
+            self.dataset_version,
+            ("categories", type, min_episodes),
+            lambda: self.categories_repository.count_categories(
+                type=type, min_episodes=min_episodes
+            ),
+        )
@@ -0,0 +1,225 @@
+import asyncio
+import gzip
+import os
+import re
+import time
+from typing import Iterable
+
+import brotli
+import httpx
+import redis
+import redis.asyncio
+
+from logger import logger
+from models import CategoryType
+
+REDIS_URL = os.environ.get("REDIS_URL")
+# Snapshots outlive the next scheduled ingestion, which replaces them
+SNAPSHOT_TTL = int(os.environ.get("SNAPSHOT_TTL", str(8 * 24 * 3600)))
+SNAPSHOT_EPISODE_PAGES = int(os.environ.get("SNAPSHOT_EPISODE_PAGES", "5"))
+# The page size of the web app, and those it asks categories with
+SNAPSHOT_EPISODE_PAGE_SIZE = int(
+    os.environ.get("SNAPSHOT_EPISODE_PAGE_SIZE", "20")
+)
+SNAPSHOT_CATEGORY_PAGE_SIZES = [
+    int(size)
+    for size in os.environ.get(
+        "SNAPSHOT_CATEGORY_PAGE_SIZES", "100,500,1000"
+    ).split(",")
+]
+
+KEY_PREFIX = "snapshot:"
+# Response headers kept with a snapshot; the validators are derived from
+# the dataset version when serving
+STORED_HEADERS = ("content-type", "last-modified")
+# After a Redis error, snapshots are skipped for this many seconds
+REDIS_RETRY_AFTER = 30.0
+
+ETAG_VERSION = re.compile(r'^W/"(\d+)-')
+
+
+def snapshot_target(path: str, params: Iterable[tuple[str, str]]) -> str:
+    """
+    Path and query a snapshot is stored under: parameters sorted, empty
+    ones dropped, as the web app sends `search=` and `categories=` unset.
+    """
+    query = "&".join(sorted(f"{k}={v}" for k, v in params if v != ""))
+    return f"{path}?{query}"
+
+
+def compress(content: bytes) -> dict[str, bytes]:
+    """The encodings a snapshot is stored in."""
+    return {
+        "br": brotli.compress(content, quality=11),
+        "gzip": gzip.compress(content, compresslevel=9, mtime=0),
+    }
+
+
+class SnapshotStore:
+    """
+    Precompressed API responses in Redis, one hash per dataset version and
+    request target, holding every encoding plus the stored headers.
+
+    Entries carry the dataset version, so any change to the catalog (an
+    admin edit, a new ingestion) makes them unreachable until the next
+    snapshot is rendered. Without Redis, nothing is stored or served.
+    """
+
+    def __init__(self, redis_url: str | None = None, ttl: int = SNAPSHOT_TTL):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self._redis: redis.Redis | None = None
+        self._async_redis: redis.asyncio.Redis | None = None
+        self._redis_down_until = 0.0
+
+    def save(
+        self,
+        version: int,
+        target: str,
+        content: bytes,
+        headers: dict[str, str],
+    ) -> None:
+        if not self.redis_url:
+            return
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(self.redis_url)
+
+        key = f"{KEY_PREFIX}{version}:{target}"
+        pipeline = self._redis.pipeline()
+        pipeline.delete(key)
+        pipeline.hset(
+            key,
+            mapping={
+                **{
+                    f"body:{encoding}": body
+                    for encoding, body in compress(content).items()
+                },
+                **{
+                    f"header:{name}": value
+                    for name, value in headers.items()
+                    if name in STORED_HEADERS
+                },
+            },
+        )
+        pipeline.expire(key, self.ttl)
+        pipeline.execute()
+
+    async def load(self, version: int, target: str) -> dict[str, bytes]:
+        """Fields of the snapshot of `target`, empty if there is none."""
+        client = self._async_client()
+        if client is None:
+            return {}
+        try:
+            fields = await client.hgetall(f"{KEY_PREFIX}{version}:{target}")
+        except redis.RedisError as e:
+            logger.warning(f"Snapshots: Redis unavailable: {e}")
+            self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+            return {}
+        return {name.decode(): value for name, value in fields.items()}
+
+    def _async_client(self) -> redis.asyncio.Redis | None:
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        if self._async_redis is None:
+            self._async_redis = redis.asyncio.Redis.from_url(
+                self.redis_url,
+                socket_timeout=0.25,
+                socket_connect_timeout=0.25,
+            )
+        return self._async_redis
+
+
+snapshot_store = SnapshotStore(redis_url=REDIS_URL)
+
+
+class SnapshotRenderer:
+    """
+    Requests the most read payloads from the API in process and stores
+    them: the first pages of the episodes listing in each order, every
+    page of every category list, and every episode.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, store: SnapshotStore):
+        self.client = client
+        self.store = store
+        self.rendered = 0
+
+    async def render(self, episode_ids: Iterable[int]) -> int:
+        for order in (None, "desc", "asc"):
+            params = {"size": SNAPSHOT_EPISODE_PAGE_SIZE}
+            if order:
+                params["order"] = order
+            await self.render_pages(
+                "/api/episodes", params, SNAPSHOT_EPISODE_PAGES
+            )
+
+        for type in CategoryType:
+            for size in SNAPSHOT_CATEGORY_PAGE_SIZES:
+                await self.render_pages(
+                    "/api/categories", {"type": type.value, "size": size}
+                )
+
+        for id in episode_ids:
+            await self.render_target(f"/api/episodes/{id}", {})
+
+        return self.rendered
+
+    async def render_pages(
+        self, path: str, params: dict, max_pages: int | None = None
+    ) -> None:
+        page = 1
+        while max_pages is None or page <= max_pages:
+            body = await self.render_target(path, {**params, "page": page})
+            if body is None or page >= (body.get("pages") or 0):
+                break
+            page += 1
+
+    async def render_target(self, path: str, params: dict) -> dict | None:
+        response = await self.client.get(path, params=params)
+        if response.status_code != 200:
+            logger.warning(
+                f"Snapshot of {path} {params} skipped: "
+                f"{response.status_code}"
+            )
+            return None
+
+        # The dataset version the response was built from
+        version = ETAG_VERSION.match(response.headers.get("etag", ""))
+        if version is None:
+            return None
+        self.store.save(
+            int(version.group(1)),
+            snapshot_target(path, ((k, str(v)) for k, v in params.items())),
+            response.content,
+            dict(response.headers),
+        )
+        self.rendered += 1
+        return response.json()
+
+
+async def render_snapshots(
+    episode_ids: Iterable[int], store: SnapshotStore = snapshot_store
+) -> int:
+    """
+    Render and store every snapshot through the API app, returning how
+    many were stored.
+    """
+    # Imported here so the worker only loads the API when rendering
+    from database import async_engine, replica_engines
+    from main import app
+    from rate_limit import rate_limiter
+
+    # Every snapshot request comes from this process, not from a client
+    rate_limiter.enabled = False
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://snapshot"
+        ) as client:
+            return await SnapshotRenderer(client, store).render(episode_ids)
+    finally:
+        # Pooled connections belong to this event loop only
+        await asyncio.gather(
+            async_engine.dispose(),
+            *(engine.dispose() for engine in replica_engines),
+        )
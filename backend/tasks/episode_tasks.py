@@ -2,12 +2,33 @@
 Celery tasks for episode ingestion and classification.
 """
 
+import time
+
 from celery import chain
+from celery.signals import task_postrun, task_prerun
 
 from logger import logger
+from metrics import celery_task_duration
 
 from .main import celery_app
 
+_task_started_at: dict[str, float] = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, **kwargs):
+    _task_started_at[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    """Duration of every task, by name and final state, for /metrics."""
+    started_at = _task_started_at.pop(task_id, None)
+    if started_at is not None:
+        celery_task_duration.observe(
+            time.perf_counter() - started_at, task.name, state or "UNKNOWN"
+        )
+
 
 @celery_app.task(
     bind=True,
@@ -83,17 +104,49 @@ def classify_episodes_task(
         raise self.retry(exc=e)
 
 
+@celery_app.task(
+    bind=True,
+    name="tasks.episode_tasks.build_snapshots_task",
+    max_retries=3,
+    default_retry_delay=300,  # 5 minutes
+)
+def build_snapshots_task(self, previous_result=None):
+    """
+    Celery task wrapper for the snapshot stage.
+
+    Renders the most requested API responses, precompressed, once the
+    catalog has changed.
+    """
+    logger.info("Starting Celery task: build_snapshots_task")
+
+    try:
+        from commands.build_snapshots import build_snapshots
+
+        rendered = build_snapshots()
+        logger.info("Successfully completed build_snapshots_task")
+        return {
+            "status": "success",
+            "message": "Snapshots built successfully",
+            "rendered": rendered,
+        }
+
+    except Exception as e:
+        logger.error(f"Error in build_snapshots_task: {e}", exc_info=True)
+        raise self.retry(exc=e)
+
+
 @celery_app.task(name="tasks.episode_tasks.ingest_and_classify_chain")
 def ingest_and_classify_chain(batch_size=50, max_total=None):
     """
-    Chain ingestion and classification tasks.
-    Classification only runs if ingestion succeeds.
+    Chain ingestion, classification and snapshot tasks.
+    Each stage only runs if the previous one succeeds.
     """
-    logger.info("Starting chained ingest -> classify workflow")
+    logger.info("Starting chained ingest -> classify -> snapshot workflow")
 
     workflow = chain(
         ingest_data_task.s(),
         classify_episodes_task.s(batch_size=batch_size, max_total=max_total),
+        build_snapshots_task.s(),
     )
 
     result = workflow.apply_async()
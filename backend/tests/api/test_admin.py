@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import Session, select
+
+from models import Category, CategoryAdmin, Episode, EpisodeCategory
+
+EDITED_BEFORE = datetime(2020, 1, 1)
+
+
+class TestCategoryAdmin:
+    def setup_method(self):
+        self.request = SimpleNamespace(state=SimpleNamespace())
+
+    def seed(self, db_session):
+        db_session.add_all(
+            [
+                *(
+                    Episode(
+                        id=id, title=f"Episodi {id}", updated_at=EDITED_BEFORE
+                    )
+                    for id in range(1, 4)
+                ),
+                Category(id=1, name="Guerra", slug="guerra"),
+                EpisodeCategory(episode_id=1, category_id=1),
+                EpisodeCategory(episode_id=2, category_id=1),
+            ]
+        )
+        db_session.commit()
+        view = CategoryAdmin()
+        view.session_maker = sessionmaker(
+            bind=db_session.get_bind(), class_=Session
+        )
+        return view
+
+    def touched(self, db_session):
+        db_session.expire_all()
+        return {
+            episode.id
+            for episode in db_session.exec(select(Episode)).all()
+            if episode.updated_at.replace(tzinfo=None) > EDITED_BEFORE
+        }
+
+    def test_edit_touches_episodes_linked_before_and_after(self, db_session):
+        view = self.seed(db_session)
+        category = db_session.get(Category, 1)
+
+        asyncio.run(view.on_model_change({}, category, False, self.request))
+        # The edit moves the category from episode 2 to episode 3
+        db_session.delete(db_session.get(EpisodeCategory, (2, 1)))
+        db_session.add(EpisodeCategory(episode_id=3, category_id=1))
+        db_session.commit()
+        asyncio.run(view.after_model_change({}, category, False, self.request))
+
+        assert self.touched(db_session) == {1, 2, 3}
+
+    def test_delete_touches_episodes_it_was_linked_to(self, db_session):
+        view = self.seed(db_session)
+        category = db_session.get(Category, 1)
+
+        asyncio.run(view.on_model_delete(category, self.request))
+        db_session.delete(category)
+        db_session.commit()
+        asyncio.run(view.after_model_delete(category, self.request))
+
+        assert self.touched(db_session) == {1, 2}
+        assert db_session.exec(select(EpisodeCategory)).all() == []
@@ -1,4 +1,12 @@
-from models import Episode
+import csv
+import io
+import json
+from datetime import datetime
+
+from models import Category, CategoryType, Episode, EpisodeCategory
+from repositories import CategoriesRepository
+from response_cache import response_cache
+from versioning import bump_dataset_version
 
 
 class TestEpisodes:
@@ -16,3 +24,493 @@ class TestEpisodes:
         assert response.status_code == 200
         assert response.json()["total"] == 1
         assert response.json()["items"][0]["title"] == "Test Episode"
+
+    def test_get_episodes_total_cached_until_version_bump(
+        self, client, db_session
+    ):
+        db_session.add(Episode(id=1, title="Test Episode"))
+        db_session.commit()
+        assert client.get("/api/episodes").json()["total"] == 1
+
+        db_session.add(Episode(id=2, title="Test Episode 2"))
+        db_session.commit()
+        # Another page size misses the response cache but not the count one
+        response = client.get("/api/episodes", params={"size": 10})
+        assert response.json()["total"] == 1
+        assert len(response.json()["items"]) == 2
+
+        bump_dataset_version(db_session)
+        db_session.commit()
+        assert client.get("/api/episodes").json()["total"] == 2
+
+    def test_get_episodes_response_cached_until_version_bump(
+        self, client, db_session
+    ):
+        db_session.add(Episode(id=1, title="Test Episode"))
+        db_session.commit()
+        first = client.get("/api/episodes", params={"search": "", "size": 5})
+
+        db_session.add(Episode(id=2, title="Test Episode 2"))
+        db_session.commit()
+        # Same parameters in another order share the cached response
+        second = client.get("/api/episodes", params={"size": 5, "search": ""})
+        assert second.json() == first.json()
+        assert second.headers["ETag"] == first.headers["ETag"]
+        assert response_cache.stats()["local_hits"] == 1
+
+        bump_dataset_version(db_session)
+        db_session.commit()
+        response = client.get("/api/episodes", params={"size": 5})
+        assert len(response.json()["items"]) == 2
+
+    def test_get_episodes_estimate_falls_back_to_exact(
+        self, client, db_session
+    ):
+        db_session.add(Episode(id=1, title="Test Episode"))
+        db_session.commit()
+
+        response = client.get("/api/episodes", params={"count": "estimate"})
+        assert response.status_code == 200
+        assert response.json()["total"] == 1
+
+    def test_get_episodes_category_match_and_exclude(self, client, db_session):
+        db_session.add_all(
+            [
+                Episode(id=1, title="Guerra Civil a Barcelona"),
+                Episode(id=2, title="Guerra Civil a Girona"),
+                Episode(id=3, title="Barcelona medieval"),
+                Category(
+                    id=1,
+                    name="Guerra Civil",
+                    slug="guerra-civil",
+                    type=CategoryType.TOPIC,
+                ),
+                Category(
+                    id=2,
+                    name="Barcelona",
+                    slug="barcelona",
+                    type=CategoryType.LOCATION,
+                ),
+                EpisodeCategory(episode_id=1, category_id=1),
+                EpisodeCategory(episode_id=1, category_id=2),
+                EpisodeCategory(episode_id=2, category_id=1),
+                EpisodeCategory(episode_id=3, category_id=2),
+            ]
+        )
+        db_session.commit()
+
+        def ids(**params):
+            response = client.get("/api/episodes", params=params)
+            assert response.status_code == 200
+            assert response.json()["total"] == len(response.json()["items"])
+            return sorted(item["id"] for item in response.json()["items"])
+
+        assert ids(categories="1,2") == [1, 2, 3]
+        assert ids(categories="1,2", match="all") == [1]
+        assert ids(categories="1", exclude="2") == [2]
+        assert ids(exclude="1") == [3]
+
+    def test_get_episodes_sparse_fields(self, client, db_session):
+        db_session.add_all(
+            [
+                Episode(
+                    id=1,
+                    title="Guerra Civil a Barcelona",
+                    description="Llarga descripció",
+                    published_at=datetime(2025, 1, 1),
+                ),
+                Category(
+                    id=1, name="Guerra", slug="guerra", type=CategoryType.TOPIC
+                ),
+                Category(
+                    id=2,
+                    name="Barcelona",
+                    slug="barcelona",
+                    type=CategoryType.LOCATION,
+                ),
+                EpisodeCategory(episode_id=1, category_id=1),
+                EpisodeCategory(episode_id=1, category_id=2),
+            ]
+        )
+        db_session.commit()
+
+        full = client.get("/api/episodes").json()["items"][0]
+        assert full["description"] == "Llarga descripció"
+        assert len(full["categories"]) == 2
+
+        response = client.get(
+            "/api/episodes", params={"fields": "title,categories"}
+        )
+        assert response.status_code == 200
+        assert response.json()["total"] == 1
+        assert response.json()["items"] == [
+            {
+                "id": 1,
+                "title": "Guerra Civil a Barcelona",
+                "categories": full["categories"],
+            }
+        ]
+
+        response = client.get(
+            "/api/episodes", params={"fields": "published_at"}
+        )
+        assert response.json()["items"] == [
+            {"id": 1, "published_at": full["published_at"]}
+        ]
+
+        response = client.get("/api/episodes", params={"fields": "bogus"})
+        assert response.status_code == 400
+
+    def test_documented_schemas_unchanged(self, client):
+        # The frontend client is generated from these
+        paths = client.get("/openapi.json").json()["paths"]
+
+        def schema(path):
+            responses = paths[path]["get"]["responses"]
+            return responses["200"]["content"]["application/json"]["schema"]
+
+        assert schema("/api/episodes") == {
+            "$ref": "#/components/schemas/Page_EpisodeWithCategories_"
+        }
+        assert schema("/api/categories") == {
+            "$ref": "#/components/schemas/PageCustomized_Category_"
+        }
+
+
+class TestEpisodesCursor:
+    def setup_method(self):
+        self.episodes = [
+            Episode(
+                id=1, title="Episode 1", published_at=datetime(2025, 1, 1)
+            ),
+            Episode(
+                id=2, title="Episode 2", published_at=datetime(2025, 1, 2)
+            ),
+            Episode(
+                id=3, title="Episode 3", published_at=datetime(2025, 1, 2)
+            ),
+            Episode(id=4, title="Episode 4", published_at=None),
+            Episode(
+                id=5, title="Episode 5", published_at=datetime(2025, 1, 3)
+            ),
+        ]
+
+    def _walk(self, client, **params):
+        ids, cursor = [], None
+        while True:
+            query = {**params, "size": 2}
+            if cursor:
+                query["cursor"] = cursor
+            response = client.get("/api/episodes/cursor", params=query)
+            assert response.status_code == 200
+            ids += [item["id"] for item in response.json()["items"]]
+            cursor = response.json()["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_walk_desc(self, client, db_session):
+        db_session.add_all(self.episodes)
+        db_session.commit()
+
+        assert self._walk(client, order="desc") == [4, 5, 3, 2, 1]
+
+    def test_walk_asc(self, client, db_session):
+        db_session.add_all(self.episodes)
+        db_session.commit()
+
+        assert self._walk(client, order="asc") == [1, 2, 3, 5, 4]
+
+    def test_total_only_when_requested(self, client, db_session):
+        db_session.add_all(self.episodes)
+        db_session.commit()
+
+        response = client.get("/api/episodes/cursor")
+        assert response.json()["total"] is None
+
+        response = client.get(
+            "/api/episodes/cursor", params={"include_total": True}
+        )
+        assert response.json()["total"] == 5
+
+    def test_invalid_cursor(self, client):
+        response = client.get(
+            "/api/episodes/cursor", params={"cursor": "not-a-cursor"}
+        )
+        assert response.status_code == 400
+
+
+class TestEpisodeFacets:
+    def setup_method(self):
+        self.rows = [
+            Episode(id=1, title="Guerra Civil a Barcelona"),
+            Episode(id=2, title="Guerra Civil a Girona"),
+            Episode(id=3, title="Barcelona medieval"),
+            Category(
+                id=1,
+                name="Guerra Civil",
+                slug="guerra-civil",
+                type=CategoryType.TOPIC,
+            ),
+            Category(
+                id=2,
+                name="Barcelona",
+                slug="barcelona",
+                type=CategoryType.LOCATION,
+            ),
+            Category(
+                id=3, name="Girona", slug="girona", type=CategoryType.LOCATION
+            ),
+            EpisodeCategory(episode_id=1, category_id=1),
+            EpisodeCategory(episode_id=1, category_id=2),
+            EpisodeCategory(episode_id=2, category_id=1),
+            EpisodeCategory(episode_id=2, category_id=3),
+            EpisodeCategory(episode_id=3, category_id=2),
+        ]
+
+    def _counts(self, facets):
+        return {
+            type: {facet["slug"]: facet["count"] for facet in items}
+            for type, items in facets.items()
+            if items
+        }
+
+    def test_get_facets_unfiltered(self, client, db_session):
+        db_session.add_all(self.rows)
+        db_session.commit()
+
+        response = client.get("/api/episodes/facets")
+        assert response.status_code == 200
+        assert response.json()["total"] == 3
+        assert set(response.json()["facets"]) == {
+            "topic",
+            "location",
+            "character",
+            "time_period",
+        }
+        assert self._counts(response.json()["facets"]) == {
+            "topic": {"guerra-civil": 2},
+            "location": {"barcelona": 2, "girona": 1},
+        }
+
+    def test_get_facets_filtered(self, client, db_session):
+        db_session.add_all(self.rows)
+        db_session.commit()
+
+        response = client.get(
+            "/api/episodes/facets",
+            params={"search": "guerra", "exclude": "3"},
+        )
+        assert response.json()["total"] == 1
+        assert self._counts(response.json()["facets"]) == {
+            "topic": {"guerra-civil": 1},
+            "location": {"barcelona": 1},
+        }
+
+
+class TestCategories:
+    def test_get_categories_by_type(self, client, db_session):
+        db_session.add_all(
+            [
+                Episode(id=1, title="Guerra Civil a Barcelona"),
+                Category(
+                    id=1,
+                    name="Guerra Civil",
+                    slug="guerra-civil",
+                    type=CategoryType.TOPIC,
+                ),
+                EpisodeCategory(episode_id=1, category_id=1),
+            ]
+        )
+        db_session.commit()
+        CategoriesRepository(db_session).refresh_category_stats()
+        db_session.commit()
+
+        response = client.get("/api/categories", params={"type": "topic"})
+        assert response.status_code == 200
+        assert response.json()["items"] == [
+            {
+                "id": 1,
+                "name": "Guerra Civil",
+                "slug": "guerra-civil",
+                "type": "topic",
+            }
+        ]
+
+
+class TestConditionalGet:
+    def test_etag_not_modified(self, client, db_session):
+        db_session.add(Episode(id=1, title="Test Episode"))
+        db_session.commit()
+
+        response = client.get("/api/episodes", params={"search": "test"})
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"].startswith("public")
+
+        response = client.get(
+            "/api/episodes",
+            params={"search": "test"},
+            headers={"If-None-Match": etag},
+        )
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+
+        # Another query is another representation
+        response = client.get(
+            "/api/episodes",
+            params={"search": "other"},
+            headers={"If-None-Match": etag},
+        )
+        assert response.status_code == 200
+
+    def test_etag_changes_with_dataset_version(self, client, db_session):
+        etag = client.get("/api/categories?type=topic").headers["etag"]
+
+        bump_dataset_version(db_session)
+        db_session.commit()
+
+        response = client.get(
+            "/api/categories?type=topic", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert "last-modified" in response.headers
+
+    def test_episode_if_modified_since(self, client, db_session):
+        db_session.add(
+            Episode(
+                id=1,
+                title="Test Episode",
+                updated_at=datetime(2025, 1, 1, 12, 0, 0),
+            )
+        )
+        db_session.commit()
+
+        response = client.get("/api/episodes/1")
+        assert response.headers["last-modified"] == (
+            "Wed, 01 Jan 2025 12:00:00 GMT"
+        )
+
+        response = client.get(
+            "/api/episodes/1",
+            headers={"If-Modified-Since": "Thu, 02 Jan 2025 00:00:00 GMT"},
+        )
+        assert response.status_code == 304
+
+        response = client.get(
+            "/api/episodes/1",
+            headers={"If-Modified-Since": "Tue, 31 Dec 2024 00:00:00 GMT"},
+        )
+        assert response.status_code == 200
+
+
+class TestFastJson:
+    def test_fast_json_matches_default_responses(
+        self, client, db_session, monkeypatch
+    ):
+        db_session.add_all(
+            [
+                Episode(
+                    id=1,
+                    title="Guerra Civil a Barcelona",
+                    description="Descripció",
+                    published_at=datetime(2025, 1, 1, 12, 30),
+                ),
+                Episode(id=2, title="Barcelona medieval"),
+                Category(
+                    id=1, name="Guerra", slug="guerra", type=CategoryType.TOPIC
+                ),
+                Category(
+                    id=2, name="Edat Mitjana", slug="edat-mitjana", type=None
+                ),
+                EpisodeCategory(episode_id=1, category_id=1),
+                EpisodeCategory(episode_id=2, category_id=2),
+            ]
+        )
+        CategoriesRepository(db_session).refresh_category_stats()
+        db_session.commit()
+        urls = [
+            "/api/episodes",
+            "/api/episodes?fields=title,categories&order=asc",
+            "/api/categories?type=topic",
+        ]
+
+        default = [client.get(url) for url in urls]
+        monkeypatch.setattr("api.endpoints.FAST_JSON", True)
+        fast = [client.get(url) for url in urls]
+
+        for default_response, fast_response in zip(default, fast):
+            assert fast_response.status_code == 200
+            assert fast_response.json() == default_response.json()
+            assert fast_response.headers["etag"] == (
+                default_response.headers["etag"]
+            )
+
+
+class TestExport:
+    def seed(self, db_session):
+        db_session.add_all(
+            [
+                Episode(
+                    id=1,
+                    title="Guerra Civil a Barcelona",
+                    published_at=datetime(2025, 1, 1, 12, 30),
+                ),
+                Episode(id=2, title="Barcelona, medieval"),
+                Category(
+                    id=1, name="Guerra", slug="guerra", type=CategoryType.TOPIC
+                ),
+                Category(
+                    id=2,
+                    name="Edat Mitjana",
+                    slug="edat-mitjana",
+                    type=CategoryType.TIME_PERIOD,
+                ),
+                EpisodeCategory(episode_id=1, category_id=1),
+                EpisodeCategory(episode_id=1, category_id=2),
+            ]
+        )
+        db_session.commit()
+
+    def test_export_ndjson_matches_listing(self, client, db_session):
+        self.seed(db_session)
+
+        response = client.get("/api/export/episodes")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        exported = [json.loads(line) for line in response.text.splitlines()]
+
+        listed = client.get("/api/episodes", params={"order": "asc"}).json()
+        by_id = {item["id"]: item for item in listed["items"]}
+        assert [episode["id"] for episode in exported] == [1, 2]
+        for episode in exported:
+            item = by_id[episode["id"]]
+            assert episode["title"] == item["title"]
+            assert episode["published_at"] == item["published_at"]
+            assert sorted(
+                episode["categories"], key=lambda category: category["id"]
+            ) == sorted(
+                item["categories"], key=lambda category: category["id"]
+            )
+
+    def test_export_csv(self, client, db_session):
+        self.seed(db_session)
+
+        response = client.get("/api/export/episodes", params={"format": "csv"})
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+
+        assert [row["title"] for row in rows] == [
+            "Guerra Civil a Barcelona",
+            "Barcelona, medieval",
+        ]
+        assert rows[0]["topic"] == "Guerra"
+        assert rows[0]["time_period"] == "Edat Mitjana"
+        assert rows[0]["published_at"] == "2025-01-01T12:30:00"
+        assert rows[1]["topic"] == ""
+
+    def test_export_gzip(self, client, db_session):
+        self.seed(db_session)
+
+        response = client.get("/api/export/episodes", params={"gzip": True})
+        assert response.headers["content-encoding"] == "gzip"
+        # The client decompresses transparently
+        assert len(response.text.splitlines()) == 2
@@ -0,0 +1,101 @@
+import re
+
+from metrics import Counter, Histogram, Registry
+from models import Episode
+
+
+def sample(exposition, name, **labels):
+    """Value of the sample `name` with (at least) `labels`."""
+    for line in exposition.splitlines():
+        match = re.match(r"^(\w+)(?:\{(.*)\})? (\S+)$", line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="([^"]*)"', match.group(2) or ""))
+        if all(found.get(key) == value for key, value in labels.items()):
+            return float(match.group(3))
+    return None
+
+
+class TestRegistry:
+    def test_exposition(self):
+        registry = Registry()
+        latency = registry.register(
+            Histogram("latency_seconds", "Latency", ("route",), (0.1, 1.0))
+        )
+        hits = registry.register(Counter("hits_total", "Hits", ("route",)))
+        latency.observe(0.05, '/a"b')
+        latency.observe(0.5, '/a"b')
+        hits.inc(2, "/a")
+
+        exposition = registry.exposition()
+
+        assert "# TYPE latency_seconds histogram" in exposition
+        assert 'latency_seconds_bucket{route="/a\\"b",le="0.1"} 1' in (
+            exposition
+        )
+        assert 'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 2' in (
+            exposition
+        )
+        assert 'latency_seconds_count{route="/a\\"b"} 2' in exposition
+        assert 'hits_total{route="/a"} 2' in exposition
+
+
+class TestMetricsEndpoint:
+    def test_disabled_without_token(self, client):
+        assert client.get("/metrics").status_code == 404
+
+    def test_requires_token(self, client, monkeypatch):
+        monkeypatch.setattr("main.METRICS_TOKEN", "secret")
+
+        assert client.get("/metrics").status_code == 401
+        response = client.get(
+            "/metrics", headers={"Authorization": "Bearer wrong"}
+        )
+        assert response.status_code == 401
+
+    def test_request_latency_and_queries(
+        self, client, db_session, monkeypatch
+    ):
+        monkeypatch.setattr("main.METRICS_TOKEN", "secret")
+        db_session.add(Episode(id=1, title="Test Episode"))
+        db_session.commit()
+
+        client.get("/api/episodes", params={"search": "test", "size": 7})
+        response = client.get(
+            "/metrics", headers={"Authorization": "Bearer secret"}
+        )
+
+        assert response.status_code == 200
+        exposition = response.text
+        assert (
+            sample(
+                exposition,
+                "http_request_duration_seconds_count",
+                route="/api/episodes",
+                status="200",
+                search="true",
+            )
+            >= 1
+        )
+        # Version, count and page queries at least
+        assert (
+            sample(
+                exposition,
+                "http_request_db_queries_sum",
+                route="/api/episodes",
+            )
+            >= 3
+        )
+        assert sample(exposition, "db_pool_size", role="api") is not None
+        assert (
+            sample(exposition, "response_cache_events_total", event="misses")
+            >= 1
+        )
+        assert (
+            sample(exposition, "rate_limiter_events_total", event="denied")
+            is not None
+        )
+
+    def test_internal_stats_not_public(self, client):
+        for path in ("/health/cache", "/health/ratelimit", "/health/pool"):
+            assert client.get(path).status_code == 404
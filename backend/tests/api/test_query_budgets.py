@@ -0,0 +1,62 @@
+import pytest
+
+from models import Category, CategoryType, Episode, EpisodeCategory
+from repositories import CategoriesRepository
+
+EPISODES = 10
+
+
+@pytest.fixture
+def catalog(db_session):
+    """Enough episodes and links for an N+1 to blow any budget below."""
+    db_session.add_all(
+        Category(
+            id=id,
+            name=f"Categoria {id}",
+            slug=f"categoria-{id}",
+            type=CategoryType.TOPIC,
+        )
+        for id in range(1, 4)
+    )
+    db_session.add_all(
+        Episode(id=id, title=f"Episodi {id}") for id in range(1, EPISODES + 1)
+    )
+    db_session.add_all(
+        EpisodeCategory(episode_id=episode_id, category_id=category_id)
+        for episode_id in range(1, EPISODES + 1)
+        for category_id in range(1, 4)
+    )
+    CategoriesRepository(db_session).refresh_category_stats()
+    db_session.commit()
+
+
+# Every request below starts on cold caches, so each reads the dataset
+# version first
+@pytest.mark.parametrize(
+    "url, budget",
+    [
+        # version, count, page, categories of the page
+        ("/api/episodes", 4),
+        ("/api/episodes?search=Episodi&order=asc", 4),
+        ("/api/episodes?fields=title,categories", 4),
+        ("/api/episodes?fields=title", 3),
+        # plus the category index
+        ("/api/episodes?categories=1,2&match=all", 5),
+        ("/api/episodes/cursor", 3),
+        ("/api/episodes/cursor?include_total=true", 4),
+        ("/api/episodes/facets?categories=1", 4),
+        ("/api/episodes/3", 3),
+        ("/api/categories?type=topic", 3),
+        ("/api/export/episodes", 2),
+    ],
+)
+def test_endpoint_query_budget(client, catalog, query_budget, url, budget):
+    with query_budget(budget):
+        response = client.get(url)
+    assert response.status_code == 200
+
+
+def test_cached_responses_run_no_query(client, catalog, query_budget):
+    client.get("/api/episodes")
+    with query_budget(0):
+        client.get("/api/episodes")
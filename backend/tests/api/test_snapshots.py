@@ -0,0 +1,135 @@
+import asyncio
+import gzip
+
+import httpx
+from fastapi.testclient import TestClient
+
+from api.snapshots import SnapshotMiddleware
+from main import app
+from models import Category, CategoryType, Episode
+from repositories import CategoriesRepository
+from snapshots import SnapshotRenderer, SnapshotStore, compress
+
+
+class MemorySnapshotStore(SnapshotStore):
+    """Keeps snapshots in a dict instead of Redis."""
+
+    def __init__(self):
+        super().__init__()
+        self.entries = {}
+
+    def save(self, version, target, content, headers):
+        self.entries[(version, target)] = {
+            **{
+                f"body:{encoding}": body
+                for encoding, body in compress(content).items()
+            },
+            "header:content-type": headers["content-type"].encode(),
+        }
+
+    async def load(self, version, target):
+        return self.entries.get((version, target), {})
+
+
+def render(store, episode_ids):
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            return await SnapshotRenderer(client, store).render(episode_ids)
+
+    return asyncio.run(run())
+
+
+class TestSnapshots:
+    def seed(self, db_session):
+        db_session.add_all(
+            [
+                Episode(id=1, title="Guerra Civil"),
+                Episode(id=2, title="Barcelona medieval"),
+                Category(
+                    id=1, name="Guerra", slug="guerra", type=CategoryType.TOPIC
+                ),
+            ]
+        )
+        CategoriesRepository(db_session).refresh_category_stats()
+        db_session.commit()
+
+    def test_render_stores_listings_categories_and_episodes(
+        self, client, db_session
+    ):
+        self.seed(db_session)
+        store = MemorySnapshotStore()
+
+        render(store, [1, 2])
+
+        targets = {target for _, target in store.entries}
+        assert "/api/episodes?page=1&size=20" in targets
+        assert "/api/episodes?order=asc&page=1&size=20" in targets
+        assert "/api/categories?page=1&size=500&type=topic" in targets
+        assert "/api/episodes/2?" in targets
+        # A single page of episodes, so no second one
+        assert "/api/episodes?page=2&size=20" not in targets
+
+    def test_middleware_serves_matching_requests(self, client, db_session):
+        self.seed(db_session)
+        store = MemorySnapshotStore()
+        render(store, [1, 2])
+        snapshot_client = TestClient(SnapshotMiddleware(app, store=store))
+
+        live = client.get("/api/episodes/1")
+        # Empty parameters, as the web app sends them, match too
+        response = snapshot_client.get(
+            "/api/episodes",
+            params={"page": 1, "size": 20, "search": ""},
+            headers={"Accept-Encoding": "gzip"},
+        )
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.json()["total"] == 2
+
+        detail = snapshot_client.get(
+            "/api/episodes/1", headers={"Accept-Encoding": "gzip"}
+        )
+        assert detail.headers["content-encoding"] == "gzip"
+        assert detail.json() == live.json()
+        assert detail.headers["etag"] == live.headers["etag"]
+
+        not_modified = snapshot_client.get(
+            "/api/episodes/1",
+            headers={
+                "Accept-Encoding": "gzip",
+                "If-None-Match": live.headers["etag"],
+            },
+        )
+        assert not_modified.status_code == 304
+
+        # Brotli is preferred when both are accepted
+        response = snapshot_client.get(
+            "/api/episodes/1", headers={"Accept-Encoding": "gzip, br"}
+        )
+        assert response.headers["content-encoding"] == "br"
+
+    def test_middleware_falls_back_to_live(self, client, db_session):
+        self.seed(db_session)
+        store = MemorySnapshotStore()
+        render(store, [1])
+        snapshot_client = TestClient(SnapshotMiddleware(app, store=store))
+
+        # Not rendered
+        response = snapshot_client.get(
+            "/api/episodes/2", headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+
+        # No accepted encoding
+        response = snapshot_client.get(
+            "/api/episodes/1", headers={"Accept-Encoding": "identity"}
+        )
+        assert "content-encoding" not in response.headers
+
+    def test_gzip_is_deterministic(self):
+        content = b'{"items": []}'
+        assert compress(content)["gzip"] == compress(content)["gzip"]
+        assert gzip.decompress(compress(content)["gzip"]) == content
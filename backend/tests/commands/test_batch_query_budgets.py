@@ -0,0 +1,76 @@
+import json
+from unittest.mock import MagicMock
+
+from commands.classify_episodes import classify_episodes
+from commands.ingest_data import ingest_data
+from models import Episode
+
+
+def api_page(items):
+    response = MagicMock()
+    response.json.return_value = {
+        "resposta": {
+            "items": {"item": items},
+            "paginacio": {"total_pagines": 1},
+        }
+    }
+    return lambda *args, **kwargs: response
+
+
+def classification_client(classification: dict):
+    client = MagicMock()
+    message = MagicMock(content=json.dumps(classification))
+    client.chat.completions.create.return_value = MagicMock(
+        choices=[MagicMock(message=message)]
+    )
+    return lambda *args, **kwargs: client
+
+
+class TestIngestionQueryBudget:
+    def test_ingest_page(self, db_session, monkeypatch, query_budget):
+        items = [
+            {
+                "id": id,
+                "titol": f"Episodi {id}",
+                "data_publicacio": "01/01/2020 00:00:00",
+            }
+            for id in range(10, 0, -1)
+        ]
+        monkeypatch.setattr(
+            "commands.ingest_data.requests.get", api_page(items)
+        )
+        monkeypatch.setattr(
+            "commands.ingest_data.get_session", lambda: iter([db_session])
+        )
+
+        # Position read, insert and checkpoint, one id lookup and one
+        # upsert for the whole page, and the run's version bump (which
+        # inserts the version row on an empty database)
+        with query_budget(7):
+            ingest_data()
+
+
+class TestClassificationQueryBudget:
+    def test_classify_batch(self, db_session, monkeypatch, query_budget):
+        db_session.add_all(
+            Episode(id=id, title=f"Episodi {id}", description="Descripció")
+            for id in range(1, 6)
+        )
+        db_session.commit()
+        monkeypatch.setattr(
+            "commands.classify_episodes.OpenAI",
+            classification_client(
+                {"temàtica": ["Guerra", "Exili"], "època": ["Segle XX"]}
+            ),
+        )
+        monkeypatch.setattr(
+            "commands.classify_episodes.get_session",
+            lambda: iter([db_session]),
+        )
+
+        # The batch and its categories, stats refresh and version bump; per
+        # episode the known categories for the prompt, a lookup, a link
+        # check and a link insert per category and the updated_at flush;
+        # new categories are inserted once
+        with query_budget(6 + 5 * (1 + 3 * 3 + 1) + 3):
+            classify_episodes(batch_size=5, max_total=5)
@@ -1,10 +1,16 @@
+import random
 import re
+import threading
+import time
+from datetime import datetime
 from unittest.mock import Mock
 
+import requests
 from sqlmodel import select
 
 from commands.ingest_data import ingest_data
 from models import Episode, IngestionPosition
+from services import EpisodesService
 
 
 def mock_api_response(items, pagination=None):
@@ -125,44 +131,258 @@ class TestIngestData:
 
     def test_ingest_incremental_update(self, db_session, monkeypatch):
         """
-        Tests that ingestion stops when it finds an already existing episode.
+        Tests that ingestion stops at a page of already stored episodes
+        no newer than the watermark.
         """
-        position = IngestionPosition(id=1, last_episode_id=2)
-        db_session.add(position)
+        db_session.add_all(
+            [
+                IngestionPosition(
+                    id=1,
+                    last_episode_id=2,
+                    newest_published_at=datetime(2020, 1, 2),
+                ),
+                Episode(id=2, title="Existing Episode 2"),
+                Episode(id=1, title="Old Episode 1"),
+            ]
+        )
         db_session.commit()
 
-        mock_api_items = [
-            {
-                "id": 3,
-                "titol": "New Episode 3",
-                "data_publicacio": "03/01/2020 00:00:00",
-            },
-            {
-                "id": 2,
-                "titol": "Existing Episode 2",
-                "data_publicacio": "02/01/2020 00:00:00",
-            },
-            {
-                "id": 1,
-                "titol": "Old Episode 1",
-                "data_publicacio": "01/01/2020 00:00:00",
-            },
-        ]
-        monkeypatch.setattr(
-            "commands.ingest_data.requests.get",
-            mock_api_response(mock_api_items, self.pagination),
-        )
+        pages = {
+            1: [
+                {
+                    "id": 3,
+                    "titol": "New Episode 3",
+                    "data_publicacio": "03/01/2020 00:00:00",
+                },
+                {
+                    "id": 2,
+                    "titol": "Existing Episode 2",
+                    "data_publicacio": "02/01/2020 00:00:00",
+                },
+            ],
+            2: [
+                {
+                    "id": 1,
+                    "titol": "Old Episode 1",
+                    "data_publicacio": "01/01/2020 00:00:00",
+                },
+            ],
+            3: [
+                {
+                    "id": 0,
+                    "titol": "Oldest Episode 0",
+                    "data_publicacio": "01/01/2019 00:00:00",
+                },
+            ],
+        }
+        mock_get = Mock(side_effect=create_paginated_mock(pages))
+        monkeypatch.setattr("commands.ingest_data.requests.get", mock_get)
+        monkeypatch.setattr("commands.ingest_data.INGEST_CONCURRENCY", 1)
         monkeypatch.setattr(
             "commands.ingest_data.get_session", lambda: iter([db_session])
         )
 
         ingest_data()
 
-        # only one new episode (ID=3) should have been added.
+        # Only the new episode (ID=3) is added; page 2 is in sync, so page
+        # 3 is never requested
         episodes = db_session.exec(select(Episode)).all()
-        assert len(episodes) == 1
-        assert episodes[0].id == 3
+        assert {e.id for e in episodes} == {1, 2, 3}
+        assert mock_get.call_count == 2
 
-        # IngestionPosition should be updated to the newest ID
+        # IngestionPosition should be updated to the newest ID and date
         updated_position = db_session.get(IngestionPosition, 1)
         assert updated_position.last_episode_id == 3
+        assert updated_position.newest_published_at == datetime(2020, 1, 3)
+
+    def test_pages_fetched_concurrently_are_processed_in_order(
+        self, db_session, monkeypatch
+    ):
+        pages = {
+            page: [
+                {
+                    "id": 100 - page * 10 - offset,
+                    "titol": f"Episode {page}.{offset}",
+                }
+                for offset in range(3)
+            ]
+            for page in range(1, 7)
+        }
+        paginated = create_paginated_mock(pages)
+        delays = random.Random(0)
+
+        def slow_get(url, timeout):
+            # Later pages may answer before earlier ones
+            time.sleep(delays.uniform(0, 0.02))
+            return paginated(url, timeout)
+
+        monkeypatch.setattr("commands.ingest_data.requests.get", slow_get)
+        monkeypatch.setattr(
+            "commands.ingest_data.get_session", lambda: iter([db_session])
+        )
+        saved = []
+
+        def upsert_episodes(self, episodes):
+            saved.extend(episode.id for episode in episodes)
+            return len(episodes)
+
+        monkeypatch.setattr(
+            "repositories.EpisodesRepository.upsert_episodes", upsert_episodes
+        )
+
+        ingest_data()
+
+        assert saved == [
+            item["id"] for page in pages.values() for item in page
+        ]
+        assert db_session.get(IngestionPosition, 1).last_episode_id == 90
+
+    def test_incremental_run_stops_fetching_early(
+        self, db_session, monkeypatch
+    ):
+        pages = {
+            page: [
+                {
+                    "id": 100 - page * 10,
+                    "titol": f"Episode {page}",
+                    "data_publicacio": f"{30 - page:02d}/01/2020 00:00:00",
+                }
+            ]
+            for page in range(1, 30)
+        }
+        db_session.add(
+            IngestionPosition(id=1, newest_published_at=datetime(2020, 1, 28))
+        )
+        db_session.add_all(
+            Episode(id=100 - page * 10, title=f"Episode {page}")
+            for page in range(2, 30)
+        )
+        db_session.commit()
+        mock_get = Mock(side_effect=create_paginated_mock(pages))
+        monkeypatch.setattr("commands.ingest_data.requests.get", mock_get)
+        monkeypatch.setattr(
+            "commands.ingest_data.get_session", lambda: iter([db_session])
+        )
+        monkeypatch.setattr("commands.ingest_data.INGEST_CONCURRENCY", 4)
+
+        ingest_data()
+
+        assert db_session.get(Episode, 90) is not None
+        # In sync on page 2, so at most a window of pages ahead was
+        # requested
+        assert mock_get.call_count <= 2 + 4
+
+    def test_failed_page_is_retried(self, db_session, monkeypatch):
+        paginated = create_paginated_mock({1: self.items})
+        attempts = []
+        lock = threading.Lock()
+
+        def flaky_get(url, timeout):
+            with lock:
+                attempts.append(url)
+                if len(attempts) < 3:
+                    raise requests.ConnectionError("Connection reset")
+            return paginated(url, timeout)
+
+        monkeypatch.setattr("commands.ingest_data.requests.get", flaky_get)
+        monkeypatch.setattr("commands.ingest_data.INGEST_RETRY_BACKOFF", 0)
+        monkeypatch.setattr(
+            "commands.ingest_data.get_session", lambda: iter([db_session])
+        )
+
+        ingest_data()
+
+        assert len(attempts) == 3
+        assert len(db_session.exec(select(Episode)).all()) == 3
+
+    def test_failed_backfill_resumes_from_last_committed_page(
+        self, db_session, monkeypatch
+    ):
+        pages = {
+            page: [
+                {
+                    "id": 10 - page,
+                    "titol": f"Episode {page}",
+                    "data_publicacio": f"{10 - page:02d}/01/2020 00:00:00",
+                }
+            ]
+            for page in range(1, 5)
+        }
+        paginated = create_paginated_mock(pages)
+        requested = []
+
+        def get(url, timeout):
+            page = int(re.search(r"pagina=(\d+)", url).group(1))
+            requested.append(page)
+            if page == 3 and fail:
+                raise requests.ConnectionError("Connection reset")
+            return paginated(url, timeout)
+
+        monkeypatch.setattr("commands.ingest_data.requests.get", get)
+        monkeypatch.setattr("commands.ingest_data.INGEST_CONCURRENCY", 1)
+        monkeypatch.setattr("commands.ingest_data.INGEST_RETRIES", 0)
+        monkeypatch.setattr(
+            "commands.ingest_data.get_session", lambda: iter([db_session])
+        )
+
+        fail = True
+        ingest_data()
+
+        position = db_session.get(IngestionPosition, 1)
+        assert position.backfill_page == 3
+        assert {e.id for e in db_session.exec(select(Episode)).all()} == {
+            9,
+            8,
+        }
+
+        fail = False
+        requested.clear()
+        ingest_data()
+
+        # The head is in sync, then the backfill steps back to page 2,
+        # which holds stored episodes, and goes on from there
+        assert requested == [1, 2, 3, 4]
+        assert db_session.get(IngestionPosition, 1).backfill_page is None
+        assert len(db_session.exec(select(Episode)).all()) == 4
+
+    def test_resumed_backfill_skips_none_removed_upstream(
+        self, db_session, monkeypatch
+    ):
+        def item(id):
+            return {
+                "id": id,
+                "titol": f"Episode {id}",
+                "data_publicacio": f"{id:02d}/01/2020 00:00:00",
+            }
+
+        # Pages of 2 from 12 down to 1; a failed run stored pages 1 to 3
+        db_session.add_all(
+            EpisodesService(None).create_episode_from_api_data(item(id))
+            for id in range(12, 6, -1)
+        )
+        db_session.add(
+            IngestionPosition(
+                id=1,
+                newest_published_at=datetime(2020, 1, 12),
+                backfill_page=4,
+            )
+        )
+        db_session.commit()
+
+        # Then 7 to 10 were removed upstream: 6 and 5 moved up to page 2,
+        # before the resumed page
+        remaining = [item(id) for id in (12, 11, 6, 5, 4, 3, 2, 1)]
+        pages = {}
+        for index, entry in enumerate(remaining):
+            pages.setdefault(index // 2 + 1, []).append(entry)
+        monkeypatch.setattr(
+            "commands.ingest_data.requests.get", create_paginated_mock(pages)
+        )
+        monkeypatch.setattr(
+            "commands.ingest_data.get_session", lambda: iter([db_session])
+        )
+
+        ingest_data()
+
+        ids = set(db_session.exec(select(Episode.id)).all())
+        assert set(range(1, 7)) <= ids
@@ -0,0 +1,93 @@
+import re
+
+import requests
+from sqlmodel import select
+
+from benchmarks.replay_api import ReplayServer, load_archive
+from commands.ingest_data import ingest_data
+from commands.record_api import record_api
+from models import Episode
+
+
+def api_item(id: int) -> dict:
+    return {
+        "id": id,
+        "titol": f"Episodi {id}",
+        "nom_friendly": f"episodi-{id}",
+        "entradeta": "Història de Catalunya",
+        "data_publicacio": f"{id:02d}/01/2020 00:00:00",
+    }
+
+
+def record(path, monkeypatch, pages: int | None = None) -> None:
+    """Record 4 pages of 3 episodes, newest first, from a mocked API."""
+    items = [api_item(id) for id in range(12, 0, -1)]
+
+    def get(url, timeout):
+        page = int(re.search(r"pagina=(\d+)", url).group(1))
+        start = (page - 1) * 3
+        end = start + 3
+        response = requests.Response()
+        response.status_code = 200
+        response._content = requests.compat.json.dumps(
+            {
+                "resposta": {
+                    "items": {"item": items[start:end]},
+                    "paginacio": {"total_pagines": 4},
+                }
+            }
+        ).encode()
+        return response
+
+    monkeypatch.setattr("commands.ingest_data.requests.get", get)
+    record_api(str(path), pages=pages, concurrency=2)
+    monkeypatch.undo()
+
+
+def test_record_and_replay_with_another_page_size(tmp_path, monkeypatch):
+    archive = tmp_path / "api.ndjson.gz"
+    record(archive, monkeypatch, pages=3)
+
+    header, items = load_archive(str(archive))
+    assert header["page_size"] == 3
+    assert [item["id"] for item in items] == list(range(12, 3, -1))
+
+    with ReplayServer(str(archive), page_size=4) as server:
+        first = requests.get(f"{server.base_url}&pagina=1", timeout=5)
+        last = requests.get(f"{server.base_url}&pagina=3", timeout=5)
+
+    assert server.base_url.endswith("ordre=-data_publicacio")
+    page = first.json()["resposta"]
+    assert [item["id"] for item in page["items"]["item"]] == [12, 11, 10, 9]
+    assert page["paginacio"]["total_pagines"] == 3
+    assert [
+        item["id"] for item in last.json()["resposta"]["items"]["item"]
+    ] == [
+        4
+    ]  # noqa: E501
+
+
+def test_ingest_through_failing_replay(tmp_path, monkeypatch, db_session):
+    archive = tmp_path / "api.ndjson.gz"
+    record(archive, monkeypatch)
+
+    monkeypatch.setattr(
+        "commands.ingest_data.get_session", lambda: iter([db_session])
+    )
+    monkeypatch.setattr("commands.ingest_data.INGEST_RETRIES", 6)
+    monkeypatch.setattr("commands.ingest_data.INGEST_RETRY_BACKOFF", 0)
+    with ReplayServer(
+        str(archive),
+        page_size=2,
+        latency=5,
+        jitter=5,
+        error_rate=0.3,
+        malformed_rate=0.2,
+        seed=2,
+    ) as server:
+        monkeypatch.setattr("commands.ingest_data.BASE_URL", server.base_url)
+        ingest_data()
+
+    ids = db_session.exec(select(Episode.id)).all()
+    assert sorted(ids) == list(range(1, 13))
+    assert server.stats["error"] and server.stats["malformed"]
@@ -0,0 +1,57 @@
+from sqlmodel import func, select
+
+from commands.seed_synthetic import SyntheticCatalog, seed_synthetic
+from models import Category, CategoryStats, Episode, EpisodeCategory
+
+
+class TestSeedSynthetic:
+    def test_catalog_is_deterministic(self):
+        first = SyntheticCatalog(episodes=50, categories=40, seed=7)
+        second = SyntheticCatalog(episodes=50, categories=40, seed=7)
+        other = SyntheticCatalog(episodes=50, categories=40, seed=8)
+
+        assert first.categories == second.categories
+        assert list(first.rows()) == list(second.rows())
+        assert list(first.rows()) != list(other.rows())
+
+    def test_seed_loads_catalog(self, db_session, monkeypatch):
+        monkeypatch.setattr(
+            "commands.seed_synthetic.get_session", lambda: iter([db_session])
+        )
+        db_session.add(Episode(id=10, title="Episodi real"))
+        db_session.commit()
+
+        links = seed_synthetic(episodes=500, categories=100, batch_size=128)
+
+        assert db_session.exec(select(func.count(Episode.id))).one() == 501
+        assert db_session.exec(select(func.count(Category.id))).one() == 100
+        assert (
+            db_session.exec(
+                select(func.count()).select_from(EpisodeCategory)
+            ).one()
+            == links
+        )
+        # Appended after the existing episodes
+        assert db_session.exec(select(func.min(Episode.id))).one() == 10
+        assert db_session.get(Episode, 11).description
+
+        counts = db_session.exec(
+            select(CategoryStats.episode_count).order_by(
+                CategoryStats.episode_count.desc()
+            )
+        ).all()
+        # Power law: the most used category tags far more episodes than
+        # the median one
+        assert counts[0] > 10 * counts[len(counts) // 2]
+
+    def test_replace_empties_catalog(self, db_session, monkeypatch):
+        monkeypatch.setattr(
+            "commands.seed_synthetic.get_session", lambda: iter([db_session])
+        )
+        db_session.add(Episode(id=10, title="Episodi real"))
+        db_session.commit()
+
+        seed_synthetic(episodes=20, categories=10, replace=True)
+
+        assert db_session.get(Episode, 10).title != "Episodi real"
+        assert db_session.exec(select(func.count(Episode.id))).one() == 20
@@ -1,36 +1,137 @@
+import shutil
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy.pool import StaticPool
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from database import get_session
+from category_index import category_index
+from database import get_async_session, get_read_session, get_session
 from main import app
+from query_cache import count_cache, facet_cache
+from rate_limit import rate_limiter
+from response_cache import response_cache
+from versioning import reset_dataset_version_cache
+
+# A database file, so the async engine used by the API sees the rows the
+# tests commit through the sync one
+test_db_path = Path(tempfile.mkdtemp()) / "test.db"
 
 test_engine = create_engine(
-    "sqlite:///:memory:",
+    f"sqlite:///{test_db_path}",
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
 
+# TestClient may run each request in a new event loop, so connections are
+# not pooled across requests
+async_test_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{test_db_path}", poolclass=NullPool
+)
+
+
+class QueryRecorder:
+    """Statements run on the test engines while recording."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def report(self) -> str:
+        """
+        The statements, each with how many times it ran; one running once
+        per item is the usual N+1.
+        """
+        return "\n".join(
+            f"{count}x {statement}"
+            for statement, count in Counter(self.statements).most_common()
+        )
+
+
+@contextmanager
+def record_queries():
+    recorder = QueryRecorder()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorder.statements.append(" ".join(statement.split()))
+
+    engines = [test_engine, async_test_engine.sync_engine]
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield recorder
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Context manager failing the test when the block runs more than
+    `budget` statements, listing them:
+
+        with query_budget(3):
+            client.get("/api/episodes")
+    """
+
+    @contextmanager
+    def within(budget: int):
+        with record_queries() as queries:
+            yield queries
+        assert len(queries) <= budget, (
+            f"{len(queries)} queries over a budget of {budget}:\n"
+            f"{queries.report()}"
+        )
+
+    return within
+
 
 @pytest.fixture(scope="session", autouse=True)
 def create_test_db():
     SQLModel.metadata.create_all(test_engine)
     yield
     SQLModel.metadata.drop_all(test_engine)
+    test_engine.dispose()
+    shutil.rmtree(test_db_path.parent, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Every test starts from an empty database, at dataset version 0
+    reset_dataset_version_cache()
+    count_cache.clear()
+    facet_cache.clear()
+    category_index.clear()
+    response_cache.clear()
+    rate_limiter.clear()
+    yield
 
 
 @pytest.fixture
 def db_session():
-    connection = test_engine.connect()
-    transaction = connection.begin()
-    session = Session(bind=connection)
+    session = Session(test_engine)
     try:
         yield session
     finally:
+        session.rollback()
+        for table in reversed(SQLModel.metadata.sorted_tables):
+            session.exec(table.delete())
+        session.commit()
         session.close()
-        transaction.rollback()
-        connection.close()
+
+
+@pytest.fixture
+def async_engine():
+    return async_test_engine
 
 
 @pytest.fixture
@@ -38,7 +139,13 @@ def client(db_session):
     def get_session_override():
         yield db_session
 
+    async def get_async_session_override():
+        async with AsyncSession(async_test_engine) as session:
+            yield session
+
     app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
+    app.dependency_overrides[get_read_session] = get_async_session_override
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
@@ -0,0 +1,49 @@
+from sqlmodel import Session, SQLModel, create_engine
+
+from versioning import (
+    bump_dataset_version,
+    get_dataset_version,
+    peek_dataset_state,
+)
+
+
+def test_memo_reset_only_once_the_bump_commits(db_session):
+    assert get_dataset_version(db_session) == 0
+
+    bump_dataset_version(db_session)
+    # Other requests keep the committed version until the commit
+    assert get_dataset_version(db_session) == 0
+
+    db_session.commit()
+    assert get_dataset_version(db_session) == 1
+
+
+def test_rolled_back_bump_keeps_the_memo(db_session):
+    bump_dataset_version(db_session)
+    db_session.rollback()
+    assert "dataset_version_bumped" not in db_session.info
+
+
+def test_memo_kept_per_engine(tmp_path):
+    # A primary and a replica that has not replayed the last bump yet
+    engines = [
+        create_engine(f"sqlite:///{tmp_path / name}.db")
+        for name in ("primary", "replica")
+    ]
+    for engine, bumps in zip(engines, (2, 1)):
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            for _ in range(bumps):
+                bump_dataset_version(session)
+            session.commit()
+
+    primary, replica = (Session(engine) for engine in engines)
+    assert get_dataset_version(primary) == 2
+    # Not the version memoized from the primary: the replica's data is
+    # older, and caches filled from it must not be keyed as current
+    assert get_dataset_version(replica) == 1
+    assert peek_dataset_state().version == 2
+
+    for session, engine in zip((primary, replica), engines):
+        session.close()
+        engine.dispose()
@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine, text
+
+from database import InstrumentedQueuePool, pool_checkout_wait, pool_settings
+
+
+def test_pool_settings_env_overrides(monkeypatch):
+    monkeypatch.setenv("DB_API_POOL_SIZE", "25")
+    monkeypatch.setenv("DB_API_STATEMENT_TIMEOUT", "0")
+
+    settings = pool_settings("api")
+
+    assert settings["pool_size"] == 25
+    assert settings["statement_timeout"] == 0
+    assert settings["max_overflow"] == 10
+    assert pool_settings("admin")["pool_size"] == 2
+
+
+def test_instrumented_pool_records_checkout_waits(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_logging_name="test",
+    )
+
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text("SELECT 1"))
+        second.execute(text("SELECT 1"))
+        assert engine.pool.checkedout() == 2
+        assert engine.pool.overflow() == 1
+
+    wait = pool_checkout_wait.snapshot()[("test",)]
+    assert wait["count"] == 2
+    assert wait["buckets"][float("inf")] == 2
+    engine.dispose()
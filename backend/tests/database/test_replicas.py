@@ -0,0 +1,67 @@
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlmodel import SQLModel, select
+
+from models import Category, CategoryType
+from replicas import ReplicaRouter, RoutingSession
+
+
+class FakeEngine:
+    def __init__(self, name):
+        self.name = name
+        self.url = type("URL", (), {"host": name})()
+
+
+def route(router, times):
+    async def read_engines():
+        return [(await router.read_engine()).name for _ in range(times)]
+
+    return asyncio.run(read_engines())
+
+
+def test_router_round_robin():
+    lags = {"replica0": 0.0, "replica1": 1.0}
+    router = ReplicaRouter(
+        FakeEngine("primary"),
+        [FakeEngine("replica0"), FakeEngine("replica1")],
+        measure_lag=lambda engine: asyncio.sleep(0, lags[engine.name]),
+    )
+
+    assert route(router, 4) == ["replica0", "replica1"] * 2
+
+
+def test_router_skips_lagging_and_failing_replicas():
+    async def measure_lag(engine):
+        if engine.name == "replica1":
+            raise ConnectionError("down")
+        return 120.0
+
+    router = ReplicaRouter(
+        FakeEngine("primary"),
+        [FakeEngine("replica0"), FakeEngine("replica1")],
+        max_lag=30,
+        measure_lag=measure_lag,
+    )
+
+    assert route(router, 2) == ["primary", "primary"]
+    assert router.status() == [
+        {"healthy": False, "lag_seconds": 120.0},
+        {"healthy": False, "lag_seconds": None},
+    ]
+
+
+def test_routing_session_sends_writes_to_primary(tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    SQLModel.metadata.create_all(primary)
+    SQLModel.metadata.create_all(replica)
+
+    with RoutingSession(bind=primary, info={"read_engine": replica}) as s:
+        s.add(Category(name="Roma", slug="roma", type=CategoryType.TOPIC))
+        s.commit()
+        # The replica has not received the row
+        assert s.exec(select(Category)).all() == []
+
+    with RoutingSession(bind=primary) as session:
+        assert len(session.exec(select(Category)).all()) == 1
@@ -46,6 +46,7 @@ class TestCategoriesRepository:
         db_session.add(episode_category)
         db_session.commit()
         repo = CategoriesRepository(session=db_session)
+        repo.refresh_category_stats()
 
         query = repo.get_categories_query(CategoryType.LOCATION)
         assert query is not None
@@ -54,6 +55,35 @@ class TestCategoriesRepository:
         assert len(results) == 1
         assert results[0].name == "Antiga Grecia"
 
+    def test_get_categories_query_popularity(self, db_session: Session):
+        db_session.add_all(self.categories)
+        db_session.add_all(
+            [
+                Episode(id=1, title="Test Episode 1"),
+                Episode(id=2, title="Test Episode 2"),
+                EpisodeCategory(episode_id=1, category_id=2),
+                EpisodeCategory(episode_id=1, category_id=3),
+                EpisodeCategory(episode_id=2, category_id=3),
+            ]
+        )
+        db_session.commit()
+        repo = CategoriesRepository(session=db_session)
+        repo.refresh_category_stats()
+
+        query = repo.get_categories_query(
+            CategoryType.TOPIC, order="popularity"
+        )
+        results = db_session.exec(query).all()
+        assert [c.name for c in results] == [
+            "Guerra del Francès",
+            "Guerra Civil",
+        ]
+
+        query = repo.get_categories_query(CategoryType.TOPIC, min_episodes=2)
+        results = db_session.exec(query).all()
+        assert [c.name for c in results] == ["Guerra del Francès"]
+        assert repo.count_categories(CategoryType.TOPIC, min_episodes=2) == 1
+
     def test_get_or_create_category(self, db_session: Session):
         db_session.add_all(self.categories)
         db_session.commit()
@@ -1,9 +1,15 @@
+import asyncio
 from datetime import datetime
 
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from models import Category, CategoryType, Episode, EpisodeCategory
-from repositories import EpisodesRepository
+from repositories import (
+    AsyncEpisodesRepository,
+    EpisodesRepository,
+    build_prefix_tsquery,
+)
 
 
 class TestEpisodesRepository:
@@ -26,6 +32,32 @@ class TestEpisodesRepository:
             ),
         ]
 
+    def test_async_repository_matches_sync(
+        self, db_session: Session, async_engine
+    ):
+        db_session.add_all(self.episodes)
+        db_session.commit()
+        repo = EpisodesRepository(session=db_session)
+
+        async def read():
+            async with AsyncSession(async_engine) as session:
+                async_repo = AsyncEpisodesRepository(session=session)
+                episodes = await async_repo.get_episodes_after(
+                    search="Guerra", order="desc", after=None, limit=10
+                )
+                count = await async_repo.count_episodes(search="Guerra")
+                return [episode.id for episode in episodes], count
+
+        ids, count = asyncio.run(read())
+        assert ids == [
+            episode.id
+            for episode in repo.get_episodes_after(
+                search="Guerra", order="desc", after=None, limit=10
+            )
+        ]
+        assert ids == [3, 2]
+        assert count == repo.count_episodes(search="Guerra") == 2
+
     def test_repository_search(self, db_session: Session):
         db_session.add_all(self.episodes)
         db_session.commit()
@@ -38,6 +70,26 @@ class TestEpisodesRepository:
         assert results[0].title == "Episodi sobre la Guerra Civil"
         assert results[1].title == "Episodi sobre la Guerra del Vietnam"
 
+    def test_repository_search_description(self, db_session: Session):
+        self.episodes[0].description = "La caiguda de l'Imperi Romà"
+        db_session.add_all(self.episodes)
+        db_session.commit()
+        repo = EpisodesRepository(session=db_session)
+
+        query = repo.get_episodes_query(search="imperi", order="relevance")
+        results = db_session.exec(query).all()
+
+        assert len(results) == 1
+        assert results[0].title == "Episodi sobre Grecia"
+
+    def test_build_prefix_tsquery(self):
+        assert build_prefix_tsquery("Guerra Civil") == "Guerra:* & Civil:*"
+        assert build_prefix_tsquery("  l'Alt Urgell!") == (
+            "l:* & Alt:* & Urgell:*"
+        )
+        assert build_prefix_tsquery("Guàrdia") == "Guàrdia:*"
+        assert build_prefix_tsquery("!!") == ""
+
     def test_repository_ordering(self, db_session: Session):
         db_session.add_all(self.episodes)
         db_session.commit()
@@ -107,3 +159,67 @@ class TestEpisodesRepository:
 
         episode = repo.get_episode_by_id(4)
         assert episode is None
+
+
+def ingested_episode(
+    id: int, title: str, description: str | None = None
+) -> Episode:
+    published_at = datetime(2020, 1, 1)
+    return Episode(
+        id=id,
+        title=title,
+        description=description,
+        published_at=published_at,
+        content_hash=Episode.compute_content_hash(
+            title, None, description, published_at
+        ),
+    )
+
+
+class TestUpsertEpisodes:
+    def test_inserts_and_updates_only_changed(self, db_session: Session):
+        repository = EpisodesRepository(db_session)
+        written = repository.upsert_episodes(
+            [ingested_episode(id, f"Episodi {id}") for id in range(1, 4)]
+        )
+        db_session.commit()
+        assert written == 3
+        unchanged_at = db_session.get(Episode, 1).updated_at
+
+        written = repository.upsert_episodes(
+            [
+                ingested_episode(1, "Episodi 1"),
+                ingested_episode(2, "Títol corregit"),
+                ingested_episode(4, "Episodi 4"),
+            ]
+        )
+        db_session.commit()
+        db_session.expire_all()
+
+        # The new and the edited episode, not the unchanged one
+        assert written == 2
+        assert db_session.get(Episode, 1).updated_at == unchanged_at
+        assert db_session.get(Episode, 2).title == "Títol corregit"
+        assert db_session.get(Episode, 4) is not None
+
+    def test_flags_text_edits_for_reclassification(self, db_session: Session):
+        db_session.add(
+            Episode(id=1, title="Episodi 1", published_at=datetime(2020, 1, 1))
+        )
+        db_session.commit()
+        repository = EpisodesRepository(db_session)
+
+        # Stored before content hashes: filled in, nothing else changes
+        repository.upsert_episodes([ingested_episode(1, "Episodi 1")])
+        db_session.commit()
+        db_session.expire_all()
+        episode = db_session.get(Episode, 1)
+        assert episode.content_hash is not None
+        assert not episode.needs_reclassification
+
+        repository.upsert_episodes(
+            [ingested_episode(1, "Episodi 1", "Nova descripció")]
+        )
+        db_session.commit()
+        db_session.expire_all()
+        assert db_session.get(Episode, 1).needs_reclassification
@@ -101,6 +101,34 @@ class TestClassificationService:
                 1, category.id
             )
 
+    def test_save_categories_replaces_those_of_an_edited_episode(self):
+        episode = Episode(id=1, title="Test Episode")
+        episode.needs_reclassification = True
+        self.mock_categories_repo.get_or_create_category.return_value = (
+            Category(id=7, slug="Jaume I", name="Jaume I")
+        )
+
+        self.service.save_categories_to_episode(
+            episode, {"personatges": ["Jaume I"]}
+        )
+
+        self.mock_episodes_repo.unlink_episode_categories.assert_called_once_with(  # noqa: E501
+            1
+        )
+        self.mock_episodes_repo.link_episode_to_category.assert_called_once_with(  # noqa: E501
+            1, 7
+        )
+        assert not episode.needs_reclassification
+
+    def test_edited_episode_stays_flagged_without_categories(self):
+        episode = Episode(id=1, title="Test Episode")
+        episode.needs_reclassification = True
+
+        self.service.save_categories_to_episode(episode, {"personatges": []})
+
+        self.mock_episodes_repo.unlink_episode_categories.assert_not_called()
+        assert episode.needs_reclassification
+
     def test_save_categories_to_episode_empty_classification(self):
         episode = Episode(id=1, title="Test Episode")
         classification = {}
@@ -120,5 +148,5 @@ class TestCategoriesService:
     def test_get_categories_query(self):
         self.service.get_categories_query(CategoryType.TOPIC)
         self.mock_categories_repo.get_categories_query.assert_called_once_with(
-            type=CategoryType.TOPIC
+            type=CategoryType.TOPIC, order="name", min_episodes=1
         )
@@ -0,0 +1,48 @@
+from category_index import CategoryIndex
+
+
+class TestCategoryIndex:
+    def setup_method(self):
+        # (episode_id, category_id)
+        self.links = [
+            (10, 1),
+            (10, 2),
+            (10, 3),
+            (20, 1),
+            (20, 2),
+            (30, 1),
+            (40, 3),
+        ]
+        self.index = CategoryIndex()
+        self.index.ensure_fresh(1, lambda: self.links)
+
+    def test_match_any(self):
+        assert self.index.match([2, 3]) == ([10, 20, 40], [])
+
+    def test_match_all(self):
+        assert self.index.match([1, 2], mode="all") == ([10, 20], [])
+        assert self.index.match([1, 2, 3], mode="all") == ([10], [])
+        assert self.index.match([2, 99], mode="all") == ([], [])
+
+    def test_match_exclude(self):
+        assert self.index.match([1], exclude=[3]) == ([20, 30], [])
+        assert self.index.match([], exclude=[2]) == (None, [10, 20])
+
+    def test_rebuilds_only_on_version_change(self):
+        calls = []
+
+        def load_links():
+            calls.append(1)
+            return [(50, 1)]
+
+        self.index.ensure_fresh(1, load_links)
+        assert calls == []
+        assert self.index.match([1]) == ([10, 20, 30], [])
+
+        self.index.ensure_fresh(2, load_links)
+        assert calls == [1]
+        assert self.index.match([1]) == ([50], [])
+
+        # An older version, read from a lagging replica, keeps the newer
+        self.index.ensure_fresh(1, load_links)
+        assert calls == [1]
@@ -1,5 +1,8 @@
+from datetime import datetime
 from unittest.mock import MagicMock
 
+from models import Episode
+from pagination import decode_cursor
 from repositories import IEpisodesRepository
 from services import EpisodesService
 
@@ -18,7 +21,7 @@ class TestEpisodesService:
         )
 
         self.mock_repo.get_episodes_query.assert_called_once_with(
-            search=search_term, order=order_direction, categories=[]
+            search=search_term, order=order_direction
         )
 
     def test_episodes_service_calls_repository_with_categories(self):
@@ -28,3 +31,76 @@ class TestEpisodesService:
     def test_episodes_service_get_episode_by_id(self):
         self.service.get_episode_by_id(id=1)
         self.mock_repo.get_episode_by_id.assert_called_once_with(1)
+
+    def test_episodes_service_hashes_api_content(self):
+        item = {
+            "id": 1,
+            "titol": "Jaume I",
+            "nom_friendly": "jaume-i",
+            "entradeta": "La conquesta de Mallorca",
+            "data_publicacio": "09/09/2001 00:01:00",
+        }
+
+        episode = self.service.create_episode_from_api_data(item)
+        edited = self.service.create_episode_from_api_data(
+            {**item, "entradeta": "La conquesta de València"}
+        )
+
+        assert episode.content_hash == Episode.compute_content_hash(
+            "Jaume I",
+            "jaume-i",
+            "La conquesta de Mallorca",
+            datetime(2001, 9, 9, 0, 1),
+        )
+        assert edited.content_hash != episode.content_hash
+
+    def test_episodes_service_cursor_page(self):
+        self.mock_repo.get_episodes_after.return_value = [
+            Episode(
+                id=3, title="Episode 3", published_at=datetime(2025, 1, 3)
+            ),
+            Episode(
+                id=2, title="Episode 2", published_at=datetime(2025, 1, 2)
+            ),
+            Episode(
+                id=1, title="Episode 1", published_at=datetime(2025, 1, 1)
+            ),
+        ]
+
+        page = self.service.get_episodes_after_cursor(
+            search=None, order="desc", categories="7", size=2
+        )
+
+        self.mock_repo.get_episodes_after.assert_called_once_with(
+            search=None,
+            order="desc",
+            after=None,
+            limit=3,
+            episode_ids=[],
+            exclude_episode_ids=[],
+        )
+        self.mock_repo.count_episodes.assert_not_called()
+        assert [episode.id for episode in page["items"]] == [3, 2]
+        assert decode_cursor(page["next_cursor"]) == (datetime(2025, 1, 2), 2)
+
+    def test_episodes_service_count_estimate_only_unfiltered(self):
+        self.mock_repo.estimate_episodes_count.return_value = 1200
+        self.mock_repo.count_episodes.return_value = 3
+
+        assert self.service.count_episodes(None, strategy="estimate") == 1200
+        assert self.service.count_episodes("guerra", strategy="estimate") == 3
+        self.mock_repo.count_episodes.assert_called_once_with(search="guerra")
+
+    def test_episodes_service_count_cached_per_version(self):
+        self.mock_repo.count_episodes.return_value = 3
+        service = EpisodesService(
+            episodes_repository=self.mock_repo, dataset_version=1
+        )
+
+        service.count_episodes(" Guerra  civil", categories="2,1")
+        service.count_episodes("guerra civil", categories="1,2")
+        assert self.mock_repo.count_episodes.call_count == 1
+
+        service.dataset_version = 2
+        service.count_episodes("guerra civil", categories="1,2")
+        assert self.mock_repo.count_episodes.call_count == 2
@@ -0,0 +1,88 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from api.rate_limit import RateLimitMiddleware, route_limit
+from main import app
+from rate_limit import RateLimit, RateLimiter
+
+
+class TestRateLimiter:
+    def test_parse(self):
+        limit = RateLimit.parse("search", "60/minute")
+        assert limit.amount == 60
+        assert limit.rate == 1.0
+        assert str(limit) == "60 per 1 minute"
+
+    def test_bucket_empties_then_denies(self):
+        limiter = RateLimiter(lease_fraction=0.5)
+        limit = RateLimit("test", 4, 3600)
+
+        async def hits():
+            return [await limiter.hit("1.2.3.4", limit) for _ in range(5)]
+
+        results = asyncio.run(hits())
+        assert results[:4] == [None] * 4
+        assert results[4] > 0
+        # One lease of two tokens was spent without asking the bucket
+        assert limiter.stats()["leased"] == 2
+        assert limiter.stats()["local"] == 3
+        assert limiter.stats()["denied"] == 1
+
+    def test_keys_have_separate_buckets(self):
+        limiter = RateLimiter()
+        limit = RateLimit("test", 1, 3600)
+
+        async def hits():
+            return [
+                await limiter.hit("1.2.3.4", limit),
+                await limiter.hit("5.6.7.8", limit),
+                await limiter.hit("1.2.3.4", limit),
+            ]
+
+        first, other, again = asyncio.run(hits())
+        assert first is None and other is None
+        assert again is not None
+
+
+class TestRateLimitMiddleware:
+    def test_route_limits(self):
+        def limit_name(path, query=b""):
+            request = Request(
+                {
+                    "type": "http",
+                    "path": path,
+                    "query_string": query,
+                    "headers": [],
+                }
+            )
+            return route_limit(request).name
+
+        assert limit_name("/api/episodes/12") == "detail"
+        assert limit_name("/api/episodes") == "default"
+        assert limit_name("/api/episodes", b"search=guerra") == "search"
+        assert limit_name("/api/episodes", b"search=") == "default"
+        assert limit_name("/api/export/episodes") == "export"
+
+    def test_too_many_requests(self, client, monkeypatch):
+        monkeypatch.setattr(
+            "api.rate_limit.DEFAULT_LIMIT", RateLimit("default", 2, 3600)
+        )
+        limited = TestClient(
+            RateLimitMiddleware(app, RateLimiter(lease_fraction=0))
+        )
+
+        statuses = [
+            limited.get("/api/categories?type=topic").status_code
+            for _ in range(3)
+        ]
+        assert statuses == [200, 200, 429]
+
+        response = limited.get("/api/categories?type=topic")
+        assert response.json() == {
+            "error": "Rate limit exceeded: 2 per 1 hour"
+        }
+        assert int(response.headers["retry-after"]) > 0
+        # Health checks are never limited
+        assert limited.get("/health").status_code == 200
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from response_cache import ResponseCache
+
+
+class TestResponseCache:
+    def setup_method(self):
+        self.cache = ResponseCache()
+
+    def test_get_or_set_computes_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"items": [1, 2]}
+
+        assert self.cache.get_or_set("1:/a", compute) == {"items": [1, 2]}
+        assert self.cache.get_or_set("1:/a", compute) == {"items": [1, 2]}
+        assert len(calls) == 1
+        assert self.cache.stats()["local_hits"] == 1
+        assert self.cache.stats()["misses"] == 1
+
+    def test_local_entries_expire(self):
+        cache = ResponseCache(local_ttl=0.01)
+        cache.get_or_set("1:/a", lambda: 1)
+        time.sleep(0.02)
+        assert cache.get_or_set("1:/a", lambda: 2) == 2
+
+    def test_concurrent_misses_are_coalesced(self):
+        calls = []
+        started = threading.Event()
+
+        def slow_compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.cache.get_or_set("1:/a", slow_compute)
+                )
+            )
+            for _ in range(5)
+        ]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == ["value"] * 5
+        assert len(calls) == 1
+        assert self.cache.stats()["coalesced"] == 4
+
+    def test_concurrent_async_misses_are_coalesced(self):
+        calls = []
+
+        async def slow_compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        async def burst():
+            return await asyncio.gather(
+                *(
+                    self.cache.get_or_set_async("1:/a", slow_compute)
+                    for _ in range(5)
+                )
+            )
+
+        assert asyncio.run(burst()) == ["value"] * 5
+        assert len(calls) == 1
+        assert self.cache.stats()["coalesced"] == 4
+
+    def test_shared_lock_released_when_compute_fails(self):
+        cache = ResponseCache(redis_url="redis://cache", ttl=0.5)
+        client = cache._redis = MagicMock()
+        client.get.return_value = None
+        client.set.return_value = True
+
+        def compute():
+            raise ValueError("Unknown field")
+
+        with pytest.raises(ValueError):
+            cache.get_or_set("1:/a", compute)
+        client.delete.assert_called_once_with("response:1:/a:lock")
+
+        # Sub-second TTLs are kept, not truncated to an invalid 0
+        cache.get_or_set("1:/b", lambda: 1)
+        client.set.assert_called_with("response:1:/b", b"j1", px=500)
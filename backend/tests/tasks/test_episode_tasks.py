@@ -29,6 +29,16 @@ class TestTaskWiring:
         assert result["batch_size"] == 10
         assert result["max_total"] == 100
 
+    @patch("commands.build_snapshots.build_snapshots", return_value=3)
+    def test_snapshots_task_calls_command(self, mock_build):
+        from tasks.episode_tasks import build_snapshots_task
+
+        result = build_snapshots_task()
+
+        mock_build.assert_called_once()
+        assert result["status"] == "success"
+        assert result["rendered"] == 3
+
     @patch("tasks.episode_tasks.chain")
     @patch("tasks.episode_tasks.ingest_data_task")
     @patch("tasks.episode_tasks.classify_episodes_task")
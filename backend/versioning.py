@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from sqlalchemy import Engine, event, update
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models import DatasetVersion
+
+# How long a process trusts the version it last read before checking the
+# database again. Bumps made by this process are seen immediately; bumps
+# from the Celery worker or other API replicas within this window.
+DATASET_VERSION_TTL = float(os.environ.get("DATASET_VERSION_TTL", "5"))
+
+
+class DatasetState(NamedTuple):
+    version: int
+    updated_at: datetime | None
+
+
+# Per engine: read replicas can lag behind the primary, and a request must
+# key its caches by the version of the data it reads, not a newer one
+_lock = threading.Lock()
+_cached_states: dict[Engine, tuple[DatasetState, float]] = {}
+
+
+_state_query = select(DatasetVersion.version, DatasetVersion.updated_at).where(
+    DatasetVersion.id == 1
+)
+
+
+def get_dataset_state(session: Session) -> DatasetState:
+    """
+    Return the current dataset version and when it last changed, as seen
+    by the engine the session reads from, read at most once per TTL.
+    """
+    engine = session.get_bind()
+    state = _memoized_state(engine)
+    if state is None:
+        state = _remember_state(engine, session.exec(_state_query).first())
+    return state
+
+
+async def get_dataset_state_async(session: AsyncSession) -> DatasetState:
+    """Async version of `get_dataset_state`, sharing its memo."""
+    engine = session.sync_session.get_bind()
+    state = _memoized_state(engine)
+    if state is None:
+        result = await session.exec(_state_query)
+        state = _remember_state(engine, result.first())
+    return state
+
+
+def peek_dataset_state() -> DatasetState | None:
+    """
+    The newest dataset state this process read from any engine, without
+    querying, or None once they are all older than the TTL.
+    """
+    now = time.monotonic()
+    with _lock:
+        states = [
+            state
+            for state, cached_at in _cached_states.values()
+            if now - cached_at < DATASET_VERSION_TTL
+        ]
+    return max(states, key=lambda state: state.version, default=None)
+
+
+def _memoized_state(engine: Engine) -> DatasetState | None:
+    with _lock:
+        state, cached_at = _cached_states.get(engine, (None, 0.0))
+    if (
+        state is not None
+        and time.monotonic() - cached_at < DATASET_VERSION_TTL
+    ):
+        return state
+    return None
+
+
+def _remember_state(engine: Engine, row: tuple | None) -> DatasetState:
+    state = DatasetState(*row) if row else DatasetState(0, None)
+    if state.updated_at and state.updated_at.tzinfo is None:
+        state = state._replace(
+            updated_at=state.updated_at.replace(tzinfo=timezone.utc)
+        )
+
+    with _lock:
+        _cached_states[engine] = (state, time.monotonic())
+
+    return state
+
+
+def get_dataset_version(session: Session) -> int:
+    """Return the current dataset version, read at most once per TTL."""
+    return get_dataset_state(session).version
+
+
+def bump_dataset_version(session: Session) -> None:
+    """
+    Increment the dataset version as part of the session's transaction.
+    Call it from every code path that changes the public catalog. The
+    memo is reset once the transaction commits: resetting it before would
+    let a concurrent request memoize the old version again.
+    """
+    now = datetime.now(timezone.utc)
+    result = session.exec(
+        update(DatasetVersion)
+        .where(DatasetVersion.id == 1)
+        .values(version=DatasetVersion.version + 1, updated_at=now)
+    )
+    if result.rowcount == 0:
+        session.add(DatasetVersion(id=1, version=1, updated_at=now))
+        session.flush()
+
+    session.info["dataset_version_bumped"] = True
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _reset_after_bump(session: OrmSession) -> None:
+    if session.info.pop("dataset_version_bumped", False):
+        reset_dataset_version_cache()
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _forget_bump(session: OrmSession) -> None:
+    session.info.pop("dataset_version_bumped", None)
+
+
+def reset_dataset_version_cache() -> None:
+    with _lock:
+        _cached_states.clear()